@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 """
 Run script for AI Governance Pro
+
+Usage:
+    python run.py                     # run the app
+    python run.py --profile-startup   # report per-module import time against STARTUP_BUDGET_MS
 """
 import sys
 import os
@@ -8,7 +12,10 @@ import os
 # Add src to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from app.main import main
-
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv[1:]:
+        from modules.utils.startup_profiler import profile_startup
+        sys.exit(profile_startup([arg for arg in sys.argv[1:] if arg != "--profile-startup"]))
+
+    from app.main import main
     main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Benchmark batch scoring against the per-assessment scoring function.
+
+Usage:
+    python scripts/benchmark_batch_scoring.py [--sizes 10000 100000] [--seed 7]
+
+Reports assessments/second for calculate_maturity_score in a loop, for
+calculate_maturity_scores_batch (result dicts) and for score_batch (arrays
+only), and checks the batch results match the per-assessment results.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Ensure src/ is importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import (
+    calculate_maturity_score,
+    calculate_maturity_scores_batch,
+    score_batch,
+)
+
+
+def generate_responses(framework, count, seed):
+    rng = random.Random(seed)
+    question_ids = list(framework.question_ids)
+    responses_list = []
+    for _ in range(count):
+        answered = rng.sample(question_ids, rng.randint(len(question_ids) // 2, len(question_ids)))
+        responses_list.append({q_id: rng.randint(0, 5) for q_id in answered})
+    return responses_list
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    framework = get_assessment_framework()
+    print(f"Framework: {framework.version_id} ({framework.total_questions} questions)")
+    print(f"{'assessments':>12} {'mode':<22} {'seconds':>9} {'assessments/s':>15}")
+
+    for size in args.sizes:
+        responses_list = generate_responses(framework, size, args.seed)
+
+        expected, loop_time = timed(lambda: [calculate_maturity_score(r, framework) for r in responses_list])
+        results, batch_time = timed(lambda: calculate_maturity_scores_batch(responses_list, framework))
+        _, array_time = timed(lambda: score_batch(responses_list, framework))
+
+        if results != expected:
+            print("❌ Batch results differ from per-assessment results")
+            return 1
+
+        for mode, seconds in (('per-assessment loop', loop_time),
+                              ('batch (dicts)', batch_time),
+                              ('batch (arrays)', array_time)):
+            print(f"{size:>12} {mode:<22} {seconds:>9.3f} {size / seconds:>15,.0f}")
+
+    print("✅ Batch results identical to per-assessment scoring")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
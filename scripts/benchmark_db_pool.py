@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark concurrent logins and submits with and without the connection pool.
+
+Usage:
+    python scripts/benchmark_db_pool.py [--threads 8] [--logins 400] [--submits 400]
+
+Each mode runs against a fresh database in a temporary directory. "before"
+opens a plain sqlite3 connection for every database call, as the managers did
+before the pool; "after" uses modules.data.connection_pool. A login runs the
+same calls as the login form (rate-limit check, login, reset attempts,
+audit entry); a submit saves the assessment, its responses and an audit entry.
+The benchmark user's bcrypt cost is lowered to 4 so hashing does not hide the
+database cost.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Ensure src/ is importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'BenchPassword1!'
+
+
+class UnpooledConnections:
+    """Stand-in for ConnectionPool that reproduces connect-per-call behaviour"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def run_concurrently(threads, operations, fn):
+    """Run fn(i) for i in range(operations) over a number of threads; return seconds"""
+    counter = iter(range(operations))
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            try:
+                fn(i)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return elapsed
+
+
+def benchmark(mode, args):
+    import bcrypt
+    from modules.data import connection_pool
+    from modules.auth.auth_manager import AuthManager
+    from modules.auth.password_hasher import PasswordHasher
+    from modules.data.database_manager import DatabaseManager
+    from modules.utils.rate_limiter import RateLimiter
+    from modules.utils.audit_logger import AuditLogger
+    from modules.utils.audit_writer import close_all_writers
+    from modules.assessment.framework import get_assessment_framework
+    from modules.assessment.scoring_engine import calculate_maturity_score
+
+    work_dir = tempfile.mkdtemp(prefix=f'bench_pool_{mode}_')
+    db_path = os.path.join(work_dir, 'bench.db')
+    original_get_pool = connection_pool.get_pool
+    if mode == 'before':
+        connection_pool.get_pool = lambda path, max_connections=None: UnpooledConnections(path)
+
+    try:
+        RateLimiter.DB_PATH = db_path
+        # Measure the database path, not the in-memory rate limiter
+        RateLimiter.BACKEND = 'sqlite'
+        AuditLogger.DB_PATH = db_path
+        auth = AuthManager.__new__(AuthManager)
+        auth.db_path = db_path
+        auth.hasher = PasswordHasher(rounds=4)
+        auth._init_db()
+        RateLimiter.init_db()
+        db = DatabaseManager(db_path)
+
+        with connection_pool.get_pool(db_path).connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO users (email, password_hash, full_name, organization, role) VALUES (?, ?, ?, ?, ?)",
+                (BENCH_EMAIL, sqlite3.Binary(bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(4))),
+                 'Bench User', 'BenchOrg', 'user'))
+            user_id = cursor.lastrowid
+
+        def login(_):
+            RateLimiter.check_rate_limit(BENCH_EMAIL)
+            if not auth.login(BENCH_EMAIL, BENCH_PASSWORD).ok:
+                raise RuntimeError("benchmark login failed")
+            RateLimiter.reset_attempts(BENCH_EMAIL)
+            AuditLogger.log_authentication(BENCH_EMAIL, True)
+
+        framework = get_assessment_framework()
+        rng = random.Random(args.seed)
+        submissions = []
+        for _ in range(args.submits):
+            responses = {q_id: rng.randint(0, 5) for q_id in framework.question_ids}
+            submissions.append((responses, calculate_maturity_score(responses, framework)))
+
+        def submit(i):
+            responses, scores = submissions[i]
+            assessment_id = db.save_assessment(user_id, scores, f'Bench {i}', framework.version_id)
+            if assessment_id is None:
+                raise RuntimeError("benchmark submit failed")
+            db.save_assessment_responses(assessment_id, responses, framework)
+            AuditLogger.log_assessment_submission(user_id, assessment_id,
+                                                  scores['overall']['percentage'], framework.version_id)
+
+        login_time = run_concurrently(args.threads, args.logins, login)
+        submit_time = run_concurrently(args.threads, args.submits, submit)
+        return args.logins / login_time, args.submits / submit_time
+    finally:
+        close_all_writers()
+        connection_pool.get_pool = original_get_pool
+        connection_pool.close_all_pools()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--submits', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    # Keep relative data/ and logs/ paths used by the managers in a scratch dir
+    scratch = tempfile.mkdtemp(prefix='bench_pool_cwd_')
+    os.chdir(scratch)
+    try:
+        results = {mode: benchmark(mode, args) for mode in ('before', 'after')}
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"Threads: {args.threads}")
+    print(f"{'mode':<8} {'logins/s':>10} {'submits/s':>10}")
+    for mode, (logins, submits) in results.items():
+        print(f"{mode:<8} {logins:>10,.0f} {submits:>10,.0f}")
+    before, after = results['before'], results['after']
+    print(f"✅ Speedup: logins x{after[0] / before[0]:.1f}, submits x{after[1] / before[1]:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
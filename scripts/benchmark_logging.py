@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Benchmark structured logging under concurrent sessions, before and after the queue pipeline.
+
+Usage:
+    python scripts/benchmark_logging.py [--threads 8] [--events 2000] [--queue-size N]
+
+Each thread plays one session and logs --events audit events, round-robin
+across the five StructuredLogger instances. "before" gives every logger its
+own RotatingFileHandlers on app.log and audit.json and writes synchronously,
+as the loggers did before the pipeline; "after" routes them through
+modules.utils.log_pipeline. Console output goes to /dev/null in both modes.
+Caller throughput and per-call latency measure what a request pays; "drained"
+includes the time for the pipeline to finish writing. A burst larger than the
+queue (LOG_QUEUE_SIZE unless --queue-size is given) that outruns the writer
+thread is dropped rather than slowing callers; "dropped" counts it.
+"""
+import argparse
+import glob
+import logging
+import logging.handlers
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Ensure src/ is importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+LOGGER_NAMES = ('app', 'auth', 'assessment', 'export', 'security')
+
+
+def legacy_setup(structured_logger):
+    """The per-instance handler setup StructuredLogger used before the pipeline"""
+    logger = structured_logger.logger
+    logger.handlers = []
+    logger.setLevel(logging.DEBUG)
+    detailed = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(structured_logger.log_dir, 'app.log'), maxBytes=10 * 1024 * 1024, backupCount=10)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(detailed)
+    audit_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(structured_logger.log_dir, 'audit.json'), maxBytes=50 * 1024 * 1024, backupCount=20)
+    audit_handler.setLevel(logging.INFO)
+    audit_handler.setFormatter(logging.Formatter('%(message)s'))
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(detailed)
+    for handler in (file_handler, audit_handler, console_handler):
+        logger.addHandler(handler)
+
+
+def make_loggers(mode, log_dir):
+    from modules.utils.logger import StructuredLogger
+
+    loggers = []
+    for name in LOGGER_NAMES:
+        if mode == 'before':
+            structured = StructuredLogger.__new__(StructuredLogger)
+            structured.log_dir = log_dir
+            structured.logger = logging.getLogger(f"bench_{mode}_{name}")
+            structured.sample_rates = {}
+            legacy_setup(structured)
+        else:
+            structured = StructuredLogger(f"bench_{mode}_{name}", log_dir=log_dir, sample_rates={})
+        loggers.append(structured)
+    return loggers
+
+
+def log_event(loggers, session, i):
+    logger = loggers[i % len(loggers)]
+    kind = i % 3
+    if kind == 0:
+        logger.log_data_access(session, 'assessment', str(i), 'view', ip_address='10.0.0.1')
+    elif kind == 1:
+        logger.log_authentication('login', f'user{session}@example.com', True, ip_address='10.0.0.1')
+    else:
+        logger.log_export_operation(session, 'json', True, filename=f'export_{i}.json')
+
+
+def benchmark(mode, args):
+    from modules.utils.log_pipeline import LogPipeline
+    from modules.utils.services import services
+
+    log_dir = tempfile.mkdtemp(prefix=f'bench_logging_{mode}_')
+    if mode == 'after':
+        services.register('log_pipeline', lambda: LogPipeline(queue_size=args.queue_size))
+    loggers = make_loggers(mode, log_dir)
+    pipeline = services.get('log_pipeline') if mode == 'after' else None
+
+    latencies = []
+    latencies_lock = threading.Lock()
+    gate = threading.Barrier(args.threads + 1)
+
+    def session(session_id):
+        own = []
+        gate.wait()
+        for i in range(args.events):
+            started = time.perf_counter()
+            log_event(loggers, session_id, i)
+            own.append(time.perf_counter() - started)
+        with latencies_lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=session, args=(s,)) for s in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    gate.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    caller_seconds = time.perf_counter() - start
+    dropped = 0
+    if pipeline is not None:
+        pipeline.flush(timeout=120)
+        dropped = pipeline.stats()['dropped']
+        pipeline.stop()
+    drained_seconds = time.perf_counter() - start
+
+    for structured in loggers:
+        for handler in structured.logger.handlers:
+            handler.close()
+        structured.logger.handlers = []
+    lines = sum(1 for path in glob.glob(os.path.join(log_dir, 'audit.json*')) if not path.endswith('.lock')
+                for _ in open(path, encoding='utf-8'))
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+    latencies.sort()
+    total = args.threads * args.events
+    return {
+        'caller_rate': total / caller_seconds,
+        'drained_rate': total / drained_seconds,
+        'p50_us': latencies[len(latencies) // 2] * 1e6,
+        'p99_us': latencies[int(len(latencies) * 0.99)] * 1e6,
+        'written': lines,
+        'dropped': dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--queue-size', type=int, default=None)
+    args = parser.parse_args()
+
+    stderr = sys.stderr
+    devnull = open(os.devnull, 'w')
+    # Console handlers bind sys.stderr when they are created
+    sys.stderr = devnull
+    try:
+        results = {mode: benchmark(mode, args) for mode in ('before', 'after')}
+    finally:
+        sys.stderr = stderr
+        devnull.close()
+
+    print(f"Threads: {args.threads}, events per thread: {args.events}")
+    print(f"{'mode':<8} {'calls/s':>10} {'drained/s':>10} {'p50 us':>8} {'p99 us':>8} {'written':>8} {'dropped':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['caller_rate']:>10,.0f} {r['drained_rate']:>10,.0f} {r['p50_us']:>8.1f} "
+              f"{r['p99_us']:>8.1f} {r['written']:>8,} {r['dropped']:>8,}")
+    before, after = results['before'], results['after']
+    print(f"✅ Caller speedup x{after['caller_rate'] / before['caller_rate']:.1f}; "
+          f"median call {before['p50_us']:.0f}us -> {after['p50_us']:.0f}us, "
+          f"p99 {before['p99_us']:.0f}us -> {after['p99_us']:.0f}us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
-"""Run database cleanup for expired password reset tokens and old requests.
+"""Run database cleanup for expired password reset tokens and old requests,
+archive closed months of audit events and drop expired audit archives,
+then collect unreferenced evidence files and compress cold ones.
 
 This script is intended to be called from a scheduler (cron/GitHub Actions).
 """
@@ -16,6 +18,17 @@ def main():
     try:
         from modules.auth.auth_manager import auth_manager
         auth_manager.cleanup_expired_tokens()
+
+        from modules.utils.audit_archive import AuditArchive
+        result = AuditArchive().run()
+        print(f'Archived {result.archived_rows} audit events into {result.segments} segments; '
+              f'dropped {len(result.dropped_partitions)} expired partitions.')
+
+        from modules.data.evidence_gc import EvidenceSweeper
+        sweep = EvidenceSweeper().run()
+        print(f'Evidence: expired {sweep.expired_drafts} draft records, deleted {sweep.orphan_blobs} '
+              f'unreferenced blobs and {sweep.stray_files} stray files, compressed {sweep.compressed_blobs} '
+              f'cold blobs; reclaimed {sweep.bytes_reclaimed / 1024 / 1024:.1f}MB.')
         print('Cleanup completed successfully.')
     except Exception as e:
         print('Cleanup failed:', e)
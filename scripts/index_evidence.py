@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Extract text from every queued evidence file into the search index.
+
+The app indexes new uploads in the background; run this after a bulk import
+or a restore to work through a large backlog on all cores.
+
+Usage:
+    python scripts/index_evidence.py [--workers N]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Ensure src/ is importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SRC = os.path.join(ROOT, 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default EVIDENCE_INDEX_WORKERS, or one per CPU)')
+    args = parser.parse_args()
+
+    from modules.data.evidence_search import EvidenceIndex
+
+    index = EvidenceIndex(workers=args.workers)
+    try:
+        print(f'{index.pending_count()} evidence file(s) queued; extracting with {index.workers} worker(s)')
+        started = time.perf_counter()
+        indexed = index.index_pending()
+        print(f'Indexed {indexed} file(s) in {time.perf_counter() - started:.1f}s.')
+    finally:
+        index.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,6 +13,11 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from modules.auth.auth_components import render_login_page, render_registration_page
 from modules.assessment.engine import render_assessment, show_assessment_results
 
+try:
+    from config.config import Config
+except ImportError:
+    Config = None
+
 # ENTERPRISE DARK MODE FIX
 ENTERPRISE_CSS = """
     <style>
@@ -140,6 +145,8 @@ def render_results_page():
     with col1:
         if st.button("📝 New Assessment", use_container_width=True, key="new_assess_btn"):
             st.session_state.assessment_responses = {}
+            # A new responses dict makes the engine start a new attempt (scorer and submission key)
+            st.session_state.responses = {}
             st.session_state.assessment_completed = False
             navigate_to('assessment')
     with col2:
@@ -148,6 +155,10 @@ def render_results_page():
 
 def main():
     """Main application"""
+    # Validated once per process here rather than on import
+    if Config is not None:
+        Config.validate_on_startup()
+    
     # Initialize session
     initialize_session()
     
@@ -29,6 +29,23 @@ class Config:
     DATABASE_URL = os.getenv("DATABASE_URL", "data/governance_assessments.db")
     DATABASE_TYPE = os.getenv("DATABASE_TYPE", "sqlite")
     DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "20"))
+    DATABASE_BUSY_TIMEOUT_MS = int(os.getenv("DATABASE_BUSY_TIMEOUT_MS", "5000"))
+    DATABASE_CACHE_SIZE_KB = int(os.getenv("DATABASE_CACHE_SIZE_KB", "8192"))
+    
+    # Assessment Frameworks
+    FRAMEWORK_CACHE_SIZE = int(os.getenv("FRAMEWORK_CACHE_SIZE", "4"))
+    FRAMEWORK_ARCHIVE_DIR = os.getenv("FRAMEWORK_ARCHIVE_DIR", "data/framework_versions")
+    
+    # Evidence uploads (content-addressed, streamed in chunks)
+    EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", "evidence_uploads")
+    EVIDENCE_CHUNK_SIZE_KB = int(os.getenv("EVIDENCE_CHUNK_SIZE_KB", "64"))
+    MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
+    MAX_USER_STORAGE_MB = int(os.getenv("MAX_USER_STORAGE_MB", "100"))
+    EVIDENCE_INDEX_WORKERS = int(os.getenv("EVIDENCE_INDEX_WORKERS", "0"))  # 0 = one per CPU
+    EVIDENCE_TEXT_MAX_CHARS = int(os.getenv("EVIDENCE_TEXT_MAX_CHARS", "1000000"))
+    EVIDENCE_COLD_AFTER_DAYS = int(os.getenv("EVIDENCE_COLD_AFTER_DAYS", "90"))
+    EVIDENCE_DRAFT_RETENTION_DAYS = int(os.getenv("EVIDENCE_DRAFT_RETENTION_DAYS", "30"))
+    EVIDENCE_GC_BATCH_SIZE = int(os.getenv("EVIDENCE_GC_BATCH_SIZE", "500"))
     
     # Security
     SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-production")
@@ -42,6 +59,12 @@ class Config:
     PASSWORD_REQUIRE_SPECIAL = os.getenv("PASSWORD_REQUIRE_SPECIAL", "true").lower() == "true"
     PASSWORD_HISTORY_COUNT = int(os.getenv("PASSWORD_HISTORY_COUNT", "5"))
     
+    # Password Hashing (bcrypt runs on a bounded worker pool; 0 workers = CPU count - 1)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "30"))
+    
     # Account Lockout
     LOGIN_MAX_ATTEMPTS = int(os.getenv("LOGIN_MAX_ATTEMPTS", "5"))
     LOGIN_LOCKOUT_MINUTES = int(os.getenv("LOGIN_LOCKOUT_MINUTES", "30"))
@@ -68,7 +91,20 @@ class Config:
     LOG_MAX_SIZE_MB = int(os.getenv("LOG_MAX_SIZE_MB", "10"))
     LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "10"))
     LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    # Records are queued and written by one background thread; full queue drops
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Per event type sampling for structured logs, e.g. "authentication.success=0.01,security=1.0"
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
     AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "true").lower() == "true"
+    # Audit rows are written by a background thread in batches
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+    AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    AUDIT_ENQUEUE_TIMEOUT_MS = int(os.getenv("AUDIT_ENQUEUE_TIMEOUT_MS", "50"))
+    # Closed months older than AUDIT_HOT_DAYS move to compressed monthly archives
+    AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "data/audit_archive")
+    AUDIT_HOT_DAYS = int(os.getenv("AUDIT_HOT_DAYS", "90"))
+    AUDIT_ARCHIVE_BATCH_SIZE = int(os.getenv("AUDIT_ARCHIVE_BATCH_SIZE", "5000"))
     
     # Monitoring
     PROMETHEUS_ENABLED = os.getenv("PROMETHEUS_ENABLED", "false").lower() == "true"
@@ -81,6 +117,8 @@ class Config:
     RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "100"))
     AUTH_RATE_LIMIT_PER_MINUTE = int(os.getenv("AUTH_RATE_LIMIT_PER_MINUTE", "5"))
     RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    # Per-route throttles give an organization this many times a single user's budget
+    THROTTLE_ORG_MULTIPLIER = int(os.getenv("THROTTLE_ORG_MULTIPLIER", "10"))
     
     # Email
     SMTP_ENABLED = os.getenv("SMTP_ENABLED", "false").lower() == "true"
@@ -94,6 +132,7 @@ class Config:
     VIRUS_SCAN_ENABLED = os.getenv("VIRUS_SCAN_ENABLED", "false").lower() == "true"
     CLAMAV_HOST = os.getenv("CLAMAV_HOST", "localhost")
     CLAMAV_PORT = int(os.getenv("CLAMAV_PORT", "3310"))
+    CLAMAV_TIMEOUT_SECONDS = float(os.getenv("CLAMAV_TIMEOUT_SECONDS", "30"))
     
     SLACK_ENABLED = os.getenv("SLACK_ENABLED", "false").lower() == "true"
     SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
@@ -128,6 +167,11 @@ class Config:
     RESOURCE_LIMIT_MEMORY = os.getenv("RESOURCE_LIMIT_MEMORY", "512Mi")
     RESOURCE_REQUEST_MEMORY = os.getenv("RESOURCE_REQUEST_MEMORY", "256Mi")
     
+    # Startup performance
+    STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", "1500"))
+    
+    _startup_valid = None
+    
     @classmethod
     def validate(cls) -> bool:
         """Validate critical configuration"""
@@ -153,6 +197,15 @@ class Config:
         
         return True
     
+    @classmethod
+    def validate_on_startup(cls) -> bool:
+        """Validate once per process; called from app startup rather than on import"""
+        if cls._startup_valid is None:
+            cls._startup_valid = cls.validate()
+            if not cls._startup_valid:
+                logger.warning("Configuration validation failed. Check settings before deployment.")
+        return cls._startup_valid
+    
     @classmethod
     def to_dict(cls) -> dict:
         """Return configuration as dictionary (excluding secrets)"""
@@ -165,8 +218,3 @@ class Config:
             'AUDIT_LOG_ENABLED': cls.AUDIT_LOG_ENABLED,
             'GDPR_COMPLIANCE_ENABLED': cls.GDPR_COMPLIANCE_ENABLED,
         }
-
-
-# Validate configuration on import
-if not Config.validate():
-    logger.warning("Configuration validation failed. Check settings before deployment.")
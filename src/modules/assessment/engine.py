@@ -1,36 +1,190 @@
 """Assessment engine for AI Governance Pro"""
+import uuid
+from datetime import datetime
+
 import streamlit as st
 from modules.utils.session_manager import session_manager
+from modules.data.database_manager import db_manager
 from modules.assessment.framework import get_assessment_framework
-from modules.assessment.scoring_engine import calculate_maturity_score
+from modules.assessment.scoring_engine import IncrementalScorer
+from modules.utils.throttle import throttle_allows
+
+# Questions per page in paged mode; 0 shows one domain per page
+DEFAULT_QUESTIONS_PER_PAGE = 0
+
+
+def start_attempt():
+    """Give the session a fresh submission key; the next submit saves a new assessment"""
+    st.session_state.submission_key = uuid.uuid4().hex
+
+
+def _same_framework(scorer, framework):
+    """True when the scorer was built for this framework version; a recompiled
+    copy of the same version keeps the attempt (and its submission key)"""
+    if framework.version_id is None:
+        # Unversioned frameworks can only be told apart by identity
+        return scorer.framework is framework
+    return scorer.version_id == framework.version_id
+
+
+def get_live_scorer(framework):
+    """Return the session's incremental scorer, rebuilding it only when the
+    framework version or the responses dict has been replaced (new assessment, logout)"""
+    if "responses" not in st.session_state:
+        st.session_state.responses = {}
+    scorer = st.session_state.get("live_scorer")
+    if (scorer is None or not _same_framework(scorer, framework)
+            or scorer.responses is not st.session_state.responses):
+        scorer = IncrementalScorer(framework, st.session_state.responses)
+        st.session_state.live_scorer = scorer
+        st.session_state.responses = scorer.responses
+        # One key per assessment attempt, so a repeated submit is not saved twice
+        start_attempt()
+    return scorer
+
+
+def _record_answer(question_id):
+    """Radio on_change callback: apply one answer to the running totals"""
+    scorer = st.session_state.get("live_scorer")
+    if scorer is None:
+        return
+    # Radio values are the scores themselves, so no text lookup is needed
+    scorer.set_response(question_id, st.session_state.get(f"radio_{question_id}"))
 
 
 class AssessmentEngine:
+    def __init__(self, framework=None, scorer=None):
+        self.framework = framework if framework is not None else get_assessment_framework()
+        self.scorer = scorer if scorer is not None else get_live_scorer(self.framework)
+
     def render_question(self, question):
         """Render a single assessment question"""
         st.markdown(f"**{question['text']}**")
         st.caption(f"Framework: {question.get('framework', 'NIST AI RMF')}")
         
-        options = [opt["text"] for opt in question["maturity_levels"]]
-        current_response = st.session_state.responses.get(question["id"])
+        # Option labels and positions are precomputed on the compiled framework
+        info = self.framework.question(question["id"])
+        current_response = self.scorer.responses.get(question["id"])
         
-        selected = st.radio(
+        # Answers are recorded by the on_change callback, not on every rerun
+        st.radio(
             "Select maturity level:",
-            options=options,
-            index=current_response if current_response is not None else 0,
+            options=tuple(info.option_labels),
+            format_func=info.option_labels.__getitem__,
+            index=info.score_index.get(current_response),
             key=f"radio_{question['id']}",
+            on_change=_record_answer,
+            args=(question["id"],),
             label_visibility="collapsed"
         )
         
-        # Save response
-        for idx, opt in enumerate(question["maturity_levels"]):
-            if opt["text"] == selected:
-                st.session_state.responses[question["id"]] = opt["score"]
-                break
-        
         st.markdown("---")
 
 
+def _render_page_navigation(page, page_count, position):
+    """Previous/next controls for paged mode"""
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Previous", key=f"page_prev_{position}",
+                     disabled=page == 0, use_container_width=True):
+            st.session_state.assessment_page = page - 1
+            st.rerun(scope="fragment")
+    with col2:
+        st.markdown(f"<div style='text-align: center;'>Page {page + 1} of {page_count}</div>",
+                    unsafe_allow_html=True)
+    with col3:
+        if st.button("Next ▶", key=f"page_next_{position}",
+                     disabled=page >= page_count - 1, use_container_width=True):
+            st.session_state.assessment_page = page + 1
+            st.rerun(scope="fragment")
+
+
+def render_assessment_page(framework, scorer, questions_per_page=None):
+    """Render only the current page of questions (one domain or N questions)"""
+    pages = framework.question_pages(questions_per_page)
+    if not pages:
+        st.info("This framework has no questions.")
+        return
+
+    page = min(max(st.session_state.get("assessment_page", 0), 0), len(pages) - 1)
+    st.session_state.assessment_page = page
+    _render_page_navigation(page, len(pages), "top")
+
+    engine = AssessmentEngine(framework, scorer)
+
+    current_domain = None
+    for domain_id, question in pages[page]:
+        if domain_id != current_domain:
+            current_domain = domain_id
+            domain_data = framework[domain_id]
+            st.subheader(f"{domain_data['name']} ({scorer.domain_percentage(domain_id):.0f}%)")
+            st.caption(domain_data['description'])
+        engine.render_question(question)
+
+    _render_page_navigation(page, len(pages), "bottom")
+
+
+def save_submission(framework, scorer, scores):
+    """Persist the submitted assessment in one transaction; False if throttled or the save failed"""
+    user = st.session_state.get("user") or {}
+    user_id = user.get("user_id")
+    if user_id is None:
+        # Nothing to attach the assessment to (e.g. guest session)
+        return True
+    if not throttle_allows("submit"):
+        return False
+    assessment_name = f"{framework.name} - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+    assessment_id = db_manager.save_full_assessment(
+        user_id, scores, scorer.responses, framework, assessment_name,
+        submission_key=st.session_state.get("submission_key"),
+        org_id=user.get("org_id", st.session_state.get("org_id")),
+    )
+    if assessment_id is None:
+        st.error("Your assessment could not be saved. Please try submitting again.")
+        return False
+    st.session_state.assessment_id = assessment_id
+    # The key is spent: edited answers submitted later are a new assessment
+    start_attempt()
+    return True
+
+
+@st.fragment
+def _render_attempt(framework, questions_per_page):
+    """Progress, the current page of questions and Submit, in one fragment.
+
+    Answering a question reruns only this block, so the progress bar, the
+    domain percentages and the Submit button follow every answer while the
+    rest of the app is left alone.
+    """
+    # Progress indicator (read from the running totals)
+    scorer = get_live_scorer(framework)
+    total_questions = scorer.total_questions
+    answered = scorer.answered
+    progress = scorer.progress()
+    
+    st.progress(progress)
+    st.markdown(f"**Progress: {answered}/{total_questions} answered ({progress:.0%})**")
+    st.markdown("---")
+    
+    # Render the current page of questions
+    render_assessment_page(framework, scorer, questions_per_page)
+    
+    # Submit button (only show if questions answered)
+    if answered > 0:
+        st.markdown("---")
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            if st.button("✅ Submit Assessment", type="primary", use_container_width=True):
+                # Scores come straight from the running totals
+                scores = scorer.to_scores()
+                if save_submission(framework, scorer, scores):
+                    st.session_state.assessment_scores = scores
+                    st.session_state.current_page = "analytics"
+                    st.success("Assessment submitted successfully!")
+                    # Leaving the page needs the whole app
+                    st.rerun(scope="app")
+
+
 def render_assessment():
     """Render assessment with session management"""
     # Initialize session state for responses
@@ -40,7 +194,11 @@ def render_assessment():
     if not st.session_state.get("logged_in"):
         return
     """Main assessment rendering function"""
-    framework = get_assessment_framework()
+    try:
+        framework = get_assessment_framework(st.session_state.get("framework_id"))
+    except (KeyError, ValueError) as e:
+        st.error(f"The selected assessment framework could not be loaded: {str(e)}")
+        return
     
     # Header with navigation
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -48,13 +206,7 @@ def render_assessment():
         st.markdown('<div style="text-align: center; font-size: 2.5rem; font-weight: 700; background: linear-gradient(135deg, #2563eb, #7c3aed); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">AI Governance Pro</div>', unsafe_allow_html=True)
         st.caption("Enterprise AI Risk Management Assessment")
     
-    # Progress indicator
-    total_questions = sum(len(domain["questions"]) for domain in framework.values())
-    answered = len([r for r in st.session_state.responses.values() if r is not None])
-    progress = answered / total_questions if total_questions > 0 else 0
-    
-    st.progress(progress)
-    st.markdown(f"**Progress: {answered}/{total_questions} answered ({progress:.0%})**")
+    scorer = get_live_scorer(framework)
     
     # Navigation and logout
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -67,7 +219,7 @@ def render_assessment():
     
     with col3:
         if st.button("📊 View Results", use_container_width=True, type="secondary"):
-            if answered > 0:
+            if scorer.answered > 0:
                 st.session_state.current_page = "analytics"
                 st.rerun()
             else:
@@ -75,25 +227,8 @@ def render_assessment():
     
     st.markdown("---")
     
-    # Render questions
-    engine = AssessmentEngine()
-    for domain_id, domain_data in framework.items():
-        with st.expander(f"**{domain_data['name']}** - {domain_data['description']}", expanded=True):
-            for question in domain_data["questions"]:
-                engine.render_question(question)
-    
-    # Submit button (only show if questions answered)
-    if answered > 0:
-        st.markdown("---")
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button("✅ Submit Assessment", type="primary", use_container_width=True):
-                # Calculate scores
-                scores = calculate_maturity_score(st.session_state.responses, framework)
-                st.session_state.assessment_scores = scores
-                st.session_state.current_page = "analytics"
-                st.success("Assessment submitted successfully!")
-                st.rerun()
+    questions_per_page = st.session_state.get("questions_per_page", DEFAULT_QUESTIONS_PER_PAGE)
+    _render_attempt(framework, questions_per_page)
 
 
 def show_assessment_results():
@@ -123,6 +258,7 @@ def show_assessment_results():
         if st.button("📝 Retake", use_container_width=True):
             st.session_state.responses = {}
             st.session_state.assessment_scores = None
+            st.session_state.assessment_page = 0
             st.session_state.current_page = "assessment"
             st.rerun()
     
@@ -165,6 +301,7 @@ def show_assessment_results():
         if st.button("🔄 New Assessment", use_container_width=True):
             st.session_state.responses = {}
             st.session_state.assessment_scores = None
+            st.session_state.assessment_page = 0
             st.session_state.current_page = "assessment"
             st.rerun()
     with col3:
@@ -1,52 +1,234 @@
 """Assessment framework loader for AI Governance Pro"""
-import json
 import os
+import logging
+from collections import namedtuple
+from collections.abc import Mapping
+from types import MappingProxyType
 
-def get_assessment_framework():
-    """Load comprehensive assessment framework from JSON"""
-    framework_path = os.path.join(os.path.dirname(__file__), 'frameworks', 'nist_rmf_enhanced.json')
-    
-    try:
-        with open(framework_path, 'r', encoding='utf-8') as f:
-            framework = json.load(f)
-        
-        # Validate framework structure
-        required_domains = ['governance_strategy', 'risk_management', 'lifecycle_management', 
-                           'transparency_explainability', 'compliance_ethics']
-        
-        for domain in required_domains:
+logger = logging.getLogger(__name__)
+
+FRAMEWORK_DIR = os.path.join(os.path.dirname(__file__), 'frameworks')
+DEFAULT_FRAMEWORK_ID = 'nist_rmf_enhanced'
+DEFAULT_FRAMEWORK_PATH = os.path.join(FRAMEWORK_DIR, f'{DEFAULT_FRAMEWORK_ID}.json')
+
+# Top-level keys starting with this prefix hold metadata, not domains
+META_KEY = '_meta'
+
+REQUIRED_DOMAINS = ['governance_strategy', 'risk_management', 'lifecycle_management',
+                    'transparency_explainability', 'compliance_ethics']
+
+DEFAULT_QUESTION_MAX = 5
+
+# Hex digits of the content hash kept in versioned framework ids
+VERSION_HASH_LENGTH = 12
+
+# Per-question lookups precomputed at compile time:
+# option_scores maps option text -> score, option_labels maps score -> text
+# (in display order) and score_index maps score -> position in option_labels
+QuestionInfo = namedtuple('QuestionInfo', ['domain_id', 'max_score', 'option_scores',
+                                           'option_labels', 'score_index'])
+
+FALLBACK_FRAMEWORK = {
+    "governance_strategy": {
+        "name": "Governance & Strategy",
+        "description": "Executive oversight and policies",
+        "questions": [
+            {
+                "id": "GOV_01",
+                "text": "Emergency fallback question",
+                "framework": "Fallback",
+                "maturity_levels": [
+                    {"score": 0, "text": "Not started"},
+                    {"score": 1, "text": "Initial"},
+                    {"score": 2, "text": "Developing"},
+                    {"score": 3, "text": "Established"},
+                    {"score": 4, "text": "Advanced"},
+                    {"score": 5, "text": "Optimized"}
+                ]
+            }
+        ]
+    }
+}
+
+
+def _freeze(value):
+    """Recursively convert parsed JSON into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class CompiledFramework(Mapping):
+    """Read-only framework with precomputed question lookups.
+
+    Behaves like the original ``{domain_id: domain_data}`` dict so existing
+    callers keep working, but is safe to share between sessions.
+    """
+
+    def __init__(self, data, source_path=None, mtime=None, framework_id=None, content_hash=None):
+        self._domains = _freeze({key: value for key, value in data.items() if not key.startswith('_')})
+        self.meta = _freeze(data.get(META_KEY, {}))
+        self.source_path = source_path
+        self.mtime = mtime
+        self.framework_id = framework_id
+        self.content_hash = content_hash
+
+        questions = {}
+        domain_questions = {}
+        domain_max_scores = {}
+        for domain_id, domain_data in self._domains.items():
+            entries = []
+            for question in domain_data.get('questions', ()):
+                levels = question.get('maturity_levels', ())
+                if levels:
+                    max_score = max(level.get('score', 0) for level in levels)
+                else:
+                    max_score = DEFAULT_QUESTION_MAX
+                option_scores = MappingProxyType(
+                    {level['text']: level.get('score', 0) for level in levels}
+                )
+                option_labels = MappingProxyType(
+                    {level.get('score', 0): level['text'] for level in levels}
+                )
+                score_index = MappingProxyType(
+                    {score: position for position, score in enumerate(option_labels)}
+                )
+                questions[question['id']] = QuestionInfo(domain_id, max_score, option_scores,
+                                                         option_labels, score_index)
+                entries.append((question['id'], max_score))
+            domain_questions[domain_id] = tuple(entries)
+            domain_max_scores[domain_id] = sum(max_score for _, max_score in entries)
+
+        self.questions = MappingProxyType(questions)
+        self.domain_questions = MappingProxyType(domain_questions)
+        self.domain_max_scores = MappingProxyType(domain_max_scores)
+        self.question_ids = tuple(questions)
+        self.total_questions = sum(len(entries) for entries in domain_questions.values())
+        self._pages = {}
+
+    def __getitem__(self, domain_id):
+        return self._domains[domain_id]
+
+    def __iter__(self):
+        return iter(self._domains)
+
+    def __len__(self):
+        return len(self._domains)
+
+    @property
+    def name(self):
+        return self.meta.get('name', self.framework_id or 'Assessment Framework')
+
+    @property
+    def version_id(self):
+        """Versioned framework id stored with assessments, e.g. ``nist_rmf_enhanced@3fa2b1c9d0e4``"""
+        if self.framework_id is None or self.content_hash is None:
+            return self.framework_id
+        return make_version_id(self.framework_id, self.content_hash)
+
+    def question(self, question_id):
+        """Return the QuestionInfo for a question id, or None"""
+        return self.questions.get(question_id)
+
+    def question_pages(self, per_page=None):
+        """Split questions into pages of ``(domain_id, question)`` entries.
+
+        With no per_page each domain is one page; otherwise pages hold
+        per_page questions and may span domains. Pages are memoized.
+        """
+        key = per_page or 0
+        pages = self._pages.get(key)
+        if pages is None:
+            if not per_page:
+                pages = tuple(
+                    tuple((domain_id, question) for question in domain_data.get('questions', ()))
+                    for domain_id, domain_data in self._domains.items()
+                )
+            else:
+                entries = [(domain_id, question)
+                           for domain_id, domain_data in self._domains.items()
+                           for question in domain_data.get('questions', ())]
+                pages = tuple(tuple(entries[start:start + per_page])
+                              for start in range(0, len(entries), per_page))
+            pages = tuple(page for page in pages if page)
+            self._pages[key] = pages
+        return pages
+
+    def option_score(self, question_id, option_text):
+        """Map a selected option text back to its score"""
+        info = self.questions.get(question_id)
+        if info is None:
+            return None
+        return info.option_scores.get(option_text)
+
+
+_fallback_framework = None
+
+
+def make_version_id(framework_id, content_hash):
+    """Build the versioned id recorded with each assessment"""
+    return f"{framework_id}@{content_hash[:VERSION_HASH_LENGTH]}"
+
+
+def split_version_id(version_id):
+    """Split ``framework_id@hash`` into its parts; hash is None for bare ids"""
+    framework_id, _, content_hash = version_id.partition('@')
+    return framework_id, content_hash or None
+
+
+def validate_framework(framework, framework_id=None):
+    """Validate framework structure"""
+    if framework_id == DEFAULT_FRAMEWORK_ID:
+        for domain in REQUIRED_DOMAINS:
             if domain not in framework:
                 raise ValueError(f"Missing domain: {domain}")
-        
-        total_questions = sum(len(domain_data['questions']) for domain_data in framework.values())
-        print(f"✅ Framework loaded: {len(framework)} domains, {total_questions} questions")
-        
-        return framework
-        
+
+    domains = [key for key in framework if not key.startswith('_')]
+    if not domains:
+        raise ValueError("Framework defines no domains")
+    for domain in domains:
+        questions = framework[domain].get('questions')
+        if not isinstance(questions, list):
+            raise ValueError(f"Domain {domain} has no questions list")
+        for question in questions:
+            if 'id' not in question or 'maturity_levels' not in question:
+                raise ValueError(f"Malformed question in domain {domain}")
+
+
+def load_framework(path=DEFAULT_FRAMEWORK_PATH):
+    """Return the compiled framework at path, recompiling only when the file changes"""
+    from modules.assessment.registry import framework_registry
+    return framework_registry.get_by_path(path)
+
+
+def clear_framework_cache():
+    """Drop all compiled frameworks (mainly for tests)"""
+    from modules.assessment.registry import framework_registry
+    framework_registry.clear_cache()
+
+
+def get_assessment_framework(framework_id=None):
+    """Load an assessment framework by id or versioned id (defaults to NIST AI RMF).
+
+    Only the default framework falls back to a minimal built-in one when it
+    cannot be loaded. Any other id, and any versioned id, raises (KeyError for
+    an unknown id or version), so stored assessments are never scored against
+    the wrong framework.
+    """
+    global _fallback_framework
+    from modules.assessment.registry import framework_registry
+    framework_id = framework_id or DEFAULT_FRAMEWORK_ID
+    if framework_id != DEFAULT_FRAMEWORK_ID:
+        return framework_registry.get(framework_id)
+    try:
+        return framework_registry.get(framework_id)
     except Exception as e:
-        print(f"❌ Error loading framework: {e}")
-        # Fallback to minimal framework
-        return {
-            "governance_strategy": {
-                "name": "Governance & Strategy",
-                "description": "Executive oversight and policies",
-                "questions": [
-                    {
-                        "id": "GOV_01",
-                        "text": "Emergency fallback question",
-                        "framework": "Fallback",
-                        "maturity_levels": [
-                            {"score": 0, "text": "Not started"},
-                            {"score": 1, "text": "Initial"},
-                            {"score": 2, "text": "Developing"},
-                            {"score": 3, "text": "Established"},
-                            {"score": 4, "text": "Advanced"},
-                            {"score": 5, "text": "Optimized"}
-                        ]
-                    }
-                ]
-            }
-        }
+        logger.error(f"Error loading framework {framework_id}, using the fallback framework: {str(e)}")
+        if _fallback_framework is None:
+            _fallback_framework = CompiledFramework(FALLBACK_FRAMEWORK)
+        return _fallback_framework
 
 # Test the framework loader
 if __name__ == "__main__":
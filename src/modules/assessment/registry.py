@@ -0,0 +1,222 @@
+"""Framework registry for AI Governance Pro
+
+Discovers every framework JSON file, indexes only file metadata up front and
+compiles a framework the first time it is requested. Compiled frameworks are
+kept in a bounded LRU cache keyed by content hash, and every version seen is
+snapshotted to disk so historical assessments can be re-scored against the
+exact framework they were taken on.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from modules.assessment.framework import (
+    FRAMEWORK_DIR,
+    CompiledFramework,
+    make_version_id,
+    split_version_id,
+    validate_framework,
+)
+
+try:
+    from config.config import Config
+    DEFAULT_CACHE_SIZE = Config.FRAMEWORK_CACHE_SIZE
+    DEFAULT_ARCHIVE_DIR = Config.FRAMEWORK_ARCHIVE_DIR
+except ImportError:
+    DEFAULT_CACHE_SIZE = int(os.getenv("FRAMEWORK_CACHE_SIZE", "4"))
+    DEFAULT_ARCHIVE_DIR = os.getenv("FRAMEWORK_ARCHIVE_DIR", "data/framework_versions")
+
+logger = logging.getLogger(__name__)
+
+FrameworkInfo = namedtuple('FrameworkInfo', ['framework_id', 'path', 'content_hash', 'size', 'mtime'])
+
+
+class FrameworkRegistry:
+    """Lazy, versioned registry of assessment frameworks"""
+
+    def __init__(self, framework_dir=FRAMEWORK_DIR, archive_dir=DEFAULT_ARCHIVE_DIR,
+                 max_loaded=DEFAULT_CACHE_SIZE):
+        self.framework_dir = framework_dir
+        self.archive_dir = archive_dir
+        self.max_loaded = max(1, max_loaded)
+        self._index = {}
+        self._paths = {}
+        self._loaded = OrderedDict()
+        self._lock = threading.RLock()
+        self._discovered = False
+        self.hits = 0
+        self.misses = 0
+
+    def discover(self):
+        """Index metadata for every framework file without parsing it"""
+        with self._lock:
+            index = {}
+            for name in sorted(os.listdir(self.framework_dir)):
+                if not name.endswith('.json'):
+                    continue
+                framework_id = os.path.splitext(name)[0]
+                path = os.path.join(self.framework_dir, name)
+                index[framework_id] = self._describe(path, self._index.get(framework_id), archive=True)
+            self._index = index
+            self._discovered = True
+            logger.info(f"Framework registry indexed {len(index)} frameworks")
+            return list(index.values())
+
+    def list_frameworks(self):
+        """Return FrameworkInfo for every discovered framework"""
+        with self._lock:
+            if not self._discovered:
+                self.discover()
+            return list(self._index.values())
+
+    def info(self, framework_id):
+        """Return current FrameworkInfo for a framework, re-hashing it if the file changed"""
+        with self._lock:
+            if not self._discovered:
+                self.discover()
+            info = self._index.get(framework_id)
+            if info is None:
+                # A file may have been added since discovery
+                self.discover()
+                info = self._index.get(framework_id)
+                if info is None:
+                    raise KeyError(f"Unknown framework: {framework_id}")
+            info = self._describe(info.path, info, archive=True)
+            self._index[framework_id] = info
+            return info
+
+    def version_id(self, framework_id):
+        """Return the versioned id of the current file, e.g. ``iso_42001@1f0c6d2e9ab4``"""
+        info = self.info(framework_id)
+        return make_version_id(info.framework_id, info.content_hash)
+
+    def get(self, framework_or_version_id):
+        """Return a compiled framework by id (current version) or versioned id (exact version)"""
+        framework_id, wanted_hash = split_version_id(framework_or_version_id)
+        info = self.info(framework_id)
+        if wanted_hash is None or info.content_hash.startswith(wanted_hash):
+            return self._load(info)
+        return self._load_archived(framework_id, wanted_hash)
+
+    def get_by_path(self, path):
+        """Return the compiled framework stored at an arbitrary path"""
+        with self._lock:
+            info = self._describe(path, self._paths.get(path), archive=False)
+            self._paths[path] = info
+            return self._load(info)
+
+    def clear_cache(self):
+        """Drop compiled frameworks and path metadata"""
+        with self._lock:
+            self._loaded.clear()
+            self._paths.clear()
+
+    def cache_info(self):
+        """Return cache statistics"""
+        with self._lock:
+            return {
+                'loaded': len(self._loaded),
+                'max_loaded': self.max_loaded,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _describe(self, path, previous=None, archive=False):
+        """Stat a framework file and hash its bytes only when it changed"""
+        stat = os.stat(path)
+        if previous is not None and previous.mtime == stat.st_mtime_ns and previous.size == stat.st_size:
+            return previous
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        framework_id = os.path.splitext(os.path.basename(path))[0]
+        content_hash = hashlib.sha256(raw).hexdigest()
+        if archive:
+            self._archive(framework_id, content_hash, raw)
+        return FrameworkInfo(framework_id, path, content_hash, stat.st_size, stat.st_mtime_ns)
+
+    def _archive(self, framework_id, content_hash, raw):
+        """Snapshot a framework version so it stays loadable after the file changes"""
+        snapshot_dir = os.path.join(self.archive_dir, framework_id)
+        snapshot_path = os.path.join(snapshot_dir, f"{content_hash}.json")
+        if os.path.exists(snapshot_path):
+            return
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+            tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, snapshot_path)
+            logger.info(f"Archived framework version {make_version_id(framework_id, content_hash)}")
+        except OSError as e:
+            logger.warning(f"Could not archive framework {framework_id}: {e}")
+
+    def _load(self, info):
+        """Compile the file described by info, or return it from the LRU cache"""
+        key = (info.framework_id, info.content_hash)
+        with self._lock:
+            compiled = self._loaded.get(key)
+            if compiled is not None:
+                self._loaded.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+            with open(info.path, 'rb') as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if content_hash != info.content_hash:
+                # File changed between stat and read; compile what we actually read
+                info = info._replace(content_hash=content_hash)
+                key = (info.framework_id, content_hash)
+            return self._store(key, self._compile(info.framework_id, raw, info.path, info.mtime, content_hash))
+
+    def _load_archived(self, framework_id, hash_prefix):
+        """Load a historical framework version from the snapshot archive"""
+        with self._lock:
+            for key, compiled in self._loaded.items():
+                if key[0] == framework_id and key[1].startswith(hash_prefix):
+                    self._loaded.move_to_end(key)
+                    self.hits += 1
+                    return compiled
+            self.misses += 1
+
+            snapshot_dir = os.path.join(self.archive_dir, framework_id)
+            matches = []
+            if os.path.isdir(snapshot_dir):
+                matches = [name for name in os.listdir(snapshot_dir)
+                           if name.startswith(hash_prefix) and name.endswith('.json')]
+            if len(matches) != 1:
+                raise KeyError(f"Framework version not found: {make_version_id(framework_id, hash_prefix)}")
+
+            path = os.path.join(snapshot_dir, matches[0])
+            with open(path, 'rb') as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if not content_hash.startswith(hash_prefix):
+                raise ValueError(f"Archived framework {path} failed checksum verification")
+            compiled = self._compile(framework_id, raw, path, os.stat(path).st_mtime_ns, content_hash)
+            return self._store((framework_id, content_hash), compiled)
+
+    def _compile(self, framework_id, raw, path, mtime, content_hash):
+        data = json.loads(raw)
+        validate_framework(data, framework_id)
+        compiled = CompiledFramework(data, source_path=path, mtime=mtime,
+                                     framework_id=framework_id, content_hash=content_hash)
+        print(f"✅ Framework loaded: {compiled.version_id} - {len(compiled)} domains, "
+              f"{compiled.total_questions} questions")
+        return compiled
+
+    def _store(self, key, compiled):
+        self._loaded[key] = compiled
+        self._loaded.move_to_end(key)
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+        return compiled
+
+
+# Global registry shared by all sessions
+framework_registry = FrameworkRegistry()
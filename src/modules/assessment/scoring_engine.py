@@ -1,31 +1,42 @@
+from collections import namedtuple
+
+import numpy as np
+
+from modules.assessment.framework import CompiledFramework
+
+# Lower bounds (percent) of each maturity level above 'Not Started'
+MATURITY_THRESHOLDS = (16, 31, 51, 76, 91)
+MATURITY_LEVELS = ('Not Started', 'Initial', 'Developing', 'Established', 'Advanced', 'Optimized')
+
+# Array results of a batch scoring pass; rows are assessments, domain columns follow domain_ids
+BatchScores = namedtuple('BatchScores', [
+    'domain_ids', 'domain_raw', 'domain_max', 'domain_percentage', 'domain_answered', 'domain_levels',
+    'overall_raw', 'overall_max', 'overall_percentage', 'overall_levels', 'questions_answered',
+])
+
+
 def calculate_maturity_score(responses, framework):
     """Calculate maturity scores based on framework and responses"""
+    if not isinstance(framework, CompiledFramework):
+        framework = CompiledFramework(framework)
+
     total_score = 0
     max_possible_score = 0
     domain_scores = {}
     
-    # Framework is a flat dict: {domain_id: domain_data}
+    # Framework is a flat mapping: {domain_id: domain_data}
     for domain_id, domain_data in framework.items():
         domain_total = 0
-        domain_max = 0
+        domain_max = framework.domain_max_scores[domain_id]
         questions_answered = 0
         
-        for question in domain_data.get('questions', []):
-            q_id = question['id']
-            # Get maturity levels to determine max score
-            maturity_levels = question.get('maturity_levels', [])
-            if maturity_levels:
-                q_max = max(level.get('score', 0) for level in maturity_levels)
-            else:
-                q_max = 5  # Default max
-            
-            domain_max += q_max
-            
+        for q_id, q_max in framework.domain_questions[domain_id]:
             # Get user's response
-            if q_id in responses and responses[q_id] is not None:
-                domain_total += responses[q_id]
+            score = responses.get(q_id)
+            if score is not None:
+                domain_total += score
                 questions_answered += 1
-                total_score += responses[q_id]
+                total_score += score
                 max_possible_score += q_max
         
         # Calculate domain percentage
@@ -59,6 +70,97 @@ def calculate_maturity_score(responses, framework):
     
 
 
+class IncrementalScorer:
+    """Running per-domain totals kept in session state.
+
+    Each answer change updates the totals in O(1); progress, live domain
+    percentages and the final score dict are read from the totals instead of
+    rescanning every response.
+    """
+
+    def __init__(self, framework, responses=None):
+        if not isinstance(framework, CompiledFramework):
+            framework = CompiledFramework(framework)
+        self.framework = framework
+        self.version_id = framework.version_id
+        self.responses = {}
+        self.domain_totals = dict.fromkeys(framework, 0)
+        self.domain_answered = dict.fromkeys(framework, 0)
+        self.total_score = 0
+        self.answered_max = 0
+        for question_id, score in (responses or {}).items():
+            self.set_response(question_id, score)
+
+    def set_response(self, question_id, score):
+        """Record (or clear, with None) the score for one question"""
+        info = self.framework.question(question_id)
+        if info is None:
+            return False
+
+        previous = self.responses.get(question_id)
+        if previous is not None:
+            self.domain_totals[info.domain_id] -= previous
+            self.domain_answered[info.domain_id] -= 1
+            self.total_score -= previous
+            self.answered_max -= info.max_score
+
+        if score is None:
+            self.responses.pop(question_id, None)
+        else:
+            self.responses[question_id] = score
+            self.domain_totals[info.domain_id] += score
+            self.domain_answered[info.domain_id] += 1
+            self.total_score += score
+            self.answered_max += info.max_score
+        return True
+
+    @property
+    def answered(self):
+        return len(self.responses)
+
+    @property
+    def total_questions(self):
+        return self.framework.total_questions
+
+    def progress(self):
+        """Fraction of questions answered (0-1)"""
+        total = self.framework.total_questions
+        return self.answered / total if total > 0 else 0
+
+    def domain_percentage(self, domain_id):
+        domain_max = self.framework.domain_max_scores[domain_id]
+        return (self.domain_totals[domain_id] / domain_max * 100) if domain_max > 0 else 0
+
+    def overall_percentage(self):
+        return (self.total_score / self.answered_max * 100) if self.answered_max > 0 else 0
+
+    def to_scores(self):
+        """Build the same result dict as calculate_maturity_score from the running totals"""
+        domain_scores = {}
+        for domain_id, domain_data in self.framework.items():
+            domain_percentage = self.domain_percentage(domain_id)
+            domain_scores[domain_id] = {
+                'name': domain_data.get('name', domain_id),
+                'raw_score': self.domain_totals[domain_id],
+                'max_score': self.framework.domain_max_scores[domain_id],
+                'raw_percentage': domain_percentage,
+                'questions_answered': self.domain_answered[domain_id],
+                'maturity_level': get_maturity_level(domain_percentage)
+            }
+
+        overall_percentage = self.overall_percentage()
+        return {
+            'overall': {
+                'raw_score': self.total_score,
+                'max_score': self.answered_max,
+                'percentage': overall_percentage,
+                'questions_answered': self.answered,
+                'maturity_level': get_maturity_level(overall_percentage)
+            },
+            'domains': domain_scores
+        }
+
+
 def get_maturity_level(percentage):
     """
     Convert percentage to maturity level (0-5 scale)
@@ -89,3 +191,153 @@ def get_maturity_level(percentage):
         return 'Initial'
     else:
         return 'Not Started'
+
+
+def maturity_level_indexes(percentages):
+    """Vectorized get_maturity_level: return indexes into MATURITY_LEVELS"""
+    return np.searchsorted(MATURITY_THRESHOLDS, percentages, side='right')
+
+
+def _pack_responses(responses_list, column_ids):
+    """Pack response dicts into a (questions x assessments) value matrix and answered mask.
+
+    Rows follow column_ids. The matrix is filled in one np.fromiter pass of
+    exactly its size; missing and None responses become NaN while packing and
+    are then masked out as unanswered.
+    """
+    shape = (len(column_ids), len(responses_list))
+    cells = shape[0] * shape[1]
+    nan = np.nan
+    try:
+        values = np.fromiter((responses.get(q_id, nan) for q_id in column_ids for responses in responses_list),
+                             dtype=np.float64, count=cells)
+    except TypeError:
+        # np.fromiter rejects None answers; np.array turns them into NaN
+        values = np.array([responses.get(q_id) for q_id in column_ids for responses in responses_list],
+                          dtype=np.float64)
+    values = values.reshape(shape)
+
+    answered = ~np.isnan(values)
+    values[~answered] = 0
+    return values, answered
+
+
+def _segment_sums(matrix, starts, dtype, in_order=False):
+    """Sum matrix rows per segment; starts[d] is segment d's first row, empty segments sum to zero.
+
+    np.add.reduceat is used unless in_order is set: it may add a segment
+    pairwise, which only matters for fractional floats. in_order adds rows one
+    after another with np.add.accumulate, as calculate_maturity_score does.
+    """
+    sums = np.zeros((len(starts), matrix.shape[1]), dtype=dtype)
+    ends = np.append(starts[1:], matrix.shape[0]).astype(np.intp)
+    non_empty = ends > starts
+    if not non_empty.any():
+        return sums
+    if in_order:
+        for d in np.flatnonzero(non_empty):
+            sums[d] = np.add.accumulate(matrix[starts[d]:ends[d]], axis=0, dtype=dtype)[-1]
+    else:
+        sums[non_empty] = np.add.reduceat(matrix, starts[non_empty], axis=0, dtype=dtype)
+    return sums
+
+
+def score_batch(responses_list, framework):
+    """Score many response sets in one vectorized pass and return BatchScores arrays.
+
+    Integer scores (what the UI stores) sum exactly in any order and go
+    through np.add.reduceat; fractional ones are summed in framework order,
+    the order calculate_maturity_score adds them. Either way every value is
+    bit-for-bit equal to the per-assessment result.
+    """
+    if not isinstance(framework, CompiledFramework):
+        framework = CompiledFramework(framework)
+    domain_ids = list(framework)
+    column_ids = [q_id for d in domain_ids for q_id, _ in framework.domain_questions[d]]
+    question_max = np.asarray([q_max for d in domain_ids for _, q_max in framework.domain_questions[d]]
+                              or [0])
+    max_dtype = question_max.dtype
+    sizes = [len(framework.domain_questions[d]) for d in domain_ids]
+    starts = np.cumsum([0] + sizes[:-1], dtype=np.intp) if sizes else np.zeros(0, dtype=np.intp)
+
+    values, answered = _pack_responses(responses_list, column_ids)
+    in_order = not np.array_equal(values, np.floor(values))
+    domain_raw = _segment_sums(values, starts, values.dtype, in_order).T
+    domain_answered = _segment_sums(answered, starts, np.int64).T
+    # The whole framework as one segment gives the overall totals
+    whole = np.zeros(1, dtype=np.intp)
+    overall_raw = _segment_sums(values, whole, values.dtype, in_order)[0]
+    overall_max = _segment_sums(answered * question_max[:len(column_ids), None], whole, max_dtype)[0]
+
+    if np.array_equal(overall_raw, np.floor(overall_raw)) and np.array_equal(domain_raw, np.floor(domain_raw)):
+        # Integer scores (what the UI stores) sum exactly in float64; report them as ints
+        domain_raw = domain_raw.astype(np.int64)
+        overall_raw = overall_raw.astype(np.int64)
+
+    domain_max = np.array([framework.domain_max_scores[d] for d in domain_ids], dtype=max_dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        domain_percentage = np.where(domain_max > 0, domain_raw / domain_max * 100, 0.0)
+        overall_percentage = np.where(overall_max > 0, overall_raw / overall_max * 100, 0.0)
+
+    return BatchScores(
+        domain_ids=domain_ids,
+        domain_raw=domain_raw,
+        domain_max=domain_max,
+        domain_percentage=domain_percentage,
+        domain_answered=domain_answered,
+        domain_levels=maturity_level_indexes(domain_percentage),
+        overall_raw=overall_raw,
+        overall_max=overall_max,
+        overall_percentage=overall_percentage,
+        overall_levels=maturity_level_indexes(overall_percentage),
+        questions_answered=np.array([len(responses) for responses in responses_list], dtype=np.int64),
+    )
+
+
+def calculate_maturity_scores_batch(responses_list, framework):
+    """Batch version of calculate_maturity_score.
+
+    Args:
+        responses_list: Sequence of {question_id: score} dicts
+        framework: CompiledFramework or raw framework dict
+
+    Returns:
+        list: One result dict per response set, identical to calculate_maturity_score
+    """
+    if not isinstance(framework, CompiledFramework):
+        framework = CompiledFramework(framework)
+    if not responses_list:
+        return []
+
+    batch = score_batch(responses_list, framework)
+    names = [framework[d].get('name', d) for d in batch.domain_ids]
+    domain_entries = list(zip(batch.domain_ids, names, batch.domain_max.tolist()))
+    levels = MATURITY_LEVELS
+
+    results = []
+    rows = zip(batch.domain_raw.tolist(), batch.domain_percentage.tolist(), batch.domain_answered.tolist(),
+               batch.domain_levels.tolist(), batch.overall_raw.tolist(), batch.overall_max.tolist(),
+               batch.overall_percentage.tolist(), batch.overall_levels.tolist(),
+               batch.questions_answered.tolist())
+    for d_raw, d_pct, d_answered, d_levels, o_raw, o_max, o_pct, o_level, answered in rows:
+        domain_scores = {}
+        for (domain_id, name, d_max), raw, pct, count, level in zip(domain_entries, d_raw, d_pct, d_answered, d_levels):
+            domain_scores[domain_id] = {
+                'name': name,
+                'raw_score': raw,
+                'max_score': d_max,
+                'raw_percentage': pct if d_max > 0 else 0,
+                'questions_answered': count,
+                'maturity_level': levels[level]
+            }
+        results.append({
+            'overall': {
+                'raw_score': o_raw,
+                'max_score': o_max,
+                'percentage': o_pct if o_max > 0 else 0,
+                'questions_answered': answered,
+                'maturity_level': levels[o_level]
+            },
+            'domains': domain_scores
+        })
+    return results
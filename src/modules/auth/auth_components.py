@@ -1,10 +1,22 @@
 """Authentication components for AI Governance Pro"""
 import streamlit as st
-from modules.auth.auth_manager import auth_manager
+from modules.auth.auth_manager import (
+    auth_manager, LOGIN_BUSY, LOGIN_ERROR, LOGIN_INACTIVE, LOGIN_INVALID_PASSWORD, LOGIN_LOCKED, LOGIN_NOT_FOUND,
+)
 from modules.utils.shared_navigation import navigate_to, login_user
 from modules.utils.password_validator import PasswordValidator
 from modules.utils.audit_logger import AuditLogger
 from modules.utils.rate_limiter import RateLimiter
+from modules.utils.throttle import throttle_allows
+
+# Messages for failed LoginResult statuses
+LOGIN_ERRORS = {
+    LOGIN_NOT_FOUND: "❌ Email not registered. Please sign up or reset your password.",
+    LOGIN_INACTIVE: "❌ This account has been deactivated. Please contact your administrator.",
+    LOGIN_LOCKED: "❌ Account locked due to multiple failed attempts. Please try again later or reset your password.",
+    LOGIN_INVALID_PASSWORD: "❌ Incorrect password for this account",
+    LOGIN_ERROR: "❌ Unable to verify your credentials. Please reset your password.",
+}
 
 def render_login_page():
     """Professional login page with enterprise design"""
@@ -106,23 +118,19 @@ def render_login_page():
                             {'email': email, 'reason': 'too_many_attempts'}
                         )
                     else:
-                        # Distinguish between unknown email and incorrect password
-                        if not auth_manager.get_user(email):
-                            st.error("❌ Email not registered. Please sign up or reset your password.")
-                            AuditLogger.log_authentication(email, False)
-                        elif auth_manager.is_account_locked(email):
-                            st.error("❌ Account locked due to multiple failed attempts. Please try again later or reset your password.")
-                            AuditLogger.log_authentication(email, False)
+                        result = auth_manager.login(email, password)
+                        if result.ok:
+                            RateLimiter.reset_attempts(email)
+                            AuditLogger.log_authentication(email, True)
+                            login_user(result.user)
+                        elif result.status == LOGIN_BUSY:
+                            st.warning("⏳ Sign-in is busy right now. Please try again in a moment.")
                         else:
-                            user = auth_manager.authenticate(email, password)
-                            if user:
-                                RateLimiter.reset_attempts(email)
-                                AuditLogger.log_authentication(email, True)
-                                login_user(user)
-                            else:
+                            if result.failed_attempts:
+                                # A wrong password (possibly the one that just locked the account)
                                 RateLimiter.record_failed_attempt(email)
-                                st.error("❌ Incorrect password for this account")
-                                AuditLogger.log_authentication(email, False)
+                            st.error(LOGIN_ERRORS[result.status])
+                            AuditLogger.log_authentication(email, False)
                 else:
                     st.error("❌ Please enter both email and password")
         
@@ -133,7 +141,7 @@ def render_login_page():
             if st.button("Send reset token", key="send_reset_token"):
                 if not fp_email:
                     st.error("❌ Enter your email to receive a reset token")
-                else:
+                elif throttle_allows("password_reset", subject=fp_email):
                     token, err = auth_manager.create_password_reset_token(fp_email)
                     if err == 'not_found':
                         st.error("❌ Email not found. Please register first.")
@@ -152,9 +160,11 @@ def render_login_page():
                     st.error("❌ Provide token and new password (and confirm it)")
                 elif rt_password != rt_confirm:
                     st.error("❌ Passwords do not match")
-                else:
+                elif throttle_allows("password_reset"):
                     ok, reason = auth_manager.reset_password(rt_token, rt_password)
-                    if ok:
+                    if reason == 'busy':
+                        st.warning("⏳ Server is busy, please try again in a moment.")
+                    elif ok:
                         st.success("✅ Password has been reset. Please login with your new password.")
                         AuditLogger.log_security_event('password_reset_completed', 'info', {'token': rt_token})
                     else:
@@ -224,6 +234,9 @@ def render_registration_page():
                 st.error(f"❌ {message}")
                 return False
             
+            if not throttle_allows("registration", subject=email):
+                return False
+            
             # Create account
             try:
                 success, message = auth_manager.create_user(
@@ -343,17 +356,13 @@ def render_login_page():
             
             if login_submitted:
                 if email and password:
-                    # Distinguish email not found vs wrong password
-                    if not auth_manager.get_user(email):
-                        st.error("❌ Email not registered. Please sign up or reset your password.")
-                    elif auth_manager.is_account_locked(email):
-                        st.error("❌ Account locked due to failed attempts. Reset your password or try later.")
+                    result = auth_manager.login(email, password)
+                    if result.ok:
+                        login_user(result.user)
+                    elif result.status == LOGIN_BUSY:
+                        st.warning("⏳ Sign-in is busy right now. Please try again in a moment.")
                     else:
-                        user = auth_manager.authenticate(email, password)
-                        if user:
-                            login_user(user)
-                        else:
-                            st.error("❌ Incorrect password for this account")
+                        st.error(LOGIN_ERRORS[result.status])
                 else:
                     st.error("❌ Please enter both email and password")
         
@@ -364,7 +373,7 @@ def render_login_page():
             if st.button("Send reset token", key="send_reset_token_2"):
                 if not fp_email:
                     st.error("❌ Enter your email to receive a reset token")
-                else:
+                elif throttle_allows("password_reset", subject=fp_email):
                     token, err = auth_manager.create_password_reset_token(fp_email)
                     if err == 'not_found':
                         st.error("❌ Email not found. Please register first.")
@@ -423,6 +432,9 @@ def render_registration_page():
                 st.error(f"❌ {error_msg}")
                 return False
             
+            if not throttle_allows("registration", subject=email):
+                return False
+            
             # Create account
             try:
                 success, message = auth_manager.create_user(
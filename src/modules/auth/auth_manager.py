@@ -1,14 +1,51 @@
+import os
 import sqlite3
-import bcrypt
 import logging
+from datetime import datetime, timedelta
+
+from modules.auth.password_hasher import password_hasher, PasswordHasherBusy
+from modules.data.connection_pool import connection
+from modules.data.migrations import migrate
+from modules.data.records import LoginResult
+from modules.utils.services import lazy_service
 
 logger = logging.getLogger(__name__)
 
+try:
+    from config.config import Config
+    LOGIN_MAX_ATTEMPTS = Config.LOGIN_MAX_ATTEMPTS
+    LOGIN_LOCKOUT_MINUTES = Config.LOGIN_LOCKOUT_MINUTES
+except ImportError:
+    LOGIN_MAX_ATTEMPTS = int(os.getenv("LOGIN_MAX_ATTEMPTS", "5"))
+    LOGIN_LOCKOUT_MINUTES = int(os.getenv("LOGIN_LOCKOUT_MINUTES", "30"))
+
 # Rate limit configuration for password reset requests
 RATE_LIMIT_WINDOW_MINUTES = 60
 RATE_LIMIT_MAX_REQUESTS = 3
 
+# LoginResult.status values
+LOGIN_OK = 'ok'
+LOGIN_NOT_FOUND = 'not_found'
+LOGIN_INACTIVE = 'inactive'
+LOGIN_LOCKED = 'locked'
+LOGIN_INVALID_PASSWORD = 'invalid_password'
+LOGIN_BUSY = 'busy'
+LOGIN_ERROR = 'error'
+
+
+def _is_locked(locked_until):
+    """True while a stored locked_until timestamp is in the future"""
+    if not locked_until:
+        return False
+    try:
+        return datetime.now() < datetime.fromisoformat(locked_until)
+    except (TypeError, ValueError):
+        return False
+
 class AuthManager:
+    # bcrypt work runs on the shared bounded pool; tests may swap in their own
+    hasher = password_hasher
+    
     def __init__(self):
         self.db_path = "data/governance_assessments.db"
         self._init_db()
@@ -18,248 +55,134 @@ class AuthManager:
     
     def ensure_demo_user_exists(self):
         """Create demo organization and demo user if not present."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        # Create demo organization if not exists
-        cursor.execute("SELECT id FROM organizations WHERE name=?", ("DemoOrg",))
-        org = cursor.fetchone()
-        if not org:
-            cursor.execute("INSERT INTO organizations (name, industry, size, region) VALUES (?, ?, ?, ?)",
-                           ("DemoOrg", "Technology", "Small", "Global"))
-            conn.commit()
+        with connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            # Create demo organization if not exists
             cursor.execute("SELECT id FROM organizations WHERE name=?", ("DemoOrg",))
             org = cursor.fetchone()
-        org_id = org[0]
-        # Create demo user if not exists
-        cursor.execute("SELECT id FROM users WHERE email=?", ("demo@demo.com",))
-        user = cursor.fetchone()
-        if not user:
-            password_hash = bcrypt.hashpw("demopassword".encode(), bcrypt.gensalt())
-            cursor.execute("INSERT INTO users (email, password_hash, full_name, organization, role, org_id, is_active) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                           ("demo@demo.com", sqlite3.Binary(password_hash), "Demo User", "DemoOrg", "demo", org_id, 1))
-            conn.commit()
-        conn.close()
+            if not org:
+                cursor.execute("INSERT INTO organizations (name, industry, size, region) VALUES (?, ?, ?, ?)",
+                               ("DemoOrg", "Technology", "Small", "Global"))
+                cursor.execute("SELECT id FROM organizations WHERE name=?", ("DemoOrg",))
+                org = cursor.fetchone()
+            org_id = org[0]
+            # Create demo user if not exists
+            cursor.execute("SELECT id FROM users WHERE email=?", ("demo@demo.com",))
+            user = cursor.fetchone()
+            if not user:
+                password_hash = self.hasher.hash("demopassword")
+                cursor.execute("INSERT INTO users (email, password_hash, full_name, organization, role, org_id, is_active) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               ("demo@demo.com", sqlite3.Binary(password_hash), "Demo User", "DemoOrg", "demo", org_id, 1))
         logger.info("Demo organization and demo user ensured.")
     
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                full_name TEXT,
-                organization TEXT,
-                role TEXT DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT 1,
-                last_login TIMESTAMP,
-                failed_login_attempts INTEGER DEFAULT 0,
-                locked_until TIMESTAMP,
-                two_factor_enabled BOOLEAN DEFAULT 0
-            )
-        """)
-        
-        # Database migration: Add missing columns if they don't exist
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        # Add missing security columns
-        if 'locked_until' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN locked_until TIMESTAMP")
-            logger.info("Added locked_until column to users table")
-        if 'failed_login_attempts' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN failed_login_attempts INTEGER DEFAULT 0")
-            logger.info("Added failed_login_attempts column to users table")
-        if 'is_active' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN is_active BOOLEAN DEFAULT 1")
-            logger.info("Added is_active column to users table")
-        if 'created_at' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN created_at TIMESTAMP")
-            logger.info("Added created_at column to users table")
-        if 'updated_at' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN updated_at TIMESTAMP")
-            logger.info("Added updated_at column to users table")
-        if 'last_login' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN last_login TIMESTAMP")
-            logger.info("Added last_login column to users table")
-        if 'two_factor_enabled' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN two_factor_enabled BOOLEAN DEFAULT 0")
-            logger.info("Added two_factor_enabled column to users table")
-        if 'org_id' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN org_id INTEGER")
-            logger.info("Added org_id column to users table")
-        
-        # Create audit log table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                action TEXT NOT NULL,
-                resource_type TEXT,
-                resource_id TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ip_address TEXT,
-                user_agent TEXT,
-                details TEXT,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        """)
-        
-        # Create organizations table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS organizations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                industry TEXT,
-                size TEXT,
-                region TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create index for performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_org_id ON users(org_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_user_id ON audit_logs(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_logs(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_organizations_name ON organizations(name)")
-        # Password resets table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS password_resets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT NOT NULL,
-                token TEXT UNIQUE NOT NULL,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Password reset requests table (for rate limiting)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS password_reset_requests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT NOT NULL,
-                requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_prr_email_requested_at ON password_reset_requests(email, requested_at)")
-        
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized with schema and indexes")
+        """Bring the database schema up to date (no DDL when already current)"""
+        migrate(self.db_path)
     
     def create_user(self, email, password, full_name, organization, role="user"):
         if self.get_user(email):
             return False, "Email already registered"
         
-        password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+        try:
+            password_hash = self.hasher.hash(password)
+        except PasswordHasherBusy:
+            return False, "Server is busy, please try again in a moment"
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         try:
-            cursor.execute(
-                "INSERT INTO users (email, password_hash, full_name, organization, role) VALUES (?, ?, ?, ?, ?)",
-                (email, sqlite3.Binary(password_hash), full_name, organization, role)
-            )
-            conn.commit()
+            with connection(self.db_path) as conn:
+                conn.execute(
+                    "INSERT INTO users (email, password_hash, full_name, organization, role) VALUES (?, ?, ?, ?, ?)",
+                    (email, sqlite3.Binary(password_hash), full_name, organization, role)
+                )
             return True, "User created successfully"
         except sqlite3.IntegrityError:
             return False, "User already exists"
-        finally:
-            conn.close()
     
-    def authenticate(self, email, password):
-        """Authenticate user with brute-force protection"""
-        # Demo users removed - use registration
+    def login(self, email, password):
+        """
+        Authenticate in one lookup and one atomic update
         
-        # Database users
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        Lock state and credentials come from a single SELECT on the unique email
+        index; the success or failure bookkeeping is one UPDATE ... RETURNING.
+        bcrypt runs between the two without holding a pooled connection.
+        Returns a LoginResult whose status is one of the LOGIN_* constants.
+        """
+        with connection(self.db_path) as conn:
+            user = conn.execute(
+                "SELECT id, email, password_hash, full_name, organization, role, is_active, locked_until "
+                "FROM users WHERE email=?", (email,)
+            ).fetchone()
         
-        # Check if account is locked
-        cursor.execute("SELECT locked_until FROM users WHERE email=?", (email,))
-        result = cursor.fetchone()
+        if not user:
+            return LoginResult(LOGIN_NOT_FOUND)
+        user_id, _, stored_hash, full_name, organization, role, is_active, locked_until = user
+        if not is_active:
+            return LoginResult(LOGIN_INACTIVE)
+        if _is_locked(locked_until):
+            logger.warning(f"Login attempt on locked account: {email}")
+            return LoginResult(LOGIN_LOCKED, locked_until=locked_until)
         
-        if result and result[0]:
-            from datetime import datetime
-            locked_until = datetime.fromisoformat(result[0])
-            if datetime.now() < locked_until:
-                logger.warning(f"Login attempt on locked account: {email}")
-                conn.close()
-                return None
+        try:
+            valid, new_hash = self.hasher.verify_and_update(password, stored_hash)
+        except PasswordHasherBusy:
+            return LoginResult(LOGIN_BUSY)
+        except Exception:
+            logger.error(f"Unrecognized password hash type for user {email}: {type(stored_hash)}")
+            return LoginResult(LOGIN_ERROR)
         
-        # Get user credentials
-        cursor.execute("SELECT id, email, password_hash, full_name, organization, role, failed_login_attempts FROM users WHERE email=? AND is_active=1", (email,))
-        user = cursor.fetchone()
-        conn.close()
+        if valid:
+            # Reset failed attempts, upgrading the hash if the cost changed. A
+            # parallel failed guess may have locked the account while bcrypt
+            # ran; the lock then stands and this login is refused.
+            now = datetime.now().isoformat()
+            with connection(self.db_path) as conn:
+                row = conn.execute(
+                    "UPDATE users SET failed_login_attempts=0, locked_until=NULL, last_login=CURRENT_TIMESTAMP, "
+                    "password_hash=COALESCE(?, password_hash) "
+                    "WHERE id=? AND (locked_until IS NULL OR locked_until <= ?) RETURNING id",
+                    (sqlite3.Binary(new_hash) if new_hash is not None else None, user_id, now)
+                ).fetchone()
+            if row is None:
+                logger.warning(f"Login refused, account locked during authentication: {email}")
+                return LoginResult(LOGIN_LOCKED)
+            if new_hash is not None:
+                logger.info(f"Rehashed password for user {email} at cost {self.hasher.rounds}")
+            logger.info(f"Successful authentication for user: {email}")
+            return LoginResult(LOGIN_OK, user={
+                "user_id": user_id,
+                "email": user[1],
+                "full_name": full_name,
+                "organization": organization,
+                "role": role,
+                "limitations": {}
+            })
         
-        if user:
-            # Normalize stored password hash to bytes for bcrypt
-            stored_hash = user[2]
-            if isinstance(stored_hash, str):
-                hashed_bytes = stored_hash.encode('utf-8')
-            elif isinstance(stored_hash, memoryview):
-                hashed_bytes = stored_hash.tobytes()
-            elif isinstance(stored_hash, bytes):
-                hashed_bytes = stored_hash
-            else:
-                try:
-                    hashed_bytes = bytes(stored_hash)
-                except Exception:
-                    logger.error(f"Unrecognized password hash type for user {email}: {type(stored_hash)}")
-                    conn.close()
-                    return None
-
-            if bcrypt.checkpw(password.encode(), hashed_bytes):
-                # Login successful - reset failed attempts
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET failed_login_attempts=0, last_login=CURRENT_TIMESTAMP WHERE id=?", (user[0],))
-                conn.commit()
-                conn.close()
-
-                logger.info(f"Successful authentication for user: {email}")
-
-                return {
-                    "user_id": user[0],
-                    "email": user[1],
-                    "full_name": user[3],
-                    "organization": user[4],
-                    "role": user[5],
-                    "limitations": {}
-                }
-        
-        # Login failed - increment failed attempts
-        if user:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT failed_login_attempts FROM users WHERE id=?", (user[0],))
-            attempts = cursor.fetchone()[0] + 1
-            
-            # Lock account after 5 failed attempts
-            if attempts >= 5:
-                from datetime import datetime, timedelta
-                locked_until = (datetime.now() + timedelta(minutes=30)).isoformat()
-                cursor.execute("UPDATE users SET failed_login_attempts=?, locked_until=? WHERE id=?", (attempts, locked_until, user[0]))
-                logger.warning(f"Account locked after 5 failed attempts: {email}")
-            else:
-                cursor.execute("UPDATE users SET failed_login_attempts=? WHERE id=?", (attempts, user[0]))
-            
-            conn.commit()
-            conn.close()
-            logger.warning(f"Failed authentication attempt for user: {email} (attempt #{attempts})")
+        # Increment failed attempts and lock in the same statement once the limit is reached
+        lock_until = (datetime.now() + timedelta(minutes=LOGIN_LOCKOUT_MINUTES)).isoformat()
+        with connection(self.db_path) as conn:
+            attempts, locked_until = conn.execute(
+                """UPDATE users SET failed_login_attempts = COALESCE(failed_login_attempts, 0) + 1,
+                       locked_until = CASE WHEN COALESCE(failed_login_attempts, 0) + 1 >= ? THEN ? ELSE locked_until END
+                   WHERE id=? RETURNING failed_login_attempts, locked_until""",
+                (LOGIN_MAX_ATTEMPTS, lock_until, user_id)
+            ).fetchone()
         
-        return None
+        if attempts >= LOGIN_MAX_ATTEMPTS:
+            logger.warning(f"Account locked after {LOGIN_MAX_ATTEMPTS} failed attempts: {email}")
+            return LoginResult(LOGIN_LOCKED, failed_attempts=attempts, locked_until=locked_until)
+        logger.warning(f"Failed authentication attempt for user: {email} (attempt #{attempts})")
+        return LoginResult(LOGIN_INVALID_PASSWORD, failed_attempts=attempts)
+    
+    def authenticate(self, email, password):
+        """Return the user dict on success, else None; raises PasswordHasherBusy when saturated"""
+        result = self.login(email, password)
+        if result.status == LOGIN_BUSY:
+            raise PasswordHasherBusy("Password hashing queue is full")
+        return result.user
     
     def get_user(self, email):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT email FROM users WHERE email=?", (email,))
-        user = cursor.fetchone()
-        conn.close()
+        with connection(self.db_path) as conn:
+            user = conn.execute("SELECT email FROM users WHERE email=?", (email,)).fetchone()
         return bool(user)
 
     def create_password_reset_token(self, email, expiry_minutes=60):
@@ -271,27 +194,24 @@ class AuthManager:
         now = datetime.now()
         window_start = (now - timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)).isoformat()
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        # Count requests within the rate-limit window
-        cursor.execute("SELECT COUNT(*) FROM password_reset_requests WHERE email=? AND requested_at>=?", (email, window_start))
-        row = cursor.fetchone()
-        recent_count = row[0] if row else 0
-        if recent_count >= RATE_LIMIT_MAX_REQUESTS:
-            conn.close()
-            logger.warning(f"Password reset rate limit exceeded for {email}: {recent_count} requests in window")
-            return None, 'rate_limited'
+        with connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            # Count requests within the rate-limit window
+            cursor.execute("SELECT COUNT(*) FROM password_reset_requests WHERE email=? AND requested_at>=?", (email, window_start))
+            row = cursor.fetchone()
+            recent_count = row[0] if row else 0
+            if recent_count >= RATE_LIMIT_MAX_REQUESTS:
+                logger.warning(f"Password reset rate limit exceeded for {email}: {recent_count} requests in window")
+                return None, 'rate_limited'
 
-        # Record this request
-        cursor.execute("INSERT INTO password_reset_requests (email, requested_at) VALUES (?, ?)", (email, now.isoformat()))
+            # Record this request
+            cursor.execute("INSERT INTO password_reset_requests (email, requested_at) VALUES (?, ?)", (email, now.isoformat()))
 
-        import secrets
-        token = secrets.token_urlsafe(32)
-        expires_at = (now + timedelta(minutes=expiry_minutes)).isoformat()
+            import secrets
+            token = secrets.token_urlsafe(32)
+            expires_at = (now + timedelta(minutes=expiry_minutes)).isoformat()
 
-        cursor.execute("INSERT INTO password_resets (email, token, expires_at) VALUES (?, ?, ?)", (email, token, expires_at))
-        conn.commit()
-        conn.close()
+            cursor.execute("INSERT INTO password_resets (email, token, expires_at) VALUES (?, ?, ?)", (email, token, expires_at))
 
         # Attempt to send reset email; if SMTP not configured, caller can still display token
         try:
@@ -311,11 +231,8 @@ class AuthManager:
     def verify_reset_token(self, token):
         """Verify token and return associated email or None if invalid/expired."""
         from datetime import datetime
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT email, expires_at FROM password_resets WHERE token=?", (token,))
-        row = cursor.fetchone()
-        conn.close()
+        with connection(self.db_path) as conn:
+            row = conn.execute("SELECT email, expires_at FROM password_resets WHERE token=?", (token,)).fetchone()
         if not row:
             return None
         email, expires_at = row
@@ -332,30 +249,20 @@ class AuthManager:
         if not email:
             return False, 'invalid_or_expired'
 
-        new_hash = bcrypt.hashpw(new_password.encode(), bcrypt.gensalt())
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE users SET password_hash=? WHERE email=?", (sqlite3.Binary(new_hash), email))
-        cursor.execute("DELETE FROM password_resets WHERE token=?", (token,))
-        conn.commit()
-        conn.close()
+        try:
+            new_hash = self.hasher.hash(new_password)
+        except PasswordHasherBusy:
+            return False, 'busy'
+        with connection(self.db_path) as conn:
+            conn.execute("UPDATE users SET password_hash=? WHERE email=?", (sqlite3.Binary(new_hash), email))
+            conn.execute("DELETE FROM password_resets WHERE token=?", (token,))
         return True, None
 
     def is_account_locked(self, email):
         """Return True if account is currently locked, else False."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT locked_until FROM users WHERE email=?", (email,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row or not row[0]:
-            return False
-        from datetime import datetime
-        try:
-            locked_until = datetime.fromisoformat(row[0])
-            return datetime.now() < locked_until
-        except Exception:
-            return False
+        with connection(self.db_path) as conn:
+            row = conn.execute("SELECT locked_until FROM users WHERE email=?", (email,)).fetchone()
+        return bool(row) and _is_locked(row[0])
 
     def cleanup_expired_tokens(self):
         """Remove expired password reset tokens and old reset request records."""
@@ -364,18 +271,16 @@ class AuthManager:
         # Remove expired tokens (older than expiry_at)
         old_window = (datetime.fromisoformat(now) - timedelta(days=7)).isoformat()
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        # Delete expired password reset tokens
-        cursor.execute("DELETE FROM password_resets WHERE expires_at < ?", (now,))
-        deleted_tokens = cursor.rowcount
-        # Delete old reset request records (older than 7 days)
-        cursor.execute("DELETE FROM password_reset_requests WHERE requested_at < ?", (old_window,))
-        deleted_requests = cursor.rowcount
-        conn.commit()
-        conn.close()
+        with connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            # Delete expired password reset tokens
+            cursor.execute("DELETE FROM password_resets WHERE expires_at < ?", (now,))
+            deleted_tokens = cursor.rowcount
+            # Delete old reset request records (older than 7 days)
+            cursor.execute("DELETE FROM password_reset_requests WHERE requested_at < ?", (old_window,))
+            deleted_requests = cursor.rowcount
 
         if deleted_tokens > 0 or deleted_requests > 0:
             logger.info(f"Cleanup: removed {deleted_tokens} expired tokens and {deleted_requests} old request records")
 
-auth_manager = AuthManager()
+auth_manager = lazy_service('auth_manager', AuthManager)
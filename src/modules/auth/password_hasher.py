@@ -0,0 +1,169 @@
+"""
+Password hashing on a bounded worker pool
+
+bcrypt costs ~250ms of CPU per call at the default cost. Running it inline
+on Streamlit script threads lets a burst of logins take every core, so hashes
+and checks are handed to a small ThreadPoolExecutor instead (bcrypt releases
+the GIL while hashing). The worker count caps CPU spent on hashing, and
+callers waiting beyond PASSWORD_HASH_MAX_QUEUE are turned away as busy rather
+than piling up. Hashes made with a different cost factor are upgraded on the
+next successful verification.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+from modules.utils.services import lazy_service
+
+try:
+    from config.config import Config
+    BCRYPT_ROUNDS = Config.BCRYPT_ROUNDS
+    PASSWORD_HASH_WORKERS = Config.PASSWORD_HASH_WORKERS
+    PASSWORD_HASH_MAX_QUEUE = Config.PASSWORD_HASH_MAX_QUEUE
+    PASSWORD_HASH_TIMEOUT_SECONDS = Config.PASSWORD_HASH_TIMEOUT_SECONDS
+except ImportError:
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a request waited too long"""
+
+
+def default_workers():
+    """One worker per core, keeping one core free for script threads"""
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _as_bytes(stored_hash):
+    """Normalize a stored hash (bytes, str, memoryview from SQLite) to bytes"""
+    if isinstance(stored_hash, bytes):
+        return stored_hash
+    if isinstance(stored_hash, str):
+        return stored_hash.encode('utf-8')
+    if isinstance(stored_hash, memoryview):
+        return stored_hash.tobytes()
+    return bytes(stored_hash)
+
+
+def hash_cost(stored_hash):
+    """Cost factor of a bcrypt hash ($2b$12$... -> 12), or None if unparseable"""
+    try:
+        return int(_as_bytes(stored_hash).split(b'$')[2])
+    except (IndexError, ValueError, TypeError):
+        return None
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a capped thread pool, with queue metrics"""
+
+    def __init__(self, rounds=None, max_workers=None, max_queue=None, timeout=None):
+        self.rounds = rounds or BCRYPT_ROUNDS
+        self.max_workers = max_workers or PASSWORD_HASH_WORKERS or default_workers()
+        self.max_queue = max_queue if max_queue is not None else PASSWORD_HASH_MAX_QUEUE
+        self.timeout = timeout or PASSWORD_HASH_TIMEOUT_SECONDS
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'rejected': 0, 'timed_out': 0, 'rehashed': 0,
+            'peak_queue_depth': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0,
+        }
+
+    def _run(self, fn, *args):
+        """Run fn on the pool and wait for it; raises PasswordHasherBusy when saturated"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self._queued += 1
+            self._stats['submitted'] += 1
+            self._stats['peak_queue_depth'] = max(self._stats['peak_queue_depth'], self._queued)
+        submitted_at = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._stats['wait_seconds'] += started - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats['completed'] += 1
+                    self._stats['run_seconds'] += time.perf_counter() - started
+
+        future = self._executor.submit(job)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            with self._lock:
+                self._stats['timed_out'] += 1
+            raise PasswordHasherBusy("Timed out waiting for password hashing")
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds))
+
+    def _verify(self, password, hashed):
+        return bcrypt.checkpw(password.encode(), hashed)
+
+    def _verify_and_rehash(self, password, hashed):
+        if not self._verify(password, hashed):
+            return False, None
+        if not self.needs_rehash(hashed):
+            return True, None
+        return True, self._hash(password)
+
+    def hash(self, password):
+        """Hash a password with the configured cost; returns bytes"""
+        return self._run(self._hash, password)
+
+    def verify(self, password, stored_hash):
+        """Check a password against a stored hash"""
+        return self._run(self._verify, password, _as_bytes(stored_hash))
+
+    def needs_rehash(self, stored_hash):
+        """True when the stored hash was made with a different cost factor"""
+        return hash_cost(stored_hash) != self.rounds
+
+    def verify_and_update(self, password, stored_hash):
+        """
+        Verify and, if the cost factor changed, rehash in the same worker job
+        Returns (is_valid, new_hash or None)
+        """
+        valid, new_hash = self._run(self._verify_and_rehash, password, _as_bytes(stored_hash))
+        if new_hash is not None:
+            with self._lock:
+                self._stats['rehashed'] += 1
+        return valid, new_hash
+
+    def stats(self):
+        """Queue depth and timing counters for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(queue_depth=self._queued, in_flight=self._running,
+                         max_workers=self.max_workers, max_queue=self.max_queue, rounds=self.rounds)
+        completed = stats['completed'] or 1
+        stats['avg_wait_ms'] = stats['wait_seconds'] * 1000 / completed
+        stats['avg_run_ms'] = stats['run_seconds'] * 1000 / completed
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+password_hasher = lazy_service('password_hasher', PasswordHasher)
@@ -0,0 +1,201 @@
+"""
+Shared SQLite connection pool for all data managers
+
+Connections are opened lazily, configured once (WAL, synchronous=NORMAL,
+busy_timeout, foreign keys, cache size) and reused. A thread keeps the same
+connection for nested ``connection()`` blocks, so helpers can call each other
+inside one transaction; the outermost block commits or rolls back. Side
+effects that must not happen unless the data change sticks (deleting files)
+are registered with after_commit() and run once the outermost block commits.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+try:
+    from config.config import Config
+    DEFAULT_POOL_SIZE = Config.DATABASE_POOL_SIZE
+    BUSY_TIMEOUT_MS = Config.DATABASE_BUSY_TIMEOUT_MS
+    CACHE_SIZE_KB = Config.DATABASE_CACHE_SIZE_KB
+except ImportError:
+    DEFAULT_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "20"))
+    BUSY_TIMEOUT_MS = int(os.getenv("DATABASE_BUSY_TIMEOUT_MS", "5000"))
+    CACHE_SIZE_KB = int(os.getenv("DATABASE_CACHE_SIZE_KB", "8192"))
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a free connection before giving up
+CHECKOUT_TIMEOUT_SECONDS = 30
+
+
+class PoolExhaustedError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of configured connections to one SQLite database"""
+
+    def __init__(self, db_path, max_connections=None):
+        self.db_path = db_path
+        self.max_connections = max(1, max_connections or DEFAULT_POOL_SIZE)
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._checkouts = 0
+
+    def _connect(self):
+        """Open a connection and apply the per-connection settings once"""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_MS)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA cache_size=-{int(CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.max_connections
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=CHECKOUT_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise PoolExhaustedError(
+                f"No free connection to {self.db_path} after {CHECKOUT_TIMEOUT_SECONDS}s "
+                f"({self.max_connections} in use)"
+            )
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Yield this thread's connection; the outermost block commits or rolls back"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.after_commit = []
+        with self._lock:
+            self._checkouts += 1
+        try:
+            yield conn
+            conn.commit()
+            self._run_after_commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            # Dropped unrun on rollback
+            self._local.after_commit = []
+            self._release(conn)
+
+    def _run_after_commit(self):
+        # Callbacks still hold the connection, so they may run their own transactions on it
+        while self._local.after_commit:
+            callback = self._local.after_commit.pop(0)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"After-commit callback failed: {str(e)}")
+
+    def after_commit(self, callback):
+        """Run callback once this thread's current transaction commits, or now if no block is open"""
+        if getattr(self._local, "conn", None) is None:
+            callback()
+        else:
+            self._local.after_commit.append(callback)
+
+    def close(self):
+        """Close idle connections (connections in use are closed on return by GC)"""
+        closed = 0
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            closed += 1
+        with self._lock:
+            self._opened -= closed
+        return closed
+
+    def stats(self):
+        """Open, idle and total checkout counts, for diagnostics"""
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'max_connections': self.max_connections,
+                'open': self._opened,
+                'idle': self._idle.qsize(),
+                'checkouts': self._checkouts,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, max_connections=None):
+    """Return the process-wide pool for db_path, creating it on first use"""
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(db_path, max_connections)
+                _pools[key] = pool
+    return pool
+
+
+def connection(db_path):
+    """Context manager for a pooled connection to db_path"""
+    return get_pool(db_path).connection()
+
+
+def after_commit(db_path, callback):
+    """Defer callback until the thread's open connection(db_path) block commits"""
+    get_pool(db_path).after_commit(callback)
+
+
+def close_all_pools():
+    """Close idle connections in every pool and forget the pools"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
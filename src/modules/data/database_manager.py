@@ -1,136 +1,121 @@
-import sqlite3
-import pandas as pd
 import json
 import logging
-from datetime import datetime
+from datetime import date, datetime
+
+from modules.data.connection_pool import connection
+from modules.data.migrations import migrate
+from modules.utils.services import lazy_service
+from modules.data.records import (
+    AssessmentRecord,
+    AssessmentPage,
+    AssessmentSummaryRecord,
+    DomainScoreRecord,
+    HistorySummary,
+    ResponseRecord,
+)
 
 logger = logging.getLogger(__name__)
 
+# Default and maximum page sizes for assessment history
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+
+# Largest IN (...) list per query; stays under SQLite's default variable limit
+LOAD_CHUNK_SIZE = 500
+
+# One round trip per chunk: assessment columns plus domain scores and
+# responses aggregated into JSON arrays by correlated subqueries
+ASSESSMENT_DETAIL_QUERY = """
+    SELECT a.id, a.user_id, a.org_id, a.assessment_name, a.framework_version,
+           a.overall_score, a.overall_maturity, a.completion_percentage,
+           a.created_at, a.updated_at, a.submitted_at, a.status, a.submission_key,
+           (SELECT json_group_array(json_array(d.domain_id, d.domain_name, d.raw_score,
+                                               d.max_score, d.percentage, d.maturity_level))
+              FROM (SELECT * FROM domain_scores WHERE assessment_id = a.id ORDER BY id) d),
+           (SELECT json_group_array(json_array(r.question_id, r.domain_id,
+                                               r.response_score, r.response_text))
+              FROM (SELECT * FROM assessment_responses WHERE assessment_id = a.id ORDER BY id) r)
+    FROM assessments a
+    WHERE a.id IN ({placeholders})
+"""
+
+
+def _timestamp(value):
+    """Format a date/datetime like SQLite's CURRENT_TIMESTAMP; strings pass through"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d 00:00:00')
+    return value
+
+
+def _assessment_record(row):
+    """Build an AssessmentRecord from one ASSESSMENT_DETAIL_QUERY row"""
+    domain_scores = tuple(DomainScoreRecord(*item) for item in json.loads(row[13] or '[]'))
+    responses = tuple(ResponseRecord(*item) for item in json.loads(row[14] or '[]'))
+    return AssessmentRecord(*row[:13], domain_scores=domain_scores, responses=responses)
+
 class DatabaseManager:
     def __init__(self, db_path="data/governance_assessments.db"):
         self.db_path = db_path
         self._init_assessment_schema()
     
     def _init_assessment_schema(self):
-        """Initialize assessment data tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Assessment table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS assessments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                org_id INTEGER,
-                assessment_name TEXT,
-                framework_version TEXT,
-                overall_score REAL,
-                overall_maturity TEXT,
-                completion_percentage REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                submitted_at TIMESTAMP,
-                status TEXT DEFAULT 'in_progress',
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        """)
-        
-        # Database migration: Add org_id if missing
-        cursor.execute("PRAGMA table_info(assessments)")
-        assessment_columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'org_id' not in assessment_columns:
-            cursor.execute("ALTER TABLE assessments ADD COLUMN org_id INTEGER")
-            logger.info("Added org_id column to assessments table")
-        
-        # Assessment responses table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS assessment_responses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                assessment_id INTEGER NOT NULL,
-                question_id TEXT NOT NULL,
-                domain_id TEXT NOT NULL,
-                response_score INTEGER,
-                response_text TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(assessment_id) REFERENCES assessments(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Domain scores table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS domain_scores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                assessment_id INTEGER NOT NULL,
-                domain_id TEXT NOT NULL,
-                domain_name TEXT,
-                raw_score REAL,
-                max_score REAL,
-                percentage REAL,
-                maturity_level TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(assessment_id) REFERENCES assessments(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Create indexes for performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_assessments_user_id ON assessments(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_assessments_org_id ON assessments(org_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_assessments_created ON assessments(created_at)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_assessment ON assessment_responses(assessment_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_domain_scores_assessment ON domain_scores(assessment_id)")
-        
-        conn.commit()
-        conn.close()
-        logger.info("Assessment schema initialized")
+        """Bring the assessment schema up to date (no DDL when already current)"""
+        migrate(self.db_path)
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Pooled connection context manager; commits on exit, rolls back on error"""
+        return connection(self.db_path)
     
-    def save_assessment(self, user_id, scores, assessment_name, framework_version="nist_rmf_enhanced"):
-        """Save complete assessment with scores and responses"""
+    def save_assessment(self, user_id, scores, assessment_name, framework_version=None):
+        """Save complete assessment with scores and responses.
+
+        framework_version should be a versioned framework id such as
+        ``nist_rmf_enhanced@3fa2b1c9d0e4``; it defaults to the current
+        version of the default framework.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            if framework_version is None:
+                framework_version = self._current_framework_version()
             
             overall = scores.get('overall', {})
             
-            # Insert assessment
-            cursor.execute("""
-                INSERT INTO assessments (user_id, assessment_name, framework_version, overall_score, 
-                                        overall_maturity, completion_percentage, status, submitted_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
-                user_id,
-                assessment_name,
-                framework_version,
-                overall.get('percentage', 0),
-                overall.get('maturity_level', 'Unknown'),
-                (overall.get('questions_answered', 0) / overall.get('total_questions', 1)) * 100 if overall.get('total_questions', 0) > 0 else 0,
-                'submitted'
-            ))
-            
-            assessment_id = cursor.lastrowid
-            
-            # Insert domain scores
-            for domain_id, domain_score in scores.get('domains', {}).items():
+            with connection(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                # Insert assessment
                 cursor.execute("""
-                    INSERT INTO domain_scores (assessment_id, domain_id, domain_name, raw_score, 
-                                              max_score, percentage, maturity_level)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    INSERT INTO assessments (user_id, assessment_name, framework_version, overall_score, 
+                                            overall_maturity, completion_percentage, status, submitted_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 """, (
-                    assessment_id,
-                    domain_id,
-                    domain_score.get('name', domain_id),
-                    domain_score.get('raw_score', 0),
-                    domain_score.get('max_score', 0),
-                    domain_score.get('raw_percentage', 0),
-                    domain_score.get('maturity_level', 'Unknown')
+                    user_id,
+                    assessment_name,
+                    framework_version,
+                    overall.get('percentage', 0),
+                    overall.get('maturity_level', 'Unknown'),
+                    (overall.get('questions_answered', 0) / overall.get('total_questions', 1)) * 100 if overall.get('total_questions', 0) > 0 else 0,
+                    'submitted'
                 ))
-            
-            conn.commit()
-            conn.close()
+                
+                assessment_id = cursor.lastrowid
+                
+                # Insert domain scores
+                for domain_id, domain_score in scores.get('domains', {}).items():
+                    cursor.execute("""
+                        INSERT INTO domain_scores (assessment_id, domain_id, domain_name, raw_score, 
+                                                  max_score, percentage, maturity_level)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        assessment_id,
+                        domain_id,
+                        domain_score.get('name', domain_id),
+                        domain_score.get('raw_score', 0),
+                        domain_score.get('max_score', 0),
+                        domain_score.get('raw_percentage', 0),
+                        domain_score.get('maturity_level', 'Unknown')
+                    ))
             
             logger.info(f"Assessment {assessment_id} saved for user {user_id}")
             return assessment_id
@@ -139,23 +124,145 @@ class DatabaseManager:
             logger.error(f"Error saving assessment: {str(e)}")
             return None
     
-    def save_assessment_responses(self, assessment_id, responses, framework):
-        """Save individual question responses"""
+    def save_full_assessment(self, user_id, scores, responses, framework, assessment_name,
+                             submission_key=None, org_id=None, framework_version=None):
+        """Save an assessment, its domain scores and its responses in one transaction.
+
+        submission_key makes the save idempotent: re-sending the same key
+        returns the id of the assessment already stored and writes nothing.
+        A key already used by a different user fails the save.
+        Returns the assessment id, or None on failure.
+        """
+        ids = self.save_full_assessments([{
+            'user_id': user_id,
+            'org_id': org_id,
+            'scores': scores,
+            'responses': responses,
+            'assessment_name': assessment_name,
+            'submission_key': submission_key,
+        }], framework, framework_version)
+        return ids[0] if ids else None
+    
+    def save_full_assessments(self, submissions, framework, framework_version=None):
+        """Bulk save for imports: many assessments in one transaction.
+
+        Each submission is a dict with user_id, scores, responses and
+        assessment_name, plus optional org_id and submission_key. Domain
+        scores and responses for the whole batch go through executemany.
+        Returns assessment ids in submission order, or None if the batch
+        was rolled back.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            from modules.assessment.framework import CompiledFramework
+            if not isinstance(framework, CompiledFramework):
+                framework = CompiledFramework(framework)
+            if framework_version is None:
+                framework_version = framework.version_id or self._current_framework_version()
             
-            for domain_id, domain_data in framework.items():
-                for question in domain_data.get('questions', []):
-                    q_id = question['id']
-                    if q_id in responses:
-                        cursor.execute("""
-                            INSERT INTO assessment_responses (assessment_id, question_id, domain_id, response_score)
-                            VALUES (?, ?, ?, ?)
-                        """, (assessment_id, q_id, domain_id, responses[q_id]))
+            assessment_ids = []
+            domain_rows = []
+            response_rows = []
+            with connection(self.db_path) as conn:
+                cursor = conn.cursor()
+                for submission in submissions:
+                    scores = submission['scores']
+                    overall = scores.get('overall', {})
+                    submission_key = submission.get('submission_key')
+                    total = overall.get('total_questions', 0)
+                    
+                    cursor.execute("""
+                        INSERT INTO assessments (user_id, org_id, assessment_name, framework_version, overall_score,
+                                                overall_maturity, completion_percentage, status, submitted_at, submission_key)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, 'submitted', CURRENT_TIMESTAMP, ?)
+                        ON CONFLICT(submission_key) DO NOTHING
+                    """, (
+                        submission['user_id'],
+                        submission.get('org_id'),
+                        submission['assessment_name'],
+                        framework_version,
+                        overall.get('percentage', 0),
+                        overall.get('maturity_level', 'Unknown'),
+                        (overall.get('questions_answered', 0) / total) * 100 if total > 0 else 0,
+                        submission_key
+                    ))
+                    
+                    already_saved = cursor.rowcount == 0
+                    if already_saved:
+                        # Already stored under this submission key, by this user
+                        cursor.execute("SELECT id FROM assessments WHERE submission_key=? AND user_id=?",
+                                       (submission_key, submission['user_id']))
+                        row = cursor.fetchone()
+                        if row is None:
+                            # Never hand out (or attach evidence to) another user's assessment
+                            raise ValueError(f"Submission key {submission_key} belongs to another user")
+                        assessment_id = row[0]
+                    else:
+                        assessment_id = cursor.lastrowid
+                    assessment_ids.append(assessment_id)
+                    
+                    if submission_key is not None:
+                        # Evidence uploaded during this attempt now belongs to the assessment,
+                        # including any added since a first submit under the same key
+                        cursor.execute(
+                            "UPDATE evidence SET assessment_id = ? WHERE submission_key = ? AND assessment_id IS NULL",
+                            (assessment_id, submission_key)
+                        )
+                    if already_saved:
+                        continue
+                    
+                    for domain_id, domain_score in scores.get('domains', {}).items():
+                        domain_rows.append((
+                            assessment_id,
+                            domain_id,
+                            domain_score.get('name', domain_id),
+                            domain_score.get('raw_score', 0),
+                            domain_score.get('max_score', 0),
+                            domain_score.get('raw_percentage', 0),
+                            domain_score.get('maturity_level', 'Unknown')
+                        ))
+                    
+                    for q_id, score in submission.get('responses', {}).items():
+                        info = framework.question(q_id)
+                        if info is not None and score is not None:
+                            response_rows.append((assessment_id, q_id, info.domain_id, score))
+                
+                cursor.executemany("""
+                    INSERT INTO domain_scores (assessment_id, domain_id, domain_name, raw_score,
+                                              max_score, percentage, maturity_level)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, domain_rows)
+                cursor.executemany("""
+                    INSERT INTO assessment_responses (assessment_id, question_id, domain_id, response_score)
+                    VALUES (?, ?, ?, ?)
+                """, response_rows)
             
-            conn.commit()
-            conn.close()
+            logger.info(f"Saved {len(assessment_ids)} assessment(s) with {len(response_rows)} responses")
+            return assessment_ids
+            
+        except Exception as e:
+            logger.error(f"Error saving assessments: {str(e)}")
+            return None
+    
+    def _current_framework_version(self):
+        """Versioned id of the default framework as it is on disk now"""
+        from modules.assessment.framework import DEFAULT_FRAMEWORK_ID
+        from modules.assessment.registry import framework_registry
+        return framework_registry.version_id(DEFAULT_FRAMEWORK_ID)
+    
+    def save_assessment_responses(self, assessment_id, responses, framework):
+        """Save individual question responses"""
+        try:
+            with connection(self.db_path) as conn:
+                cursor = conn.cursor()
+                
+                for domain_id, domain_data in framework.items():
+                    for question in domain_data.get('questions', []):
+                        q_id = question['id']
+                        if q_id in responses:
+                            cursor.execute("""
+                                INSERT INTO assessment_responses (assessment_id, question_id, domain_id, response_score)
+                                VALUES (?, ?, ?, ?)
+                            """, (assessment_id, q_id, domain_id, responses[q_id]))
             
             logger.info(f"Assessment responses saved for assessment {assessment_id}")
             return True
@@ -165,68 +272,158 @@ class DatabaseManager:
             return False
     
     def get_assessment_history(self, user_id=None, organization_name=None):
-        """Get assessment history with filtering"""
+        """Get assessment history with filtering.
+
+        Requires a user or organization scope; an unscoped call returns an
+        empty list rather than the whole table.
+        """
+        if not user_id and not organization_name:
+            logger.warning("Assessment history requested without a user or organization scope")
+            return []
+        
+        history = []
+        cursor = None
+        while True:
+            page = self.get_assessment_page(user_id=user_id or None, organization_name=organization_name,
+                                            cursor=cursor, limit=HISTORY_MAX_PAGE_SIZE,
+                                            include_summary=False)
+            if page is None:
+                return []
+            history.extend(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                return history
+    
+    def get_assessment_page(self, org_id=None, user_id=None, organization_name=None, status=None,
+                            framework=None, date_from=None, date_to=None, cursor=None,
+                            limit=HISTORY_PAGE_SIZE, include_summary=True):
+        """One page of assessment history, newest first, with summary aggregates.
+
+        Pages are keyed on (created_at, id): pass the previous page's
+        next_cursor to continue. framework matches a bare framework id or
+        an exact versioned id; date_from is inclusive, date_to exclusive.
+        The summary covers every assessment matching the filters, not just
+        this page. At least one of org_id, user_id or organization_name is
+        required. Returns an AssessmentPage, or None on error.
+        """
+        if org_id is None and user_id is None and not organization_name:
+            raise ValueError("Assessment history needs an org_id, user_id or organization_name scope")
+        limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+        
+        conditions = []
+        params = []
+        if org_id is not None:
+            conditions.append("a.org_id = ?")
+            params.append(org_id)
+        if organization_name:
+            conditions.append("a.org_id = (SELECT id FROM organizations WHERE name = ?)")
+            params.append(organization_name)
+        if user_id is not None:
+            conditions.append("a.user_id = ?")
+            params.append(user_id)
+        if status:
+            conditions.append("a.status = ?")
+            params.append(status)
+        if framework:
+            if '@' in framework:
+                conditions.append("a.framework_version = ?")
+                params.append(framework)
+            else:
+                conditions.append("a.framework_version LIKE ? ESCAPE '\\'")
+                params.append(framework.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '@%')
+        if date_from is not None:
+            conditions.append("a.created_at >= ?")
+            params.append(_timestamp(date_from))
+        if date_to is not None:
+            conditions.append("a.created_at < ?")
+            params.append(_timestamp(date_to))
+        where = " AND ".join(conditions)
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with connection(self.db_path) as conn:
+                if not conn.in_transaction:
+                    # Page and summary read from the same snapshot
+                    conn.execute("BEGIN")
+                
+                page_query = f"""
+                    SELECT a.id, a.user_id, a.org_id, a.assessment_name, a.framework_version,
+                           a.overall_score, a.overall_maturity, a.status, a.created_at
+                    FROM assessments a
+                    WHERE {where}{" AND (a.created_at, a.id) < (?, ?)" if cursor else ""}
+                    ORDER BY a.created_at DESC, a.id DESC
+                    LIMIT ?
+                """
+                page_params = params + (list(cursor) if cursor else []) + [limit + 1]
+                rows = conn.execute(page_query, page_params).fetchall()
+                
+                summary = None
+                if include_summary:
+                    # With a single max(), SQLite takes bare columns from the max row
+                    row = conn.execute(f"""
+                        SELECT COUNT(*), AVG(a.overall_score), a.overall_maturity, MAX(a.created_at)
+                        FROM assessments a
+                        WHERE {where}
+                    """, params).fetchone()
+                    summary = HistorySummary(*row)
             
-            query = "SELECT * FROM assessments WHERE 1=1"
-            params = []
-            
-            if user_id:
-                query += " AND user_id=?"
-                params.append(user_id)
-            
-            query += " ORDER BY created_at DESC"
-            
-            cursor.execute(query, params)
-            assessments = cursor.fetchall()
-            conn.close()
-            
-            return assessments or []
+            items = tuple(AssessmentSummaryRecord(*row) for row in rows[:limit])
+            next_cursor = (items[-1].created_at, items[-1].id) if len(rows) > limit else None
+            return AssessmentPage(items, next_cursor, summary)
             
         except Exception as e:
             logger.error(f"Error retrieving assessment history: {str(e)}")
-            return []
+            return None
     
     def get_assessment_by_id(self, assessment_id):
-        """Get specific assessment with all scores and responses"""
+        """Get specific assessment with all scores and responses as an AssessmentRecord"""
+        return self.load_assessment(assessment_id)
+    
+    def load_assessment(self, assessment_id, *, org_id=None, user_id=None):
+        """Load one assessment with its domain scores and responses in one query.
+
+        When org_id or user_id is given the assessment must belong to that
+        organization or user. Returns an AssessmentRecord or None.
+        """
+        records = self.load_assessments([assessment_id], org_id=org_id, user_id=user_id)
+        return records.get(assessment_id) if records else None
+    
+    def load_assessments(self, assessment_ids, *, org_id=None, user_id=None):
+        """Batch form of load_assessment for dashboards and exports.
+
+        Returns a dict of assessment id -> AssessmentRecord for the ids that
+        exist (and match org_id / user_id, if given), or None on error.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM assessments WHERE id=?", (assessment_id,))
-            assessment = cursor.fetchone()
-            
-            if not assessment:
-                conn.close()
-                return None
-            
-            cursor.execute("SELECT * FROM domain_scores WHERE assessment_id=?", (assessment_id,))
-            domain_scores = cursor.fetchall()
-            
-            cursor.execute("SELECT * FROM assessment_responses WHERE assessment_id=?", (assessment_id,))
-            responses = cursor.fetchall()
-            
-            conn.close()
-            
-            return {
-                'assessment': assessment,
-                'domain_scores': domain_scores,
-                'responses': responses
-            }
+            ids = list(dict.fromkeys(assessment_ids))
+            records = {}
+            with connection(self.db_path) as conn:
+                for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+                    chunk = ids[start:start + LOAD_CHUNK_SIZE]
+                    query = ASSESSMENT_DETAIL_QUERY.format(placeholders=", ".join("?" * len(chunk)))
+                    params = list(chunk)
+                    if org_id is not None:
+                        query += " AND a.org_id = ?"
+                        params.append(org_id)
+                    if user_id is not None:
+                        query += " AND a.user_id = ?"
+                        params.append(user_id)
+                    for row in conn.execute(query, params):
+                        record = _assessment_record(row)
+                        records[record.id] = record
+            return records
             
         except Exception as e:
-            logger.error(f"Error retrieving assessment: {str(e)}")
+            logger.error(f"Error loading assessments: {str(e)}")
             return None
     
     def export_to_csv(self, assessment_id):
         """Export assessment to CSV format"""
+        # pandas costs ~400ms to import; only CSV export needs it
+        import pandas as pd
         try:
-            conn = sqlite3.connect(self.db_path)
             query = "SELECT * FROM domain_scores WHERE assessment_id=?"
-            df = pd.read_sql_query(query, conn, params=(assessment_id,))
-            conn.close()
+            with connection(self.db_path) as conn:
+                df = pd.read_sql_query(query, conn, params=(assessment_id,))
             return df.to_csv(index=False)
         except Exception as e:
             logger.error(f"Error exporting to CSV: {str(e)}")
@@ -235,11 +432,11 @@ class DatabaseManager:
     def get_user_assessments_isolated(self, user_id, org_id):
         """Return assessments for a user, filtered by org_id."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM assessments WHERE user_id=? AND org_id=? ORDER BY created_at DESC", (user_id, org_id))
-            assessments = cursor.fetchall()
-            conn.close()
+            with connection(self.db_path) as conn:
+                assessments = conn.execute(
+                    "SELECT * FROM assessments WHERE user_id=? AND org_id=? ORDER BY created_at DESC",
+                    (user_id, org_id)
+                ).fetchall()
             return assessments or []
         except Exception as e:
             logger.error(f"Error retrieving isolated assessments: {str(e)}")
@@ -247,26 +444,9 @@ class DatabaseManager:
 
     def get_assessment_by_id_isolated(self, assessment_id, org_id):
         """Return assessment only if it matches org_id."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM assessments WHERE id=? AND org_id=?", (assessment_id, org_id))
-            assessment = cursor.fetchone()
-            if not assessment:
-                conn.close()
-                return None
-            cursor.execute("SELECT * FROM domain_scores WHERE assessment_id=?", (assessment_id,))
-            domain_scores = cursor.fetchall()
-            cursor.execute("SELECT * FROM assessment_responses WHERE assessment_id=?", (assessment_id,))
-            responses = cursor.fetchall()
-            conn.close()
-            return {
-                'assessment': assessment,
-                'domain_scores': domain_scores,
-                'responses': responses
-            }
-        except Exception as e:
-            logger.error(f"Error retrieving isolated assessment: {str(e)}")
+        if org_id is None:
+            # No organization means no access, never an unscoped lookup
             return None
+        return self.load_assessment(assessment_id, org_id=org_id)
 
-db_manager = DatabaseManager()
+db_manager = lazy_service('db_manager', DatabaseManager)
@@ -0,0 +1,244 @@
+"""
+Garbage collection and cold-tier compression for evidence files
+
+EvidenceSweeper is run periodically (scripts/cleanup_task.py). Each step works
+in batches of EVIDENCE_GC_BATCH_SIZE, one transaction per batch:
+
+- drafts: evidence uploaded during an assessment attempt that was never
+  submitted, once older than EVIDENCE_DRAFT_RETENTION_DAYS, is deleted like a
+  user deletion (quota refunded, blob reference released);
+- orphan blobs: evidence_blobs rows no evidence row refers to (an upload that
+  died between storing the file and indexing it) are deleted with their files;
+- stray files: blob files with no evidence_blobs row, the redundant copy left
+  when a blob has both a hot and a cold file, and abandoned *.part uploads;
+- cold tier: blobs older than EVIDENCE_COLD_AFTER_DAYS and not read for that
+  long are gzip'd in place (see EvidenceStore.compress).
+
+Quarantined uploads are never swept; they are kept for review.
+
+Orphans and strays are only touched once older than ORPHAN_GRACE, so uploads
+in flight are never collected.
+"""
+import os
+import re
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from modules.data.connection_pool import connection
+from modules.data.evidence_store import COLD_SUFFIX, QUARANTINE_DIR_NAME, TIER_HOT, TMP_DIR_NAME, evidence_store
+from modules.data.migrations import immediate_transaction
+
+try:
+    from config.config import Config
+    EVIDENCE_COLD_AFTER_DAYS = Config.EVIDENCE_COLD_AFTER_DAYS
+    EVIDENCE_DRAFT_RETENTION_DAYS = Config.EVIDENCE_DRAFT_RETENTION_DAYS
+    EVIDENCE_GC_BATCH_SIZE = Config.EVIDENCE_GC_BATCH_SIZE
+except ImportError:
+    EVIDENCE_COLD_AFTER_DAYS = int(os.getenv("EVIDENCE_COLD_AFTER_DAYS", "90"))
+    EVIDENCE_DRAFT_RETENTION_DAYS = int(os.getenv("EVIDENCE_DRAFT_RETENTION_DAYS", "30"))
+    EVIDENCE_GC_BATCH_SIZE = int(os.getenv("EVIDENCE_GC_BATCH_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+ORPHAN_GRACE = timedelta(hours=1)
+
+BLOB_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+# bytes_reclaimed counts deleted files plus what compression saved
+SweepResult = namedtuple('SweepResult', [
+    'expired_drafts', 'orphan_blobs', 'stray_files', 'compressed_blobs', 'bytes_reclaimed',
+])
+
+
+def _blob_sha(name):
+    """Blob hash for a hot or cold file name, or None if it is not a blob file"""
+    sha256 = name[:-len(COLD_SUFFIX)] if name.endswith(COLD_SUFFIX) else name
+    return sha256 if BLOB_NAME.match(sha256) else None
+
+
+def _db_time(value):
+    """datetime -> the 'YYYY-MM-DD HH:MM:SS' UTC text CURRENT_TIMESTAMP writes"""
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class EvidenceSweeper:
+    """Deletes unreferenced evidence and compresses cold evidence, in batches"""
+
+    def __init__(self, store=None, cold_after_days=None, draft_retention_days=None, batch_size=None):
+        self.store = store or evidence_store
+        self.db_path = self.store.db_path
+        self.cold_after_days = EVIDENCE_COLD_AFTER_DAYS if cold_after_days is None else cold_after_days
+        self.draft_retention_days = (EVIDENCE_DRAFT_RETENTION_DAYS if draft_retention_days is None
+                                     else draft_retention_days)
+        self.batch_size = batch_size or EVIDENCE_GC_BATCH_SIZE
+
+    def expire_drafts(self, now=None):
+        """Delete never-submitted evidence past retention; returns (rows, bytes freed)"""
+        cutoff = _db_time((now or datetime.utcnow()) - timedelta(days=self.draft_retention_days))
+        rows = freed = 0
+        while True:
+            with connection(self.db_path) as conn:
+                deleted = conn.execute("""
+                    DELETE FROM evidence WHERE id IN (
+                        SELECT id FROM evidence WHERE assessment_id IS NULL AND uploaded_at < ? LIMIT ?
+                    )
+                    RETURNING user_id, sha256, file_size
+                """, (cutoff, self.batch_size)).fetchall()
+                refunds = {}
+                for user_id, sha256, file_size in deleted:
+                    refunds[user_id] = refunds.get(user_id, 0) + file_size
+                conn.executemany("UPDATE user_storage SET bytes_used = MAX(bytes_used - ?, 0) WHERE user_id = ?",
+                                 [(size, user_id) for user_id, size in refunds.items()])
+                for _, sha256, _ in deleted:
+                    before = self._disk_size(sha256)
+                    if self.store.release(sha256) == 0:
+                        freed += before
+            rows += len(deleted)
+            if len(deleted) < self.batch_size:
+                break
+        if rows:
+            logger.info(f"Expired {rows} draft evidence record(s)")
+        return rows, freed
+
+    def _disk_size(self, sha256):
+        try:
+            return os.path.getsize(self.store.locate(sha256))
+        except FileNotFoundError:
+            return 0
+
+    def sweep_orphan_blobs(self, now=None):
+        """Delete blobs no evidence row refers to; returns (blobs, bytes freed)"""
+        cutoff = _db_time((now or datetime.utcnow()) - ORPHAN_GRACE)
+        unreferenced = """
+            COALESCE(b.touched_at, b.created_at) < ?
+            AND NOT EXISTS (SELECT 1 FROM evidence e WHERE e.sha256 = b.sha256)
+        """
+        blobs = freed = 0
+        after = ''
+        while True:
+            with connection(self.db_path) as conn:
+                batch = [row[0] for row in conn.execute(f"""
+                    SELECT b.sha256 FROM evidence_blobs b WHERE b.sha256 > ? AND {unreferenced}
+                    ORDER BY b.sha256 LIMIT ?
+                """, (after, cutoff, self.batch_size))]
+                if not batch:
+                    break
+                # Re-checked under the write lock: an upload may have claimed one meanwhile
+                placeholders = ', '.join('?' * len(batch))
+                deleted = [row[0] for row in conn.execute(f"""
+                    DELETE FROM evidence_blobs AS b WHERE b.sha256 IN ({placeholders}) AND {unreferenced}
+                    RETURNING sha256
+                """, batch + [cutoff])]
+                for sha256 in deleted:
+                    freed += self.store._unlink(sha256)
+            blobs += len(deleted)
+            after = batch[-1]
+        if blobs:
+            logger.info(f"Deleted {blobs} unreferenced evidence blob(s)")
+        return blobs, freed
+
+    def sweep_stray_files(self, now=None):
+        """Delete files with no blob row, redundant tier copies and abandoned uploads; returns (files, bytes)"""
+        # File mtimes are epoch seconds; now is naive UTC like everywhere else here
+        older_than = ((now or datetime.utcnow()) - ORPHAN_GRACE).replace(tzinfo=timezone.utc).timestamp()
+        files = freed = 0
+
+        for name in os.listdir(self.store.tmp_dir):
+            path = os.path.join(self.store.tmp_dir, name)
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime < older_than:
+                    os.remove(path)
+                    files += 1
+                    freed += stat.st_size
+            except FileNotFoundError:
+                # put() or compress() finished with it since the listing
+                continue
+
+        batch = []
+        for path in self._blob_files():
+            batch.append(path)
+            if len(batch) >= self.batch_size:
+                removed, size = self._sweep_files(batch, older_than)
+                files, freed = files + removed, freed + size
+                batch = []
+        if batch:
+            removed, size = self._sweep_files(batch, older_than)
+            files, freed = files + removed, freed + size
+        if files:
+            logger.info(f"Deleted {files} stray evidence file(s)")
+        return files, freed
+
+    def _blob_files(self):
+        for dirpath, dirnames, filenames in os.walk(self.store.root):
+            if dirpath == self.store.root:
+                dirnames[:] = [name for name in dirnames if name not in (TMP_DIR_NAME, QUARANTINE_DIR_NAME)]
+            for name in filenames:
+                if _blob_sha(name):
+                    yield os.path.join(dirpath, name)
+
+    def _sweep_files(self, paths, older_than):
+        by_sha = {}
+        for path in paths:
+            by_sha.setdefault(_blob_sha(os.path.basename(path)), []).append(path)
+        removed = freed = 0
+        # Holds the write lock throughout, so put() and compress() cannot move files underneath us
+        with connection(self.db_path) as conn, immediate_transaction(conn):
+            placeholders = ', '.join('?' * len(by_sha))
+            tiers = dict(conn.execute(
+                f"SELECT sha256, tier FROM evidence_blobs WHERE sha256 IN ({placeholders})", list(by_sha)
+            ).fetchall())
+            for sha256, found in by_sha.items():
+                hot_path, cold_path = self.store.path_for(sha256), self.store.cold_path_for(sha256)
+                if sha256 not in tiers:
+                    stale = found
+                elif os.path.exists(hot_path) and os.path.exists(cold_path):
+                    # Keep the copy the row says is current; a lone file is always kept
+                    stale = [cold_path if tiers[sha256] == TIER_HOT else hot_path]
+                else:
+                    stale = []
+                for path in stale:
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if stat.st_mtime < older_than:
+                        os.remove(path)
+                        removed += 1
+                        freed += stat.st_size
+        return removed, freed
+
+    def compress_cold(self, now=None):
+        """Move evidence not read for cold_after_days to the cold tier; returns (blobs, bytes saved)"""
+        cutoff = _db_time((now or datetime.utcnow()) - timedelta(days=self.cold_after_days))
+        compressed = saved = 0
+        after = ''
+        while True:
+            with connection(self.db_path) as conn:
+                batch = [row[0] for row in conn.execute("""
+                    SELECT sha256 FROM evidence_blobs
+                    WHERE tier = ? AND created_at < ? AND COALESCE(last_accessed_at, created_at) < ?
+                      AND sha256 > ?
+                    ORDER BY sha256 LIMIT ?
+                """, (TIER_HOT, cutoff, cutoff, after, self.batch_size))]
+            if not batch:
+                break
+            for sha256 in batch:
+                bytes_saved = self.store.compress(sha256)
+                if bytes_saved:
+                    compressed += 1
+                    saved += bytes_saved
+            after = batch[-1]
+        if compressed:
+            logger.info(f"Moved {compressed} evidence blob(s) to the cold tier, saving {saved} bytes")
+        return compressed, saved
+
+    def run(self, now=None):
+        """All sweeps, drafts first so the blobs they release are freed in the same run"""
+        now = now or datetime.utcnow()
+        drafts, draft_bytes = self.expire_drafts(now)
+        orphans, orphan_bytes = self.sweep_orphan_blobs(now)
+        strays, stray_bytes = self.sweep_stray_files(now)
+        compressed, saved = self.compress_cold(now)
+        return SweepResult(drafts, orphans, strays, compressed, draft_bytes + orphan_bytes + stray_bytes + saved)
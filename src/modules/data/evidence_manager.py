@@ -1,31 +1,124 @@
 import streamlit as st
-import os
-import uuid
-from datetime import datetime
+import logging
+from collections import namedtuple
 from typing import Dict, List, Optional
-import json
+
+from modules.assessment.data_modules import Evidence
+from modules.data.connection_pool import connection
+from modules.data.evidence_search import evidence_index
+from modules.data.evidence_store import EvidenceInfectedError, EvidenceTooLargeError, evidence_store
+from modules.data.records import EvidenceHit, EvidenceRecord
+from modules.data.text_extraction import STATUS_DONE, STATUS_PENDING
+from modules.utils.audit_logger import AuditLogger
+from modules.utils.services import lazy_service
+from modules.utils.throttle import throttle_allows
+from modules.utils.validators import MAX_USER_STORAGE_MB, validators
+from modules.utils.virus_scan import ScanError
+
+logger = logging.getLogger(__name__)
+
+EVIDENCE_COLUMNS = ', '.join(EvidenceRecord._fields)
+
+# Whose evidence a call sees. A submitted assessment is addressed by
+# (org_id, assessment_id); an attempt still in progress by its submission key,
+# and its rows are attached to the assessment id when it is saved
+EvidenceScope = namedtuple('EvidenceScope', ['user_id', 'org_id', 'assessment_id', 'submission_key'])
+
+
+class StorageQuotaExceededError(ValueError):
+    """The upload would take the user past their evidence storage quota"""
+
+
+def _scope_filter(scope, table=None):
+    prefix = f"{table}." if table else ""
+    if scope.assessment_id is not None:
+        # Users without an organisation only see their own rows
+        if scope.org_id is None:
+            return f"{prefix}user_id = ? AND {prefix}assessment_id = ?", [scope.user_id, scope.assessment_id]
+        return f"{prefix}org_id = ? AND {prefix}assessment_id = ?", [scope.org_id, scope.assessment_id]
+    return f"{prefix}submission_key = ?", [scope.submission_key]
+
 
 class EvidenceManager:
-    def __init__(self):
-        self.evidence_dir = "evidence_uploads"
-        self._ensure_evidence_dir()
+    def __init__(self, store=None, storage_quota=None, index=None):
+        # Files live in the content-addressed store; identical uploads share one blob
+        self.store = store or evidence_store
+        # Background text extraction; a manager over its own store only gets one if passed in
+        self.index = index if index is not None or store is not None else evidence_index
+        self.evidence_dir = self.store.root
+        self.db_path = self.store.db_path
+        self.storage_quota = storage_quota or MAX_USER_STORAGE_MB * 1024 * 1024
     
-    def _ensure_evidence_dir(self):
-        """Create evidence directory if it doesn't exist"""
-        if not os.path.exists(self.evidence_dir):
-            os.makedirs(self.evidence_dir)
+    def session_scope(self) -> Optional[EvidenceScope]:
+        """Scope of the signed-in user's current assessment attempt, or None for guests"""
+        user = st.session_state.get("user") or {}
+        user_id = user.get("user_id")
+        submission_key = st.session_state.get("submission_key")
+        if user_id is None or submission_key is None:
+            return None
+        org_id = user.get("org_id", st.session_state.get("org_id"))
+        if org_id is None:
+            with connection(self.db_path) as conn:
+                row = conn.execute("SELECT org_id FROM users WHERE id = ?", (user_id,)).fetchone()
+            org_id = row[0] if row else None
+        return EvidenceScope(user_id, org_id, None, submission_key)
+    
+    def storage_used(self, user_id: int) -> int:
+        """Bytes of evidence the user has uploaded"""
+        with connection(self.db_path) as conn:
+            row = conn.execute("SELECT bytes_used FROM user_storage WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+    
+    def add_evidence(self, scope: EvidenceScope, question_id: str, file_name: str, file_type: str,
+                     blob, description: str = "") -> EvidenceRecord:
+        """Index a stored blob under scope, charging its size to the user's quota.
+
+        The quota check and the insert are one transaction, so concurrent
+        uploads cannot overshoot it. On StorageQuotaExceededError the blob
+        reference taken by the upload is released.
+        """
+        with connection(self.db_path) as conn:
+            conn.execute("INSERT INTO user_storage (user_id) VALUES (?) ON CONFLICT(user_id) DO NOTHING",
+                         (scope.user_id,))
+            charged = conn.execute("""
+                UPDATE user_storage SET bytes_used = bytes_used + ?1
+                WHERE user_id = ?2 AND bytes_used + ?1 <= ?3
+                RETURNING bytes_used
+            """, (blob.size, scope.user_id, self.storage_quota)).fetchone()
+            if charged is not None:
+                row = conn.execute(f"""
+                    INSERT INTO evidence (org_id, user_id, assessment_id, submission_key, question_id, sha256,
+                                          file_name, file_type, file_size, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    RETURNING {EVIDENCE_COLUMNS}
+                """, (scope.org_id, scope.user_id, scope.assessment_id, scope.submission_key, question_id,
+                      blob.sha256, file_name, file_type, blob.size, description)).fetchone()
+        if charged is None:
+            self.store.release(blob.sha256)
+            raise StorageQuotaExceededError(
+                f"Upload would exceed your {self.storage_quota // (1024 * 1024)}MB evidence storage quota")
+        return EvidenceRecord._make(row)
     
-    def upload_evidence(self, question_id: str, uploaded_file, description: str = "") -> Dict:
+    def upload_evidence(self, question_id: str, uploaded_file, description: str = "",
+                        scope: Optional[EvidenceScope] = None) -> Optional[EvidenceRecord]:
         """Upload and store evidence for a specific question with security validation"""
         try:
             if uploaded_file is not None:
+                scope = scope or self.session_scope()
+                if scope is None:
+                    st.error("Sign in to attach evidence to an assessment")
+                    return None
+                
+                if not throttle_allows("evidence_upload"):
+                    return None
+                
                 # Server-side file validation
                 file_size = uploaded_file.size
-                max_file_size = 10 * 1024 * 1024  # 10MB
+                max_file_size = self.store.max_bytes
                 
                 # Check file size
                 if file_size > max_file_size:
-                    st.error(f"File exceeds 10MB limit ({file_size / 1024 / 1024:.1f}MB)")
+                    st.error(f"File exceeds {max_file_size // (1024 * 1024)}MB limit ({file_size / 1024 / 1024:.1f}MB)")
                     return None
                 
                 # Validate file type (server-side, not just client-side)
@@ -43,104 +136,165 @@ class EvidenceManager:
                     st.error(f"File type '{uploaded_file.type}' not allowed. Allowed: PDF, DOC, DOCX, TXT, PNG, JPG")
                     return None
                 
-                # Check for path traversal attempts
-                filename = uploaded_file.name
-                if '..' in filename or '/' in filename or '\\' in filename:
-                    st.error("Invalid filename detected")
+                # Path traversal and the storage quota, before any bytes are written
+                valid, message = validators.validate_file_upload(
+                    uploaded_file.name, file_size,
+                    storage_used=self.storage_used(scope.user_id), storage_quota=self.storage_quota
+                )
+                if not valid:
+                    st.error(message)
                     return None
                 
-                # Generate unique file name (sanitized)
-                import re
-                safe_filename = re.sub(r'[^a-zA-Z0-9._-]', '', filename)
-                file_extension = safe_filename.split('.')[-1] if '.' in safe_filename else 'bin'
-                unique_id = str(uuid.uuid4())[:8]
-                file_name = f"{question_id}_{unique_id}.{file_extension}"
-                file_path = os.path.join(self.evidence_dir, file_name)
-                
-                # Save file
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                # Create evidence record
-                evidence_record = {
-                    'id': unique_id,
-                    'question_id': question_id,
-                    'file_name': uploaded_file.name,
-                    'stored_name': file_name,
-                    'file_size': uploaded_file.size,
-                    'file_type': uploaded_file.type,
-                    'description': description,
-                    'upload_date': datetime.now().isoformat(),
-                    'file_path': file_path
-                }
-                
-                # Update session state
-                if 'evidence' not in st.session_state:
-                    st.session_state.evidence = {}
-                
-                if question_id not in st.session_state.evidence:
-                    st.session_state.evidence[question_id] = []
-                
-                st.session_state.evidence[question_id].append(evidence_record)
+                # Stream the file into the store in chunks (also enforces the size limit and virus scan)
+                try:
+                    blob = self.store.put(uploaded_file, max_bytes=max_file_size)
+                    record = self.add_evidence(scope, question_id, uploaded_file.name, uploaded_file.type,
+                                               blob, description)
+                except (EvidenceTooLargeError, StorageQuotaExceededError) as e:
+                    st.error(str(e))
+                    return None
+                except EvidenceInfectedError as e:
+                    AuditLogger.log_security_event(
+                        "evidence_infected",
+                        "warning",
+                        {'file_name': uploaded_file.name, 'sha256': e.sha256, 'signature': e.signature,
+                         'question_id': question_id},
+                        user_id=scope.user_id
+                    )
+                    st.error(str(e))
+                    return None
+                except ScanError as e:
+                    # Fail closed: nothing unscanned is stored
+                    logger.error(f"Virus scan unavailable, evidence upload refused: {str(e)}")
+                    st.error("The virus scanner is unavailable; please try the upload again later")
+                    return None
                 
-                return evidence_record
+                # Text is extracted in the background; the record is searchable by name already
+                if self.index is not None:
+                    self.index.notify()
+                return record
             return None
             
         except Exception as e:
+            logger.error(f"Evidence upload failed: {str(e)}")
             st.error(f"Evidence upload failed: {str(e)}")
             return None
     
-    def get_question_evidence(self, question_id: str) -> List[Dict]:
+    def get_question_evidence(self, question_id: str, scope: Optional[EvidenceScope] = None) -> List[EvidenceRecord]:
         """Get all evidence for a specific question"""
-        if 'evidence' in st.session_state and question_id in st.session_state.evidence:
-            return st.session_state.evidence[question_id]
-        return []
+        scope = scope or self.session_scope()
+        if scope is None:
+            return []
+        condition, params = _scope_filter(scope)
+        with connection(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT {EVIDENCE_COLUMNS} FROM evidence WHERE {condition} AND question_id = ? ORDER BY id",
+                params + [question_id]
+            ).fetchall()
+        return [EvidenceRecord._make(row) for row in rows]
     
-    def get_all_evidence(self) -> Dict:
+    def get_all_evidence(self, scope: Optional[EvidenceScope] = None) -> Dict[str, List[EvidenceRecord]]:
         """Get all evidence across all questions"""
-        return st.session_state.get('evidence', {})
+        scope = scope or self.session_scope()
+        if scope is None:
+            return {}
+        condition, params = _scope_filter(scope)
+        evidence = {}
+        with connection(self.db_path) as conn:
+            rows = conn.execute(
+                f"SELECT {EVIDENCE_COLUMNS} FROM evidence WHERE {condition} ORDER BY question_id, id", params
+            ).fetchall()
+        for record in map(EvidenceRecord._make, rows):
+            evidence.setdefault(record.question_id, []).append(record)
+        return evidence
     
-    def delete_evidence(self, question_id: str, evidence_id: str) -> bool:
-        """Delete specific evidence"""
+    def delete_evidence(self, question_id: str, evidence_id: int, scope: Optional[EvidenceScope] = None) -> bool:
+        """Delete specific evidence, refunding its size and releasing its blob"""
         try:
-            if 'evidence' in st.session_state and question_id in st.session_state.evidence:
-                # Remove from session state
-                st.session_state.evidence[question_id] = [
-                    ev for ev in st.session_state.evidence[question_id] 
-                    if ev['id'] != evidence_id
-                ]
-                
-                # Remove file if empty
-                if not st.session_state.evidence[question_id]:
-                    del st.session_state.evidence[question_id]
-                
-                return True
-            return False
+            scope = scope or self.session_scope()
+            if scope is None:
+                return False
+            condition, params = _scope_filter(scope)
+            with connection(self.db_path) as conn:
+                row = conn.execute(
+                    f"DELETE FROM evidence WHERE id = ? AND question_id = ? AND {condition} "
+                    "RETURNING user_id, sha256, file_size",
+                    [evidence_id, question_id] + params
+                ).fetchone()
+                if row is None:
+                    return False
+                user_id, sha256, file_size = row
+                conn.execute("UPDATE user_storage SET bytes_used = MAX(bytes_used - ?, 0) WHERE user_id = ?",
+                             (file_size, user_id))
+                # Drop the record's reference; the blob goes with its last one
+                self.store.release(sha256)
+            return True
         except Exception as e:
+            logger.error(f"Evidence deletion failed: {str(e)}")
             st.error(f"Evidence deletion failed: {str(e)}")
             return False
     
-    def get_evidence_summary(self) -> Dict:
+    def get_evidence_summary(self, scope: Optional[EvidenceScope] = None) -> Dict:
         """Get summary of all evidence"""
-        evidence = self.get_all_evidence()
         summary = {
             'total_files': 0,
             'total_size': 0,
             'by_question': {},
             'file_types': {}
         }
+        scope = scope or self.session_scope()
+        if scope is None:
+            return summary
+        condition, params = _scope_filter(scope)
+        with connection(self.db_path) as conn:
+            rows = conn.execute(f"""
+                SELECT question_id, COALESCE(file_type, 'unknown'), COUNT(*), SUM(file_size)
+                FROM evidence WHERE {condition}
+                GROUP BY question_id, file_type
+            """, params).fetchall()
         
-        for question_id, evidence_list in evidence.items():
-            summary['by_question'][question_id] = len(evidence_list)
-            summary['total_files'] += len(evidence_list)
-            
-            for evidence_item in evidence_list:
-                summary['total_size'] += evidence_item.get('file_size', 0)
-                file_type = evidence_item.get('file_type', 'unknown')
-                summary['file_types'][file_type] = summary['file_types'].get(file_type, 0) + 1
+        for question_id, file_type, count, size in rows:
+            summary['by_question'][question_id] = summary['by_question'].get(question_id, 0) + count
+            summary['file_types'][file_type] = summary['file_types'].get(file_type, 0) + count
+            summary['total_files'] += count
+            summary['total_size'] += size
         
         return summary
     
+    def get_evidence_documents(self, scope: Optional[EvidenceScope] = None) -> List[Evidence]:
+        """Evidence with its extracted text, for analysis and reporting"""
+        scope = scope or self.session_scope()
+        if scope is None:
+            return []
+        condition, params = _scope_filter(scope, 'e')
+        with connection(self.db_path) as conn:
+            rows = conn.execute(f"""
+                SELECT e.question_id, e.file_name, t.status, t.content, t.error
+                FROM evidence e LEFT JOIN evidence_text t ON t.sha256 = e.sha256
+                WHERE {condition}
+                ORDER BY e.question_id, e.id
+            """, params).fetchall()
+        
+        documents = []
+        for question_id, file_name, status, content, error in rows:
+            if status == STATUS_DONE:
+                analysis = f"{len(content.split())} words extracted"
+            elif status == STATUS_PENDING or status is None:
+                analysis = "Text extraction pending"
+            else:
+                analysis = f"No text extracted: {error}"
+            documents.append(Evidence(question_id, file_name, content or "", analysis))
+        return documents
+    
+    def search_evidence(self, text: str, question_id: Optional[str] = None, domain_id: Optional[str] = None,
+                        scope: Optional[EvidenceScope] = None, framework=None) -> List[EvidenceHit]:
+        """Ranked full-text search over the organisation's evidence"""
+        scope = scope or self.session_scope()
+        if scope is None or self.index is None:
+            return []
+        return self.index.search(text, scope.org_id, question_id=question_id, domain_id=domain_id,
+                                 assessment_id=scope.assessment_id, framework=framework, user_id=scope.user_id)
+    
     def render_evidence_upload(self, question_id: str, question_text: str) -> None:
         """Render evidence upload interface for a question"""
         with st.expander("📎 Attach Supporting Evidence", expanded=False):
@@ -175,15 +329,15 @@ class EvidenceManager:
                 for evidence in existing_evidence:
                     col1, col2, col3 = st.columns([3, 1, 1])
                     with col1:
-                        st.write(f"📄 {evidence['file_name']}")
-                        if evidence['description']:
-                            st.caption(f"*{evidence['description']}*")
+                        st.write(f"📄 {evidence.file_name}")
+                        if evidence.description:
+                            st.caption(f"*{evidence.description}*")
                     with col2:
-                        st.write(f"{evidence['file_size'] // 1024} KB")
+                        st.write(f"{evidence.file_size // 1024} KB")
                     with col3:
-                        if st.button("🗑️", key=f"del_{evidence['id']}"):
-                            self.delete_evidence(question_id, evidence['id'])
+                        if st.button("🗑️", key=f"del_{evidence.id}"):
+                            self.delete_evidence(question_id, evidence.id)
                             st.rerun()
 
 # Global instance
-evidence_manager = EvidenceManager()
\ No newline at end of file
+evidence_manager = lazy_service('evidence_manager', EvidenceManager)
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Background text extraction and full-text search over evidence
+
+Indexing evidence adds a 'pending' evidence_text row for its blob, in the
+same transaction as the upload (see migration 8), so uploads never wait for
+extraction. EvidenceIndex drains that queue in batches on a ProcessPoolExecutor
+with one worker per CPU; results are written back from this process, and
+triggers copy them into the evidence_fts index for every evidence row that
+shares the blob. Each distinct file is extracted once, however often it is
+uploaded.
+
+Search is ranked by FTS5's bm25, weighting the file name over the description
+over the body, and is always scoped to one organisation.
+"""
+import os
+import re
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from modules.data.connection_pool import connection
+from modules.data.evidence_store import evidence_store
+from modules.data.records import EvidenceHit, EvidenceRecord
+from modules.data.text_extraction import STATUS_FAILED, STATUS_PENDING, Extraction, extract_text
+from modules.utils.services import lazy_service
+
+try:
+    from config.config import Config
+    EVIDENCE_INDEX_WORKERS = Config.EVIDENCE_INDEX_WORKERS
+    EVIDENCE_TEXT_MAX_CHARS = Config.EVIDENCE_TEXT_MAX_CHARS
+except ImportError:
+    EVIDENCE_INDEX_WORKERS = int(os.getenv("EVIDENCE_INDEX_WORKERS", "0"))
+    EVIDENCE_TEXT_MAX_CHARS = int(os.getenv("EVIDENCE_TEXT_MAX_CHARS", "1000000"))
+
+logger = logging.getLogger(__name__)
+
+# Files handed to the pool per round, per worker
+BATCH_PER_WORKER = 4
+
+# How often the background thread looks for work queued by other processes
+POLL_SECONDS = 30.0
+
+SEARCH_LIMIT = 20
+
+EVIDENCE_SELECT = ', '.join(f"e.{field}" for field in EvidenceRecord._fields)
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    words = re.findall(r'\w+', text or '')
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class EvidenceIndex:
+    """Extraction queue worker and search front end for the evidence_fts index"""
+
+    def __init__(self, store=None, workers=None, max_chars=None):
+        self.store = store or evidence_store
+        self.db_path = self.store.db_path
+        self.workers = workers or EVIDENCE_INDEX_WORKERS or os.cpu_count() or 1
+        self.max_chars = max_chars or EVIDENCE_TEXT_MAX_CHARS
+        self.batch_size = self.workers * BATCH_PER_WORKER
+        self._pool = None
+        self._run_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # -- extraction ---------------------------------------------------------
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a process that runs threads (Streamlit, the log listener) is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def pending_count(self):
+        with connection(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM evidence_text WHERE status = ?",
+                                (STATUS_PENDING,)).fetchone()[0]
+
+    def index_pending(self, limit=None):
+        """Extract queued files until the queue is empty (or limit files are done); returns the count"""
+        indexed = 0
+        with self._run_lock:
+            while limit is None or indexed < limit:
+                size = self.batch_size if limit is None else min(self.batch_size, limit - indexed)
+                with connection(self.db_path) as conn:
+                    batch = conn.execute(
+                        "SELECT sha256, file_type FROM evidence_text WHERE status = ? LIMIT ?",
+                        (STATUS_PENDING, size)
+                    ).fetchall()
+                if not batch:
+                    break
+                self._save(self._extract(batch))
+                indexed += len(batch)
+        if indexed:
+            logger.info(f"Extracted text from {indexed} evidence file(s)")
+        return indexed
+
+    def _extract(self, batch):
+        pool = self._get_pool()
+        futures = {}
+        results = []
+        for sha256, file_type in batch:
+            try:
+                # Hot or cold tier
+                path = self.store.locate(sha256)
+            except FileNotFoundError as e:
+                results.append((STATUS_FAILED, None, f"Blob file is missing: {e}", sha256))
+                continue
+            futures[pool.submit(extract_text, path, file_type, self.max_chars)] = sha256
+        for future in as_completed(futures):
+            sha256 = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool as e:
+                # A worker died (e.g. a parser crash); start a fresh pool for the next batch
+                self._pool = None
+                result = Extraction(STATUS_FAILED, None, f"Extraction worker died: {e}")
+            if result.status == STATUS_FAILED:
+                logger.warning(f"Text extraction failed for evidence blob {sha256}: {result.error}")
+            results.append((result.status, result.content, result.error, sha256))
+        return results
+
+    def _save(self, results):
+        with connection(self.db_path) as conn:
+            # Only pending rows: another process may have finished the same blob first
+            conn.executemany("""
+                UPDATE evidence_text SET status = ?, content = ?, error = ?, extracted_at = CURRENT_TIMESTAMP
+                WHERE sha256 = ? AND status = 'pending'
+            """, results)
+
+    # -- background thread --------------------------------------------------
+
+    def notify(self):
+        """Tell the background indexer there is new work, starting it if needed"""
+        self.start()
+        self._wake.set()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='evidence-indexer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                self.index_pending()
+            except Exception as e:
+                logger.error(f"Evidence indexing failed: {str(e)}")
+
+    def stop(self):
+        """Stop the background thread and the worker processes"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # -- search -------------------------------------------------------------
+
+    def search(self, text, org_id, question_id=None, domain_id=None, assessment_id=None,
+               framework=None, limit=SEARCH_LIMIT, user_id=None):
+        """Best matches for text among an organisation's evidence, best first.
+
+        A user without an organisation (org_id None) searches only their own
+        evidence, by user_id. domain_id narrows to the questions of that
+        domain in framework (the default framework if none is given).
+        """
+        query = fts_query(text)
+        if query is None or (org_id is None and user_id is None):
+            return []
+        if org_id is not None:
+            conditions = ["evidence_fts MATCH ?", "e.org_id = ?"]
+            params = [query, org_id]
+        else:
+            conditions = ["evidence_fts MATCH ?", "e.user_id = ?"]
+            params = [query, user_id]
+        if assessment_id is not None:
+            conditions.append("e.assessment_id = ?")
+            params.append(assessment_id)
+        if question_id is not None:
+            conditions.append("e.question_id = ?")
+            params.append(question_id)
+        if domain_id is not None:
+            if framework is None:
+                from modules.assessment.framework import get_assessment_framework
+                framework = get_assessment_framework()
+            question_ids = [qid for qid, _ in framework.domain_questions.get(domain_id, ())]
+            if not question_ids:
+                return []
+            conditions.append(f"e.question_id IN ({', '.join('?' * len(question_ids))})")
+            params.extend(question_ids)
+
+        with connection(self.db_path) as conn:
+            rows = conn.execute(f"""
+                SELECT {EVIDENCE_SELECT},
+                       snippet(evidence_fts, -1, '**', '**', '…', 16), rank
+                FROM evidence_fts JOIN evidence e ON e.id = evidence_fts.rowid
+                WHERE {' AND '.join(conditions)}
+                ORDER BY rank
+                LIMIT ?
+            """, params + [limit]).fetchall()
+        width = len(EvidenceRecord._fields)
+        return [EvidenceHit(EvidenceRecord._make(row[:width]), row[width], row[width + 1]) for row in rows]
+
+
+evidence_index = lazy_service('evidence_index', EvidenceIndex)
+
+
+def _stop_index():
+    from modules.utils.services import services
+    if services.is_initialized('evidence_index'):
+        evidence_index.stop()
+
+
+atexit.register(_stop_index)
@@ -0,0 +1,349 @@
+"""
+Content-addressed storage for evidence files
+
+Uploads are streamed to a temporary file in fixed-size chunks while their
+SHA-256 is computed, then moved to <root>/<aa>/<bb>/<sha256>, so a file's path
+is derived from its content and identical uploads share one copy on disk.
+Each blob has a reference count in the evidence_blobs table; the count change
+and the file move/unlink happen while the database write lock is held, so a
+concurrent upload of the same content can never see a blob being deleted.
+The last release deletes the row at once but the file only after that
+transaction commits, re-checked under the write lock, so a rollback never
+leaves a row pointing at a deleted file.
+
+Old, rarely read blobs can be moved to a cold tier: gzip'd next to their hot
+path as <sha256>.gz. Readers try the hot file first and fall back to the cold
+one, so a blob is readable throughout the swap.
+
+When a scanner is configured (VIRUS_SCAN_ENABLED), each chunk is also streamed
+to clamd as it is hashed and written, so scanning costs little beyond the
+wait for the final verdict. Verdicts are cached by content hash in
+scan_verdicts: a seekable upload is hashed first, and content seen before is
+not sent to clamd again. Infected uploads are moved to <root>/quarantine and
+refused; if the scan cannot complete, the upload is refused too.
+"""
+import os
+import gzip
+import uuid
+import shutil
+import hashlib
+import logging
+from collections import namedtuple
+
+from modules.data.connection_pool import after_commit, connection
+from modules.data.migrations import immediate_transaction, migrate
+from modules.utils.services import lazy_service
+from modules.utils.virus_scan import VERDICT_INFECTED, ScanVerdict, default_scanner
+
+try:
+    from config.config import Config
+    EVIDENCE_DIR = Config.EVIDENCE_DIR
+    EVIDENCE_CHUNK_SIZE_KB = Config.EVIDENCE_CHUNK_SIZE_KB
+    MAX_UPLOAD_SIZE_MB = Config.MAX_UPLOAD_SIZE_MB
+except ImportError:
+    EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", "evidence_uploads")
+    EVIDENCE_CHUNK_SIZE_KB = int(os.getenv("EVIDENCE_CHUNK_SIZE_KB", "64"))
+    MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "data/governance_assessments.db"
+
+TMP_DIR_NAME = 'tmp'
+QUARANTINE_DIR_NAME = 'quarantine'
+
+TIER_HOT = 'hot'
+TIER_COLD = 'cold'
+# Looked at for the cold tier but left as is: compressing saved too little
+TIER_INCOMPRESSIBLE = 'incompressible'
+
+COLD_SUFFIX = '.gz'
+# A blob goes cold only if gzip saves at least this fraction of its size
+COLD_MIN_SAVING = 0.1
+
+# deduplicated: the content was already stored, so no new bytes hit the disk
+StoredBlob = namedtuple('StoredBlob', ['sha256', 'size', 'path', 'refcount', 'deduplicated'])
+
+
+class EvidenceTooLargeError(ValueError):
+    """The upload exceeded the store's size limit while streaming"""
+
+
+class EvidenceInfectedError(ValueError):
+    """The virus scanner flagged the upload; it was quarantined, not stored"""
+
+    def __init__(self, sha256, signature):
+        super().__init__(f"Upload rejected: malware detected ({signature})")
+        self.sha256 = sha256
+        self.signature = signature
+
+
+class EvidenceStore:
+    """Sharded, deduplicating, reference-counted blob store"""
+
+    def __init__(self, root=None, db_path=DEFAULT_DB_PATH, chunk_size=None, max_bytes=None, scanner=None):
+        self.root = root or EVIDENCE_DIR
+        self.db_path = db_path
+        self.chunk_size = chunk_size or EVIDENCE_CHUNK_SIZE_KB * 1024
+        self.max_bytes = max_bytes or MAX_UPLOAD_SIZE_MB * 1024 * 1024
+        # A ClamdScanner (or anything with session()); None when scanning is disabled
+        self.scanner = scanner if scanner is not None else default_scanner()
+        self.tmp_dir = os.path.join(self.root, TMP_DIR_NAME)
+        self.quarantine_dir = os.path.join(self.root, QUARANTINE_DIR_NAME)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        migrate(self.db_path)
+
+    def path_for(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+    
+    def cold_path_for(self, sha256):
+        return self.path_for(sha256) + COLD_SUFFIX
+    
+    def locate(self, sha256):
+        """Path of the blob's file on disk, hot or cold"""
+        path = self.path_for(sha256)
+        if os.path.exists(path):
+            return path
+        cold_path = self.cold_path_for(sha256)
+        if os.path.exists(cold_path):
+            return cold_path
+        raise FileNotFoundError(path)
+    
+    def _unlink(self, sha256):
+        """Remove the blob's files; returns the bytes freed"""
+        freed = 0
+        for path in (self.path_for(sha256), self.cold_path_for(sha256)):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                freed += size
+            except FileNotFoundError:
+                continue
+        return freed
+
+    def quarantine_path_for(self, sha256):
+        return os.path.join(self.quarantine_dir, sha256)
+
+    def verdict(self, sha256):
+        """Cached ScanVerdict for the content, or None if it was never scanned"""
+        with connection(self.db_path) as conn:
+            row = conn.execute("SELECT status, signature FROM scan_verdicts WHERE sha256 = ?",
+                               (sha256,)).fetchone()
+        return ScanVerdict._make(row) if row else None
+
+    def _record_verdict(self, sha256, size, verdict):
+        with connection(self.db_path) as conn:
+            conn.execute("""
+                INSERT INTO scan_verdicts (sha256, status, signature, size) VALUES (?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET status = excluded.status, signature = excluded.signature,
+                                                  scanned_at = CURRENT_TIMESTAMP
+            """, (sha256, verdict.status, verdict.signature, size))
+
+    def _hash(self, stream, max_bytes):
+        digest = hashlib.sha256()
+        size = 0
+        stream.seek(0)
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                return digest.hexdigest(), size
+            size += len(chunk)
+            if size > max_bytes:
+                raise EvidenceTooLargeError(f"Upload exceeds {max_bytes // (1024 * 1024)}MB limit")
+            digest.update(chunk)
+
+    def _reuse_scanned(self, stream, max_bytes):
+        """Check a seekable upload against the verdict cache before it is written.
+
+        Returns a StoredBlob if the content is known clean and already stored,
+        True if it is known clean (store it without scanning), or False if it
+        has never been scanned. Raises EvidenceInfectedError for known malware.
+        """
+        sha256, size = self._hash(stream, max_bytes)
+        verdict = self.verdict(sha256)
+        if verdict is None:
+            return False
+        if verdict.status == VERDICT_INFECTED:
+            logger.warning(f"Rejected a re-upload of quarantined evidence {sha256} ({verdict.signature})")
+            raise EvidenceInfectedError(sha256, verdict.signature)
+        try:
+            refcount = self.incref(sha256)
+        except KeyError:
+            return True
+        return StoredBlob(sha256, size, self.path_for(sha256), refcount, True)
+
+    def _quarantine(self, tmp_path, sha256):
+        os.makedirs(self.quarantine_dir, exist_ok=True)
+        os.replace(tmp_path, self.quarantine_path_for(sha256))
+
+    def put(self, stream, max_bytes=None):
+        """Store a readable binary stream and take one reference to its blob.
+
+        Raises EvidenceInfectedError if the scanner flags it, and ScanError if
+        a scan was needed but could not be completed.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        session = None
+        if self.scanner is not None:
+            cached = self._reuse_scanned(stream, max_bytes) if hasattr(stream, 'seek') else False
+            if isinstance(cached, StoredBlob):
+                return cached
+            if not cached:
+                session = self.scanner.session()
+        if hasattr(stream, 'seek'):
+            stream.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise EvidenceTooLargeError(f"Upload exceeds {max_bytes // (1024 * 1024)}MB limit")
+                    digest.update(chunk)
+                    if session is not None:
+                        # Queued for the scanner's sender thread; scanning overlaps the write
+                        session.feed(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            sha256 = digest.hexdigest()
+            if session is not None:
+                verdict, session = session.finish(), None
+                self._record_verdict(sha256, size, verdict)
+                if verdict.status == VERDICT_INFECTED:
+                    self._quarantine(tmp_path, sha256)
+                    logger.warning(f"Quarantined evidence upload {sha256}: {verdict.signature}")
+                    raise EvidenceInfectedError(sha256, verdict.signature)
+            path = self.path_for(sha256)
+            with connection(self.db_path) as conn:
+                # Taking the write lock first serializes us against release()
+                refcount = conn.execute("""
+                    INSERT INTO evidence_blobs (sha256, size, refcount, touched_at)
+                    VALUES (?, ?, 1, CURRENT_TIMESTAMP)
+                    ON CONFLICT(sha256) DO UPDATE SET refcount = refcount + 1, touched_at = CURRENT_TIMESTAMP
+                    RETURNING refcount
+                """, (sha256, size)).fetchone()[0]
+                deduplicated = os.path.exists(path) or os.path.exists(self.cold_path_for(sha256))
+                if not deduplicated:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+            return StoredBlob(sha256, size, path, refcount, deduplicated)
+        except BaseException:
+            if session is not None:
+                session.abort()
+            raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def incref(self, sha256):
+        """Take another reference to an existing blob; returns the new count"""
+        with connection(self.db_path) as conn:
+            row = conn.execute(
+                "UPDATE evidence_blobs SET refcount = refcount + 1, touched_at = CURRENT_TIMESTAMP "
+                "WHERE sha256 = ? RETURNING refcount",
+                (sha256,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(sha256)
+        return row[0]
+
+    def release(self, sha256):
+        """Drop one reference; the blob is deleted with its last reference. Returns the remaining count"""
+        with connection(self.db_path) as conn:
+            row = conn.execute(
+                "UPDATE evidence_blobs SET refcount = refcount - 1 WHERE sha256 = ? AND refcount > 0 "
+                "RETURNING refcount",
+                (sha256,)
+            ).fetchone()
+            if row is None:
+                return 0
+            if row[0] == 0:
+                conn.execute("DELETE FROM evidence_blobs WHERE sha256 = ?", (sha256,))
+                # Not before the delete commits; the caller's transaction may still roll back
+                after_commit(self.db_path, lambda: self._unlink_unreferenced(sha256))
+            return row[0]
+
+    def _unlink_unreferenced(self, sha256):
+        with connection(self.db_path) as conn, immediate_transaction(conn):
+            # A put() of the same content since the delete re-created the row and kept the file
+            if conn.execute("SELECT 1 FROM evidence_blobs WHERE sha256 = ?", (sha256,)).fetchone():
+                return
+            if not self._unlink(sha256):
+                logger.warning(f"Evidence blob {sha256} was already missing from disk")
+
+    def refcount(self, sha256):
+        with connection(self.db_path) as conn:
+            row = conn.execute("SELECT refcount FROM evidence_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        return row[0] if row else 0
+
+    def open(self, sha256):
+        """Binary file object for reading a stored blob; cold blobs are decompressed as they are read"""
+        self._mark_accessed(sha256)
+        try:
+            return open(self.path_for(sha256), 'rb')
+        except FileNotFoundError:
+            return gzip.open(self.cold_path_for(sha256), 'rb')
+    
+    def _mark_accessed(self, sha256):
+        # At most one write per blob per day, however often it is read
+        with connection(self.db_path) as conn:
+            conn.execute("""
+                UPDATE evidence_blobs SET last_accessed_at = CURRENT_TIMESTAMP
+                WHERE sha256 = ? AND (last_accessed_at IS NULL OR last_accessed_at < datetime('now', '-1 day'))
+            """, (sha256,))
+    
+    def compress(self, sha256):
+        """Move a hot blob to the cold tier; returns the bytes saved (0 if it stayed hot)"""
+        hot_path = self.path_for(sha256)
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+        try:
+            try:
+                with open(hot_path, 'rb') as src, open(tmp_path, 'wb') as raw:
+                    # mtime=0 keeps the compressed bytes reproducible
+                    with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as dst:
+                        shutil.copyfileobj(src, dst, self.chunk_size)
+                    raw.flush()
+                    os.fsync(raw.fileno())
+            except FileNotFoundError:
+                return 0
+            stored_size = os.path.getsize(tmp_path)
+            size = os.path.getsize(hot_path)
+            
+            with connection(self.db_path) as conn:
+                if stored_size > size * (1 - COLD_MIN_SAVING):
+                    conn.execute("UPDATE evidence_blobs SET tier = ? WHERE sha256 = ? AND tier = ?",
+                                 (TIER_INCOMPRESSIBLE, sha256, TIER_HOT))
+                    return 0
+                # Under the write lock, so put() and release() see the swap as one step
+                row = conn.execute("""
+                    UPDATE evidence_blobs SET tier = ?, stored_size = ? WHERE sha256 = ? AND tier = ?
+                    RETURNING sha256
+                """, (TIER_COLD, stored_size, sha256, TIER_HOT)).fetchone()
+                if row is None:
+                    # Released, or compressed by another sweeper, in the meantime
+                    return 0
+                os.replace(tmp_path, self.cold_path_for(sha256))
+                os.remove(hot_path)
+            return size - stored_size
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def iter_chunks(self, sha256):
+        """Stream a blob back in chunk_size pieces"""
+        with self.open(sha256) as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+evidence_store = lazy_service('evidence_store', EvidenceStore)
@@ -0,0 +1,714 @@
+"""
+Versioned schema migrations for the application database
+
+Migrations are numbered and recorded in a ``schema_version`` table. migrate()
+checks the recorded version once per process and database file; when the
+schema is current it runs no DDL at all. Pending migrations run under an
+advisory lock row so only one process applies them, each in its own short
+transaction; other processes wait up to LOCK_WAIT_SECONDS for it and then
+fail with MigrationLockTimeout rather than stall. Pending migrations are
+refused inside a caller's open transaction, which they would otherwise commit. Migrations marked online rebuild large tables with
+copy_table_online, which copies rows in small batches while triggers mirror
+live writes, so the app is only blocked for the final swap.
+"""
+import os
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from modules.data.connection_pool import connection
+
+logger = logging.getLogger(__name__)
+
+# Rows per batch for online table copies
+ONLINE_BATCH_SIZE = 1000
+
+# Seconds after which a lock left by a crashed process may be taken over
+LOCK_STALE_SECONDS = 600
+# How long migrate() waits for another process's migration before giving up
+LOCK_WAIT_SECONDS = 30
+LOCK_POLL_SECONDS = 0.2
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply', 'online'])
+
+
+class MigrationError(RuntimeError):
+    """Pending migrations could not be applied safely right now"""
+
+
+class MigrationLockTimeout(MigrationError, TimeoutError):
+    """Another process held the migration lock for longer than LOCK_WAIT_SECONDS"""
+
+MIGRATIONS = []
+
+
+def migration(version, name, online=False):
+    """Register a migration function; versions must be unique and increasing"""
+    def register(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append(Migration(version, name, func, online))
+        return func
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Schema definitions
+# ---------------------------------------------------------------------------
+
+# Columns added after the first assessments layout, back-filled on older files
+ASSESSMENT_ADDED_COLUMNS = {
+    'org_id': 'INTEGER',
+    'overall_maturity': 'TEXT',
+    'completion_percentage': 'REAL',
+    'submitted_at': 'TIMESTAMP',
+    'submission_key': 'TEXT',
+}
+
+ASSESSMENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        org_id INTEGER,
+        assessment_name TEXT,
+        framework_version TEXT,
+        overall_score REAL,
+        overall_maturity TEXT,
+        completion_percentage REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        submitted_at TIMESTAMP,
+        status TEXT DEFAULT 'in_progress',
+        submission_key TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    )
+"""
+
+ASSESSMENT_COLUMNS = (
+    'id', 'user_id', 'org_id', 'assessment_name', 'framework_version', 'overall_score',
+    'overall_maturity', 'completion_percentage', 'created_at', 'updated_at', 'submitted_at',
+    'status', 'submission_key',
+)
+
+ASSESSMENT_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_assessments_user_id ON assessments(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_assessments_org_id ON assessments(org_id)",
+    "CREATE INDEX IF NOT EXISTS idx_assessments_created ON assessments(created_at)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_assessments_submission_key ON assessments(submission_key)",
+    # Covering indexes for keyset-paginated history and its summary
+    """CREATE INDEX IF NOT EXISTS idx_assessments_org_history
+       ON assessments(org_id, created_at, id, status, framework_version, overall_score, overall_maturity)""",
+    """CREATE INDEX IF NOT EXISTS idx_assessments_user_history
+       ON assessments(user_id, created_at, id, status, framework_version, overall_score, overall_maturity)""",
+)
+
+# Audit trail queries filter on one of these and page newest-first on
+# (timestamp, id); the rowid is implicit in every index entry
+AUDIT_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_audit_timestamp_id ON audit_logs(timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_user_time ON audit_logs(user_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_org_time ON audit_logs(org_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_action_time ON audit_logs(action, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_resource_time ON audit_logs(resource_type, resource_id, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_audit_ip_time ON audit_logs(ip_address, timestamp, id)",
+)
+
+# Listings and summaries are per (org, assessment, question); an attempt that
+# has not been submitted yet is found by its submission key
+EVIDENCE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_evidence_scope ON evidence(org_id, assessment_id, question_id)",
+    "CREATE INDEX IF NOT EXISTS idx_evidence_submission ON evidence(submission_key, question_id)",
+)
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+
+@migration(1, "auth_schema")
+def _auth_schema(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            full_name TEXT,
+            organization TEXT,
+            role TEXT DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1,
+            last_login TIMESTAMP,
+            failed_login_attempts INTEGER DEFAULT 0,
+            locked_until TIMESTAMP,
+            two_factor_enabled BOOLEAN DEFAULT 0,
+            org_id INTEGER
+        )
+    """)
+
+    # Older files created users before these columns existed
+    user_columns = {
+        'locked_until': 'TIMESTAMP',
+        'failed_login_attempts': 'INTEGER DEFAULT 0',
+        'is_active': 'BOOLEAN DEFAULT 1',
+        'created_at': 'TIMESTAMP',
+        'updated_at': 'TIMESTAMP',
+        'last_login': 'TIMESTAMP',
+        'two_factor_enabled': 'BOOLEAN DEFAULT 0',
+        'org_id': 'INTEGER',
+    }
+    existing = _columns(cursor, 'users')
+    for column, column_type in user_columns.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE users ADD COLUMN {column} {column_type}")
+            logger.info(f"Added {column} column to users table")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT NOT NULL,
+            resource_type TEXT,
+            resource_id TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ip_address TEXT,
+            user_agent TEXT,
+            details TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS organizations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            industry TEXT,
+            size TEXT,
+            region TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS password_resets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            token TEXT UNIQUE NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Password reset requests (for rate limiting)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS password_reset_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_org_id ON users(org_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_user_id ON audit_logs(user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_logs(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_organizations_name ON organizations(name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_prr_email_requested_at ON password_reset_requests(email, requested_at)")
+
+
+@migration(2, "rate_limits")
+def _rate_limits(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            identifier TEXT NOT NULL,
+            attempt_count INTEGER DEFAULT 0,
+            first_attempt TIMESTAMP,
+            last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            locked_until TIMESTAMP,
+            UNIQUE(identifier)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_identifier ON rate_limits(identifier)")
+
+
+@migration(3, "assessment_schema")
+def _assessment_schema(cursor):
+    cursor.execute(ASSESSMENTS_TABLE_SQL.format(table='assessments'))
+
+    existing = _columns(cursor, 'assessments')
+    for column, column_type in ASSESSMENT_ADDED_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE assessments ADD COLUMN {column} {column_type}")
+            logger.info(f"Added {column} column to assessments table")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS assessment_responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assessment_id INTEGER NOT NULL,
+            question_id TEXT NOT NULL,
+            domain_id TEXT NOT NULL,
+            response_score INTEGER,
+            response_text TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(assessment_id) REFERENCES assessments(id) ON DELETE CASCADE
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS domain_scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assessment_id INTEGER NOT NULL,
+            domain_id TEXT NOT NULL,
+            domain_name TEXT,
+            raw_score REAL,
+            max_score REAL,
+            percentage REAL,
+            maturity_level TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(assessment_id) REFERENCES assessments(id) ON DELETE CASCADE
+        )
+    """)
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_assessment ON assessment_responses(assessment_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_domain_scores_assessment ON domain_scores(assessment_id)")
+    for statement in ASSESSMENT_INDEXES:
+        cursor.execute(statement)
+
+
+@migration(4, "rebuild_legacy_assessments", online=True)
+def _rebuild_legacy_assessments(conn):
+    """Rebuild the pre-release assessments layout (organization_id NOT NULL,
+    maturity_level, completed_at, assessment_data) into the current one"""
+    existing = _columns(conn.cursor(), 'assessments')
+    if 'organization_id' not in existing:
+        return
+
+    if 'assessment_data' in existing:
+        # Keep legacy JSON payloads; the current layout stores responses as rows
+        with immediate_transaction(conn):
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS assessment_legacy_data (
+                    assessment_id INTEGER PRIMARY KEY,
+                    assessment_data TEXT
+                )
+            """)
+            conn.execute("""
+                INSERT OR IGNORE INTO assessment_legacy_data (assessment_id, assessment_data)
+                SELECT id, assessment_data FROM assessments WHERE assessment_data IS NOT NULL
+            """)
+
+    renamed = {
+        'org_id': "COALESCE({row}.org_id, {row}.organization_id)",
+        'overall_maturity': "COALESCE({row}.overall_maturity, {row}.maturity_level)",
+        'submitted_at': "COALESCE({row}.submitted_at, {row}.completed_at)",
+    }
+    columns = {}
+    for column in ASSESSMENT_COLUMNS:
+        if column in renamed:
+            columns[column] = renamed[column]
+        elif column in existing:
+            columns[column] = "{row}." + column
+    copy_table_online(conn, 'assessments', ASSESSMENTS_TABLE_SQL, columns, indexes=ASSESSMENT_INDEXES)
+
+
+@migration(5, "audit_query_indexes")
+def _audit_query_indexes(cursor):
+    if 'org_id' not in _columns(cursor, 'audit_logs'):
+        cursor.execute("ALTER TABLE audit_logs ADD COLUMN org_id INTEGER")
+        cursor.execute("""
+            UPDATE audit_logs
+            SET org_id = (SELECT users.org_id FROM users WHERE users.id = audit_logs.user_id)
+            WHERE user_id IS NOT NULL
+        """)
+        logger.info("Added org_id column to audit_logs table")
+
+    # Superseded by the composite indexes below
+    cursor.execute("DROP INDEX IF EXISTS idx_audit_user_id")
+    cursor.execute("DROP INDEX IF EXISTS idx_audit_timestamp")
+    for statement in AUDIT_INDEXES:
+        cursor.execute(statement)
+
+
+@migration(6, "evidence_blobs")
+def _evidence_blobs(cursor):
+    # One row per distinct evidence file content; see modules.data.evidence_store
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS evidence_blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+
+
+@migration(7, "evidence_index")
+def _evidence_index(cursor):
+    # One row per attached file; the bytes live in evidence_blobs/EvidenceStore
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS evidence (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            org_id INTEGER,
+            user_id INTEGER NOT NULL,
+            assessment_id INTEGER,
+            submission_key TEXT,
+            question_id TEXT NOT NULL,
+            sha256 TEXT NOT NULL REFERENCES evidence_blobs(sha256),
+            file_name TEXT NOT NULL,
+            file_type TEXT,
+            file_size INTEGER NOT NULL,
+            description TEXT,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for statement in EVIDENCE_INDEXES:
+        cursor.execute(statement)
+    # Running total per user, so the storage quota check is a single-row lookup
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_storage (
+            user_id INTEGER PRIMARY KEY,
+            bytes_used INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+
+@migration(8, "evidence_search")
+def _evidence_search(cursor):
+    # Extracted text per blob (identical uploads are extracted once); rows
+    # start 'pending' and are filled in by modules.data.evidence_search
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS evidence_text (
+            sha256 TEXT PRIMARY KEY REFERENCES evidence_blobs(sha256) ON DELETE CASCADE,
+            file_type TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            content TEXT,
+            error TEXT,
+            extracted_at TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_evidence_text_pending ON evidence_text(status) "
+                   "WHERE status = 'pending'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_evidence_sha256 ON evidence(sha256)")
+
+    # One search document per evidence row (rowid = evidence.id); name and
+    # description are searchable at once, content once it has been extracted
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS evidence_fts
+        USING fts5(file_name, description, content, tokenize = 'porter unicode61')
+    """)
+    # Rank matches in the file name above the description above the body
+    cursor.execute("INSERT INTO evidence_fts (evidence_fts, rank) VALUES ('rank', 'bm25(4.0, 2.0, 1.0)')")
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS evidence_search_insert AFTER INSERT ON evidence BEGIN
+            INSERT OR IGNORE INTO evidence_text (sha256, file_type) VALUES (new.sha256, new.file_type);
+            INSERT INTO evidence_fts (rowid, file_name, description, content)
+            VALUES (new.id, new.file_name, COALESCE(new.description, ''), COALESCE(
+                (SELECT content FROM evidence_text WHERE sha256 = new.sha256 AND status = 'done'), ''));
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS evidence_search_delete AFTER DELETE ON evidence BEGIN
+            DELETE FROM evidence_fts WHERE rowid = old.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS evidence_search_extracted AFTER UPDATE OF status ON evidence_text
+        WHEN new.status = 'done' BEGIN
+            UPDATE evidence_fts SET content = new.content
+            WHERE rowid IN (SELECT id FROM evidence WHERE sha256 = new.sha256);
+        END
+    """)
+
+    # Queue and index evidence uploaded before this migration
+    cursor.execute("""
+        INSERT OR IGNORE INTO evidence_text (sha256, file_type)
+        SELECT sha256, MIN(file_type) FROM evidence GROUP BY sha256
+    """)
+    cursor.execute("""
+        INSERT INTO evidence_fts (rowid, file_name, description, content)
+        SELECT id, file_name, COALESCE(description, ''), '' FROM evidence
+        WHERE id NOT IN (SELECT rowid FROM evidence_fts)
+    """)
+
+
+@migration(9, "evidence_tiers")
+def _evidence_tiers(cursor):
+    # Storage tier and access time per blob, for the evidence sweeper
+    # (modules.data.evidence_gc); stored_size is the size on disk once compressed
+    columns = _columns(cursor, 'evidence_blobs')
+    for column, definition in (('tier', "TEXT NOT NULL DEFAULT 'hot'"),
+                               ('stored_size', 'INTEGER'),
+                               ('last_accessed_at', 'TIMESTAMP'),
+                               ('touched_at', 'TIMESTAMP')):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE evidence_blobs ADD COLUMN {column} {definition}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_evidence_blobs_tier ON evidence_blobs(tier, created_at)")
+    # Evidence from attempts that were never submitted
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_evidence_drafts ON evidence(uploaded_at) "
+                   "WHERE assessment_id IS NULL")
+
+
+@migration(10, "scan_verdicts")
+def _scan_verdicts(cursor):
+    # Virus scan result per distinct content, so identical uploads are scanned
+    # once. No foreign key: verdicts outlive their blobs, and infected content
+    # never gets one (it is kept in the store's quarantine directory instead)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scan_verdicts (
+            sha256 TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            signature TEXT,
+            size INTEGER NOT NULL,
+            scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+
+
+# ---------------------------------------------------------------------------
+# Online table copy
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def immediate_transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT (or ROLLBACK) on a connection not already in a transaction"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def copy_table_online(conn, table, create_sql, columns, indexes=(), key='id',
+                      batch_size=None, pause_seconds=0.0, progress=None):
+    """Rebuild a table through a shadow copy made in short batches.
+
+    create_sql is a CREATE TABLE statement with a ``{table}`` placeholder.
+    columns maps each new column to an SQL expression over the old row,
+    written with a ``{row}`` prefix (e.g. ``"{row}.email"``); it must include
+    the key column. Triggers mirror inserts, updates and deletes made while
+    the copy runs. The final swap (drop old table, rename shadow, recreate
+    indexes) is the only step that holds the write lock for more than one
+    batch. progress(copied_rows) is called after each batch. Returns the
+    number of rows copied by the batches.
+    """
+    batch_size = batch_size or ONLINE_BATCH_SIZE
+    shadow = f"{table}__migrating"
+    target_columns = ", ".join(columns)
+
+    def expressions(row):
+        return ", ".join(expr.format(row=row) for expr in columns.values())
+
+    with immediate_transaction(conn):
+        for suffix in ('insert', 'update', 'delete'):
+            conn.execute(f"DROP TRIGGER IF EXISTS {shadow}_{suffix}")
+        conn.execute(f"DROP TABLE IF EXISTS {shadow}")
+        conn.execute(create_sql.format(table=shadow))
+        conn.execute(f"""
+            CREATE TRIGGER {shadow}_insert AFTER INSERT ON {table} BEGIN
+                INSERT OR REPLACE INTO {shadow} ({target_columns}) VALUES ({expressions('NEW')});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {shadow}_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = OLD.{key};
+                INSERT OR REPLACE INTO {shadow} ({target_columns}) VALUES ({expressions('NEW')});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER {shadow}_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM {shadow} WHERE {key} = OLD.{key};
+            END
+        """)
+
+    copied = 0
+    last_key = None
+    while True:
+        with immediate_transaction(conn):
+            bound = "" if last_key is None else f"WHERE {key} > ?"
+            params = [] if last_key is None else [last_key]
+            batch_end = conn.execute(
+                f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} {bound} ORDER BY {key} LIMIT ?)",
+                params + [batch_size]
+            ).fetchone()[0]
+            if batch_end is None:
+                break
+            # Rows already mirrored by a trigger are newer; keep them
+            where = f"src.{key} <= ?" if last_key is None else f"src.{key} > ? AND src.{key} <= ?"
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO {shadow} ({target_columns}) "
+                f"SELECT {expressions('src')} FROM {table} AS src WHERE {where}",
+                params + [batch_end]
+            )
+            copied += cursor.rowcount
+            last_key = batch_end
+        if progress:
+            progress(copied)
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    # Dropping the old table must not cascade to child rows
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        with immediate_transaction(conn):
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+            for statement in indexes:
+                conn.execute(statement)
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+
+    logger.info(f"Rebuilt {table} online: {copied} rows copied in batches of {batch_size}")
+    return copied
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def _file_key(db_path):
+    """Identify the database file, so a deleted and recreated file is migrated again"""
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return (os.path.abspath(db_path), stat.st_dev, stat.st_ino)
+
+
+def current_version(conn):
+    """Highest applied migration, or 0 for a database without schema_version"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def _acquire_lock(conn, owner):
+    """Take the advisory migration lock, waiting briefly for a live holder or taking over a stale one"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_lock (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            owner TEXT,
+            acquired_at REAL
+        )
+    """)
+    conn.commit()
+    deadline = time.time() + LOCK_WAIT_SECONDS
+    while True:
+        with immediate_transaction(conn):
+            row = conn.execute("SELECT owner, acquired_at FROM schema_lock WHERE id = 1").fetchone()
+            if row is None or time.time() - row[1] > LOCK_STALE_SECONDS:
+                if row is not None:
+                    logger.warning(f"Taking over stale migration lock held by {row[0]}")
+                conn.execute("INSERT OR REPLACE INTO schema_lock (id, owner, acquired_at) VALUES (1, ?, ?)",
+                             (owner, time.time()))
+                return
+        if time.time() > deadline:
+            held_for = time.time() - row[1]
+            raise MigrationLockTimeout(
+                f"Schema migration lock held by {row[0]} for {held_for:.0f}s; another process is "
+                f"migrating this database. Retry once it finishes (a lock older than "
+                f"{LOCK_STALE_SECONDS}s is taken over as stale)")
+        time.sleep(LOCK_POLL_SECONDS)
+
+
+def _release_lock(conn, owner):
+    with immediate_transaction(conn):
+        conn.execute("DELETE FROM schema_lock WHERE id = 1 AND owner = ?", (owner,))
+
+
+def migrate(db_path, target=None):
+    """Bring db_path up to the latest (or target) schema version.
+
+    Returns the schema version. Calls after the first for the same file in
+    this process return without touching the database.
+    """
+    target = latest_version() if target is None else target
+    key = _file_key(db_path)
+    if key is not None and (key, target) in _migrated:
+        return target
+
+    with _migrate_lock:
+        with connection(db_path) as conn:
+            version = current_version(conn)
+            if version < target:
+                version = _apply_pending(conn, target)
+        key = _file_key(db_path)
+        if key is not None and version >= target:
+            _migrated.add((key, target))
+        return version
+
+
+def _apply_pending(conn, target):
+    if conn.in_transaction:
+        # Committing here would commit the caller's half-done work along with our DDL
+        raise MigrationError("Pending schema migrations cannot run inside an open transaction; "
+                             "call migrate() before writing")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+    owner = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    _acquire_lock(conn, owner)
+    try:
+        # Another process may have finished while we waited for the lock
+        version = current_version(conn)
+        for item in MIGRATIONS:
+            if item.version <= version or item.version > target:
+                continue
+            started = time.perf_counter()
+            if item.online:
+                item.apply(conn)
+                with immediate_transaction(conn):
+                    conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                                 (item.version, item.name))
+            else:
+                with immediate_transaction(conn):
+                    item.apply(conn.cursor())
+                    conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                                 (item.version, item.name))
+            version = item.version
+            logger.info(f"Applied migration {item.version:03d} {item.name} "
+                        f"in {time.perf_counter() - started:.2f}s")
+        return version
+    finally:
+        _release_lock(conn, owner)
+
+
+def applied_migrations(db_path):
+    """(version, name, applied_at) rows recorded in schema_version"""
+    with connection(db_path) as conn:
+        try:
+            return conn.execute(
+                "SELECT version, name, applied_at FROM schema_version ORDER BY version"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return []
+
+
+def reset_migration_cache():
+    """Forget which databases this process has already migrated"""
+    _migrated.clear()
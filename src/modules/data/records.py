@@ -0,0 +1,124 @@
+"""
+Typed, read-only records returned by the data layer
+
+NamedTuples keep rows slot-based (no per-row __dict__) while giving callers
+named fields instead of column positions.
+"""
+from typing import NamedTuple, Optional, Tuple
+
+
+class DomainScoreRecord(NamedTuple):
+    domain_id: str
+    domain_name: Optional[str]
+    raw_score: Optional[float]
+    max_score: Optional[float]
+    percentage: Optional[float]
+    maturity_level: Optional[str]
+
+
+class ResponseRecord(NamedTuple):
+    question_id: str
+    domain_id: str
+    response_score: Optional[float]
+    response_text: Optional[str]
+
+
+class AssessmentRecord(NamedTuple):
+    id: int
+    user_id: int
+    org_id: Optional[int]
+    assessment_name: Optional[str]
+    framework_version: Optional[str]
+    overall_score: Optional[float]
+    overall_maturity: Optional[str]
+    completion_percentage: Optional[float]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+    submitted_at: Optional[str]
+    status: Optional[str]
+    submission_key: Optional[str]
+    domain_scores: Tuple[DomainScoreRecord, ...] = ()
+    responses: Tuple[ResponseRecord, ...] = ()
+
+    def responses_by_question(self):
+        """Map question id -> score, the shape the scoring functions take"""
+        return {response.question_id: response.response_score for response in self.responses}
+
+
+class AssessmentSummaryRecord(NamedTuple):
+    id: int
+    user_id: int
+    org_id: Optional[int]
+    assessment_name: Optional[str]
+    framework_version: Optional[str]
+    overall_score: Optional[float]
+    overall_maturity: Optional[str]
+    status: Optional[str]
+    created_at: Optional[str]
+
+
+class HistorySummary(NamedTuple):
+    count: int
+    average_score: Optional[float]
+    latest_maturity: Optional[str]
+    latest_at: Optional[str]
+
+
+class AssessmentPage(NamedTuple):
+    items: Tuple[AssessmentSummaryRecord, ...]
+    # (created_at, id) of the last item; pass back as cursor for the next page
+    next_cursor: Optional[Tuple[str, int]]
+    summary: Optional[HistorySummary]
+
+
+class AuditRecord(NamedTuple):
+    id: int
+    user_id: Optional[int]
+    action: str
+    resource_type: Optional[str]
+    resource_id: Optional[str]
+    timestamp: str
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+    details: Optional[str]
+    org_id: Optional[int]
+
+
+class AuditPage(NamedTuple):
+    items: Tuple[AuditRecord, ...]
+    # (timestamp, id) of the last item; pass back as cursor for the next page
+    next_cursor: Optional[Tuple[str, int]]
+
+
+class EvidenceRecord(NamedTuple):
+    id: int
+    org_id: Optional[int]
+    user_id: int
+    assessment_id: Optional[int]
+    question_id: str
+    sha256: str
+    file_name: str
+    file_type: Optional[str]
+    file_size: int
+    description: Optional[str]
+    uploaded_at: Optional[str]
+
+
+class EvidenceHit(NamedTuple):
+    evidence: EvidenceRecord
+    # Matching passage with the hits wrapped in **
+    snippet: str
+    # bm25 score; lower is a better match
+    rank: float
+
+
+class LoginResult(NamedTuple):
+    # One of the LOGIN_* constants in modules.auth.auth_manager
+    status: str
+    user: Optional[dict] = None
+    failed_attempts: int = 0
+    locked_until: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
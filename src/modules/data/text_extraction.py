@@ -0,0 +1,108 @@
+"""
+Plain-text extraction for evidence files
+
+These functions run in the evidence indexer's worker processes, so the module
+imports nothing from the app beyond the standard library (and pypdf, when it
+is installed). Every extractor returns at most max_chars characters. Paths
+ending in .gz (cold-tier blobs) are decompressed as they are read.
+"""
+import gzip
+import zipfile
+from collections import namedtuple
+from xml.etree import ElementTree
+
+try:
+    from pypdf import PdfReader
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+STATUS_PENDING = 'pending'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_UNSUPPORTED = 'unsupported'
+
+DOCX_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Refuse a document.xml that inflates past this (zip bombs)
+MAX_DOCX_XML_BYTES = 64 * 1024 * 1024
+
+Extraction = namedtuple('Extraction', ['status', 'content', 'error'])
+
+
+class UnsupportedDocument(Exception):
+    """The file's type or shape is one we do not extract text from"""
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _plain_text(path, max_chars):
+    with _open(path) as f:
+        # UTF-8 is at most 4 bytes per character
+        data = f.read(max_chars * 4)
+    if b'\x00' in data:
+        raise UnsupportedDocument("Binary data in a text/plain upload")
+    return data.decode('utf-8', errors='replace')[:max_chars]
+
+
+def _docx_text(path, max_chars):
+    with _open(path) as f, zipfile.ZipFile(f) as archive:
+        try:
+            info = archive.getinfo('word/document.xml')
+        except KeyError:
+            raise UnsupportedDocument("Not a Word document (no word/document.xml)")
+        if info.file_size > MAX_DOCX_XML_BYTES:
+            raise UnsupportedDocument(f"document.xml is {info.file_size} bytes uncompressed")
+        parts = []
+        length = 0
+        with archive.open(info) as xml:
+            for _, element in ElementTree.iterparse(xml):
+                if element.tag == f'{WORD_NAMESPACE}t' and element.text:
+                    parts.append(element.text)
+                    length += len(element.text)
+                elif element.tag == f'{WORD_NAMESPACE}p':
+                    parts.append('\n')
+                    length += 1
+                element.clear()
+                if length >= max_chars:
+                    break
+    return ''.join(parts)[:max_chars]
+
+
+def _pdf_text(path, max_chars):
+    if not PYPDF_AVAILABLE:
+        raise UnsupportedDocument("PDF extraction needs pypdf, which is not installed")
+    parts = []
+    length = 0
+    with _open(path) as f:
+        for page in PdfReader(f).pages:
+            text = page.extract_text() or ''
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+    return '\n'.join(parts)[:max_chars]
+
+
+EXTRACTORS = {
+    'text/plain': _plain_text,
+    DOCX_TYPE: _docx_text,
+    'application/pdf': _pdf_text,
+}
+
+
+def extract_text(path, file_type, max_chars):
+    """Extract a file's text; never raises, the outcome is in Extraction.status"""
+    extractor = EXTRACTORS.get(file_type)
+    if extractor is None:
+        return Extraction(STATUS_UNSUPPORTED, None, f"No text extractor for {file_type}")
+    try:
+        return Extraction(STATUS_DONE, extractor(path, max_chars), None)
+    except UnsupportedDocument as e:
+        return Extraction(STATUS_UNSUPPORTED, None, str(e))
+    except Exception as e:
+        return Extraction(STATUS_FAILED, None, f"{type(e).__name__}: {e}")
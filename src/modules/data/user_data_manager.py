@@ -49,7 +49,7 @@ class UserDataManager:
         if not user_id:
             return None
         
-        return self.db_manager.load_assessment(assessment_id, user_id)
+        return self.db_manager.load_assessment(assessment_id, user_id=user_id)
     
     def get_user_statistics(self) -> dict:
         """Get statistics for the current user"""
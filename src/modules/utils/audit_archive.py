@@ -0,0 +1,295 @@
+"""
+Monthly, append-only archive of audit_logs
+
+Once a calendar month falls entirely outside the AUDIT_HOT_DAYS window its
+rows are moved out of the live database into gzip'd JSON-lines segments under
+AUDIT_ARCHIVE_DIR/<YYYY-MM>/. Every segment is listed in manifest.json with its
+row count, id and time range and a SHA-256 of the compressed bytes, which is
+checked whenever the segment is read. Segments are never rewritten; late rows
+for an archived month simply add another segment.
+
+Retention works on whole partitions: a month whose last day is older than
+DATA_RETENTION_DAYS is dropped by removing its manifest entry and directory,
+without touching individual rows.
+
+Archiving and retention hold an exclusive flock on manifest.lock for their
+whole read-modify-write of the manifest, so overlapping cleanup runs (cron
+and an app process, say) cannot write duplicate segments or lose entries.
+"""
+import io
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from modules.data.connection_pool import connection
+from modules.data.migrations import migrate
+from modules.data.records import AuditRecord
+from modules.utils.audit_logger import AUDIT_SELECT, AuditLogger, _audit_time
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are only serialized within one process
+    fcntl = None
+
+try:
+    from config.config import Config
+    AUDIT_ARCHIVE_DIR = Config.AUDIT_ARCHIVE_DIR
+    AUDIT_HOT_DAYS = Config.AUDIT_HOT_DAYS
+    AUDIT_ARCHIVE_BATCH_SIZE = Config.AUDIT_ARCHIVE_BATCH_SIZE
+    DATA_RETENTION_DAYS = Config.DATA_RETENTION_DAYS
+except ImportError:
+    AUDIT_ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "data/audit_archive")
+    AUDIT_HOT_DAYS = int(os.getenv("AUDIT_HOT_DAYS", "90"))
+    AUDIT_ARCHIVE_BATCH_SIZE = int(os.getenv("AUDIT_ARCHIVE_BATCH_SIZE", "5000"))
+    DATA_RETENTION_DAYS = int(os.getenv("DATA_RETENTION_DAYS", "2555"))
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'manifest.lock'
+
+# Record fields that iter_events can filter on by equality
+FILTER_FIELDS = ('user_id', 'org_id', 'action', 'resource_type', 'resource_id', 'ip_address')
+
+ArchiveSegment = namedtuple('ArchiveSegment', [
+    'partition', 'file', 'rows', 'first_id', 'last_id', 'min_timestamp', 'max_timestamp', 'sha256', 'size',
+])
+
+ArchiveResult = namedtuple('ArchiveResult', ['archived_rows', 'segments', 'dropped_partitions'])
+
+
+class ArchiveCorruptedError(Exception):
+    """A segment's bytes no longer match the checksum recorded in the manifest"""
+
+
+def _month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(partition):
+    year, month = (int(part) for part in partition.split('-'))
+    return datetime(year + month // 12, month % 12 + 1, 1)
+
+
+def _fsync_replace(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AuditArchive:
+    """Moves closed months of audit_logs into checksummed archive partitions"""
+
+    def __init__(self, db_path=None, archive_dir=None, hot_days=None, retention_days=None, batch_size=None):
+        self.db_path = db_path or AuditLogger.DB_PATH
+        self.archive_dir = archive_dir or AUDIT_ARCHIVE_DIR
+        self.hot_days = AUDIT_HOT_DAYS if hot_days is None else hot_days
+        self.retention_days = DATA_RETENTION_DAYS if retention_days is None else retention_days
+        self.batch_size = batch_size or AUDIT_ARCHIVE_BATCH_SIZE
+        self._lock = threading.Lock()
+
+    # -- manifest -----------------------------------------------------------
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.archive_dir, MANIFEST_NAME)
+
+    @property
+    def lock_path(self):
+        return os.path.join(self.archive_dir, LOCK_NAME)
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the manifest lock, against other threads and other processes"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                # Released when the file is closed
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'partitions': {}, 'pending_delete': None}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        _fsync_replace(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+
+    def segments(self, manifest=None):
+        """Every archived segment, oldest partition first"""
+        manifest = manifest or self._load_manifest()
+        return [ArchiveSegment(partition=partition, **entry)
+                for partition in sorted(manifest['partitions'])
+                for entry in manifest['partitions'][partition]]
+
+    def partitions(self):
+        return sorted(self._load_manifest()['partitions'])
+
+    # -- archiving ----------------------------------------------------------
+
+    def cutoff(self, now=None):
+        """Start of the oldest month that still overlaps the hot window"""
+        now = now or datetime.utcnow()
+        return _month_start(now - timedelta(days=self.hot_days))
+
+    def archive(self, now=None):
+        """Move every row older than cutoff() into archive segments; returns (rows, segments)"""
+        cutoff = _audit_time(self.cutoff(now))
+        migrate(self.db_path)
+        archived_rows = written = 0
+        with self._exclusive():
+            manifest = self._load_manifest()
+            self._finish_pending_delete(manifest)
+            while True:
+                with connection(self.db_path) as conn:
+                    rows = conn.execute(
+                        f"{AUDIT_SELECT} WHERE timestamp < ? ORDER BY id LIMIT ?",
+                        (cutoff, self.batch_size)
+                    ).fetchall()
+                if not rows:
+                    break
+
+                by_partition = {}
+                for record in map(AuditRecord._make, rows):
+                    by_partition.setdefault(record.timestamp[:7], []).append(record)
+                for partition, records in by_partition.items():
+                    entry = self._write_segment(partition, records)
+                    manifest['partitions'].setdefault(partition, []).append(entry)
+                    written += 1
+
+                # Ids only grow, so (cutoff, last id) names exactly the rows just archived;
+                # if we crash before deleting them the next run finishes the job
+                manifest['pending_delete'] = {'cutoff': cutoff, 'max_id': rows[-1][0]}
+                self._save_manifest(manifest)
+                self._finish_pending_delete(manifest)
+                archived_rows += len(rows)
+
+        if archived_rows:
+            logger.info(f"Archived {archived_rows} audit events into {written} segments")
+        return archived_rows, written
+
+    def _write_segment(self, partition, records):
+        partition_dir = os.path.join(self.archive_dir, partition)
+        os.makedirs(partition_dir, exist_ok=True)
+        name = f"part-{records[0].id:012d}-{records[-1].id:012d}.jsonl.gz"
+        lines = ''.join(json.dumps(record._asdict(), separators=(',', ':')) + '\n' for record in records)
+        # mtime=0 keeps the bytes, and so the checksum, reproducible
+        data = gzip.compress(lines.encode('utf-8'), mtime=0)
+        _fsync_replace(os.path.join(partition_dir, name), data)
+        timestamps = [record.timestamp for record in records]
+        return {
+            'file': f"{partition}/{name}",
+            'rows': len(records),
+            'first_id': records[0].id,
+            'last_id': records[-1].id,
+            'min_timestamp': min(timestamps),
+            'max_timestamp': max(timestamps),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'size': len(data),
+        }
+
+    def _finish_pending_delete(self, manifest):
+        pending = manifest.get('pending_delete')
+        if not pending:
+            return
+        with connection(self.db_path) as conn:
+            conn.execute("DELETE FROM audit_logs WHERE timestamp < ? AND id <= ?",
+                         (pending['cutoff'], pending['max_id']))
+        manifest['pending_delete'] = None
+        self._save_manifest(manifest)
+
+    # -- retention ----------------------------------------------------------
+
+    def enforce_retention(self, now=None):
+        """Drop whole partitions older than the retention period; returns their names"""
+        now = now or datetime.utcnow()
+        expires_before = now - timedelta(days=self.retention_days)
+        with self._exclusive():
+            manifest = self._load_manifest()
+            expired = [partition for partition in sorted(manifest['partitions'])
+                       if _next_month(partition) <= expires_before]
+            if not expired:
+                return []
+            for partition in expired:
+                del manifest['partitions'][partition]
+            # Unlist first, so readers never see a partition whose files are gone
+            self._save_manifest(manifest)
+            for partition in expired:
+                shutil.rmtree(os.path.join(self.archive_dir, partition), ignore_errors=True)
+        logger.info(f"Dropped expired audit partitions: {', '.join(expired)}")
+        return expired
+
+    def run(self, now=None):
+        """Archive closed months, then enforce retention"""
+        now = now or datetime.utcnow()
+        archived_rows, segments = self.archive(now)
+        return ArchiveResult(archived_rows, segments, self.enforce_retention(now))
+
+    # -- reading ------------------------------------------------------------
+
+    def _read_segment(self, segment):
+        with open(os.path.join(self.archive_dir, segment.file), 'rb') as f:
+            data = f.read()
+        if hashlib.sha256(data).hexdigest() != segment.sha256:
+            raise ArchiveCorruptedError(f"Checksum mismatch for audit archive segment {segment.file}")
+        return data
+
+    def iter_events(self, since=None, until=None, **filters):
+        """Stream archived events matching the filters, oldest first.
+
+        Takes the same equality filters as AuditLogger.query_audit_trail;
+        since is inclusive and until exclusive. Partitions and segments
+        outside the time range are skipped from the manifest alone, and only
+        one segment is held in memory at a time.
+        """
+        unknown = set(filters) - set(FILTER_FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown audit filter(s): {', '.join(sorted(unknown))}")
+        wanted = [(field, value) for field, value in filters.items() if value is not None]
+        since = _audit_time(since)
+        until = _audit_time(until)
+
+        for segment in self.segments():
+            if since is not None and segment.max_timestamp < since:
+                continue
+            if until is not None and segment.min_timestamp >= until:
+                continue
+            try:
+                data = self._read_segment(segment)
+            except FileNotFoundError:
+                # Dropped by retention after we read the manifest
+                continue
+            with gzip.GzipFile(fileobj=io.BytesIO(data)) as lines:
+                for line in lines:
+                    record = AuditRecord(**json.loads(line))
+                    if since is not None and record.timestamp < since:
+                        continue
+                    if until is not None and record.timestamp >= until:
+                        continue
+                    if all(getattr(record, field) == value for field, value in wanted):
+                        yield record
+
+    def verify(self):
+        """Files of every segment that is missing or fails its checksum"""
+        bad = []
+        for segment in self.segments():
+            try:
+                self._read_segment(segment)
+            except (OSError, ArchiveCorruptedError) as e:
+                logger.error(f"Audit archive segment failed verification: {e}")
+                bad.append(segment.file)
+        return bad
@@ -2,14 +2,54 @@
 Audit logging utilities for compliance and security tracking
 """
 import logging
-import sqlite3
 import json
-from datetime import datetime
-from typing import Optional, Dict, Any
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Dict, Any, Iterator
+
+from modules.data.connection_pool import connection
+from modules.data.migrations import migrate
+from modules.data.records import AuditPage, AuditRecord
+from modules.utils.audit_writer import AUDIT_COLUMNS, audit_timestamp, get_writer
 
 audit_logger = logging.getLogger("ai_governance.audit")
 security_logger = logging.getLogger("ai_governance.security")
 
+AUDIT_PAGE_SIZE = 100
+AUDIT_MAX_PAGE_SIZE = 1000
+
+AUDIT_SELECT = f"SELECT id, {', '.join(AUDIT_COLUMNS)} FROM audit_logs"
+
+
+def _audit_time(value):
+    """Format a date/datetime like the stored UTC timestamps; strings pass through"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d 00:00:00')
+    return value
+
+
+def _audit_filters(user_id=None, org_id=None, action=None, resource_type=None, resource_id=None,
+                   ip_address=None, since=None, until=None):
+    """WHERE clause and parameters for the audit trail filters"""
+    conditions = []
+    params = []
+    for column, value in (('user_id', user_id), ('org_id', org_id), ('action', action),
+                          ('resource_type', resource_type), ('resource_id', resource_id),
+                          ('ip_address', ip_address)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        conditions.append("timestamp >= ?")
+        params.append(_audit_time(since))
+    if until is not None:
+        conditions.append("timestamp < ?")
+        params.append(_audit_time(until))
+    return conditions, params
+
 class AuditLogger:
     """Centralized audit trail management"""
     
@@ -102,43 +142,89 @@ class AuditLogger:
     
     @staticmethod
     def _save_to_db(user_id: Optional[int], action: str, resource_type: str, 
-                   resource_id: str, ip_address: str = None, user_agent: str = None, details: str = None):
-        """Save audit log to database"""
+                   resource_id: str, ip_address: str = None, user_agent: str = None, details: str = None,
+                   org_id: Optional[int] = None):
+        """Queue audit log for the background batch writer"""
         try:
-            conn = sqlite3.connect(AuditLogger.DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO audit_logs (user_id, action, resource_type, resource_id, ip_address, user_agent, details)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, action, resource_type, resource_id, ip_address, user_agent, details))
-            
-            conn.commit()
-            conn.close()
+            get_writer(AuditLogger.DB_PATH).submit(
+                (user_id, action, resource_type, resource_id, audit_timestamp(), ip_address, user_agent, details,
+                 org_id)
+            )
         except Exception as e:
             audit_logger.error(f"Failed to save audit log: {str(e)}")
     
+    @staticmethod
+    def flush(timeout: float = 5.0) -> bool:
+        """Wait until queued audit events are in the database"""
+        return get_writer(AuditLogger.DB_PATH).flush(timeout)
+    
+    @staticmethod
+    def _read_page(conditions, params, cursor, limit):
+        """One newest-first page; raises on database errors"""
+        if cursor:
+            conditions = conditions + ["(timestamp, id) < (?, ?)"]
+            params = params + list(cursor)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with connection(AuditLogger.DB_PATH) as conn:
+            rows = conn.execute(
+                f"{AUDIT_SELECT}{where} ORDER BY timestamp DESC, id DESC LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        items = tuple(AuditRecord(*row) for row in rows[:limit])
+        next_cursor = (items[-1].timestamp, items[-1].id) if len(rows) > limit else None
+        return AuditPage(items, next_cursor)
+    
+    @staticmethod
+    def query_audit_trail(user_id: Optional[int] = None, org_id: Optional[int] = None,
+                          action: Optional[str] = None, resource_type: Optional[str] = None,
+                          resource_id: Optional[str] = None, ip_address: Optional[str] = None,
+                          since=None, until=None, cursor=None, limit: int = AUDIT_PAGE_SIZE) -> Optional[AuditPage]:
+        """One page of audit events, newest first.
+
+        Pages are keyed on (timestamp, id): pass the previous page's
+        next_cursor to continue. since is inclusive, until exclusive; both
+        take UTC datetimes or 'YYYY-MM-DD HH:MM:SS' strings. Returns an
+        AuditPage, or None on error.
+        """
+        limit = max(1, min(int(limit), AUDIT_MAX_PAGE_SIZE))
+        conditions, params = _audit_filters(user_id, org_id, action, resource_type, resource_id,
+                                            ip_address, since, until)
+        try:
+            migrate(AuditLogger.DB_PATH)
+            # Read our own writes
+            AuditLogger.flush()
+            return AuditLogger._read_page(conditions, params, cursor, limit)
+        except Exception as e:
+            audit_logger.error(f"Failed to query audit trail: {str(e)}")
+            return None
+    
+    @staticmethod
+    def iter_audit_trail(batch_size: int = AUDIT_MAX_PAGE_SIZE, **filters) -> Iterator[AuditRecord]:
+        """Stream every matching audit event, newest first, one page in memory at a time.
+
+        Takes the query_audit_trail filters. Each page is a separate short
+        read, so long exports do not hold a snapshot open; events logged
+        after the export starts sort ahead of the cursor and are not included.
+        Database errors propagate rather than silently truncating an export.
+        """
+        batch_size = max(1, min(int(batch_size), AUDIT_MAX_PAGE_SIZE))
+        conditions, params = _audit_filters(**filters)
+        migrate(AuditLogger.DB_PATH)
+        AuditLogger.flush()
+        cursor = None
+        while True:
+            page = AuditLogger._read_page(conditions, params, cursor, batch_size)
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+    
     @staticmethod
     def get_audit_trail(user_id: Optional[int] = None, days: int = 90) -> list:
         """Retrieve audit trail with optional filtering"""
         try:
-            conn = sqlite3.connect(AuditLogger.DB_PATH)
-            cursor = conn.cursor()
-            
-            query = "SELECT * FROM audit_logs WHERE timestamp > datetime('now', '-" + str(days) + " days')"
-            params = []
-            
-            if user_id:
-                query += " AND user_id = ?"
-                params.append(user_id)
-            
-            query += " ORDER BY timestamp DESC"
-            
-            cursor.execute(query, params)
-            logs = cursor.fetchall()
-            conn.close()
-            
-            return logs
+            since = datetime.now(timezone.utc) - timedelta(days=int(days))
+            return list(AuditLogger.iter_audit_trail(user_id=user_id, since=since))
         except Exception as e:
             audit_logger.error(f"Failed to retrieve audit trail: {str(e)}")
             return []
@@ -0,0 +1,244 @@
+"""
+Background, batched writer for audit_logs
+
+Audit events are queued by the request thread and written by a daemon thread
+with one executemany per batch, flushed every AUDIT_BATCH_SIZE events or
+AUDIT_FLUSH_INTERVAL_MS, whichever comes first. When the queue is full the
+caller waits up to AUDIT_ENQUEUE_TIMEOUT_MS (back-pressure) and then writes
+the event itself, so events are delayed rather than lost. Pending events are
+flushed at interpreter exit.
+"""
+import os
+import queue
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+
+from modules.data.connection_pool import connection
+from modules.data.migrations import migrate
+
+try:
+    from config.config import Config
+    AUDIT_BATCH_SIZE = Config.AUDIT_BATCH_SIZE
+    AUDIT_FLUSH_INTERVAL_MS = Config.AUDIT_FLUSH_INTERVAL_MS
+    AUDIT_QUEUE_SIZE = Config.AUDIT_QUEUE_SIZE
+    AUDIT_ENQUEUE_TIMEOUT_MS = Config.AUDIT_ENQUEUE_TIMEOUT_MS
+except ImportError:
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+    AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    AUDIT_ENQUEUE_TIMEOUT_MS = int(os.getenv("AUDIT_ENQUEUE_TIMEOUT_MS", "50"))
+
+logger = logging.getLogger(__name__)
+
+AUDIT_COLUMNS = ('user_id', 'action', 'resource_type', 'resource_id', 'timestamp',
+                 'ip_address', 'user_agent', 'details', 'org_id')
+
+# An event without an org_id takes the acting user's organization
+INSERT_AUDIT_SQL = (
+    f"INSERT INTO audit_logs ({', '.join(AUDIT_COLUMNS)}) "
+    f"VALUES ({', '.join(f'?{i}' for i in range(1, len(AUDIT_COLUMNS)))}, "
+    f"COALESCE(?{len(AUDIT_COLUMNS)}, (SELECT org_id FROM users WHERE id = ?1)))"
+)
+
+
+def audit_timestamp():
+    """Event time in the same UTC format as the column's CURRENT_TIMESTAMP default"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+
+class AuditWriter:
+    """Queue of audit rows drained in batches by one daemon thread"""
+
+    def __init__(self, db_path, batch_size=None, flush_interval_ms=None, max_queue=None, enqueue_timeout_ms=None):
+        self.db_path = db_path
+        self.batch_size = batch_size or AUDIT_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or AUDIT_FLUSH_INTERVAL_MS) / 1000
+        self.enqueue_timeout = (enqueue_timeout_ms if enqueue_timeout_ms is not None else AUDIT_ENQUEUE_TIMEOUT_MS) / 1000
+        self._queue = queue.Queue(maxsize=max_queue or AUDIT_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._stats = {
+            'enqueued': 0, 'written': 0, 'batches': 0, 'largest_batch': 0,
+            'delayed': 0, 'written_inline': 0, 'dropped': 0,
+        }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                migrate(self.db_path)
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, row):
+        """Queue one audit row (a tuple in AUDIT_COLUMNS order)"""
+        if self._closed:
+            self._write([row], inline=True)
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Back-pressure: wait briefly for the writer, then write on this thread
+            with self._lock:
+                self._stats['delayed'] += 1
+            try:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._write([row], inline=True)
+                return
+        with self._lock:
+            self._stats['enqueued'] += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    # A flush request writes what is queued now instead of waiting out the interval
+                    deadline = 0
+                elif item is not None:
+                    batch.append(item)
+                if item is None or len(batch) >= self.batch_size:
+                    break
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+            if item is None:
+                return
+
+    def _write(self, rows, inline=False):
+        try:
+            with connection(self.db_path) as conn:
+                conn.executemany(INSERT_AUDIT_SQL, rows)
+        except sqlite3.IntegrityError:
+            # One bad row (e.g. unknown user_id) must not sink the rest of the batch
+            written = 0
+            for row in rows:
+                try:
+                    with connection(self.db_path) as conn:
+                        conn.execute(INSERT_AUDIT_SQL, row)
+                    written += 1
+                except Exception as e:
+                    logger.error(f"Dropped audit event {row[1]}: {str(e)}")
+            self._count(written, len(rows) - written, inline)
+            return
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} audit events: {str(e)}")
+            self._count(0, len(rows), inline)
+            return
+        self._count(len(rows), 0, inline)
+
+    def _count(self, written, dropped, inline):
+        with self._lock:
+            self._stats['written'] += written
+            self._stats['dropped'] += dropped
+            if inline:
+                self._stats['written_inline'] += written
+            else:
+                self._stats['batches'] += 1
+                self._stats['largest_batch'] = max(self._stats['largest_batch'], written + dropped)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued before this call is written; False on timeout"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            # A full queue counts against the timeout too
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout=5.0):
+        """Write pending events and stop the thread; later submits are written inline"""
+        with self._lock:
+            thread, self._closed = self._thread, True
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            # The writer is stuck or far behind: write what is queued from this thread
+            logger.warning("Audit writer did not keep up; writing queued events inline")
+            self._drain_inline()
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            return
+        thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _drain_inline(self):
+        """Write everything still queued on the calling thread, in batches"""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._write(batch, inline=True)
+                    batch = []
+        if batch:
+            self._write(batch, inline=True)
+
+    def stats(self):
+        """Counters for monitoring, including current queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path):
+    """Process-wide writer for a database file"""
+    key = os.path.abspath(db_path)
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = AuditWriter(db_path)
+    return writer
+
+
+def flush_all(timeout=5.0):
+    for writer in list(_writers.values()):
+        writer.flush(timeout)
+
+
+def close_all_writers(timeout=5.0):
+    """Flush and stop every writer; registered to run at interpreter exit"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout)
+
+
+atexit.register(close_all_writers)
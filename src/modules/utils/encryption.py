@@ -6,6 +6,8 @@ import logging
 import os
 from typing import Optional
 
+from modules.utils.services import lazy_service
+
 try:
     from cryptography.fernet import Fernet
     ENCRYPTION_AVAILABLE = True
@@ -107,4 +109,4 @@ class EncryptionManager:
 
 
 # Global encryption manager instance
-encryption_manager = EncryptionManager()
+encryption_manager = lazy_service('encryption_manager', EncryptionManager)
@@ -7,6 +7,8 @@ import io
 from datetime import datetime
 from typing import Dict, Any, List
 
+from modules.utils.throttle import current_request_keys, request_throttle, retry_message
+
 class ProductionExportManager:
     """
     Enterprise-grade export functionality for AI Governance assessments
@@ -20,7 +22,11 @@ class ProductionExportManager:
         """
         Main export function supporting multiple formats
         Returns dict with 'success', 'data', 'filename', 'mime_type'
+        ('success': False with 'error' and 'retry_after' when throttled)
         """
+        throttled = self._check_throttle(user_info)
+        if throttled:
+            return throttled
         try:
             if format_type == 'excel':
                 return self._export_to_excel(scores, user_info)
@@ -42,6 +48,22 @@ class ProductionExportManager:
                 'error': str(e)
             }
     
+    def _check_throttle(self, user_info: Dict) -> Dict:
+        """Error result if the caller's export budget is spent, else None"""
+        keys = {'user_id': user_info.get('user_id'), 'org_id': user_info.get('org_id')}
+        try:
+            keys = {**current_request_keys(), **{k: v for k, v in keys.items() if v is not None}}
+        except Exception:
+            pass  # Outside a Streamlit session; throttle on what user_info provides
+        result = request_throttle.check('export', **keys)
+        if result.allowed:
+            return None
+        return {
+            'success': False,
+            'error': retry_message(result),
+            'retry_after': result.retry_after
+        }
+    
     def _export_to_excel(self, scores: Dict, user_info: Dict) -> Dict:
         """Export to multi-sheet Excel workbook"""
         try:
@@ -0,0 +1,305 @@
+"""
+Shared, non-blocking logging pipeline
+
+Every named logger gets a QueueHandler that only puts the record on one
+bounded in-memory queue; a single QueueListener thread drains it in batches and
+writes each file's share with one lock and one flush.
+Each log file has exactly one handler in the process, however many loggers
+write to it, and rotation is coordinated across processes through a lock file,
+so several app workers can share logs/ without clobbering each other's
+rollovers. When the queue is full a record is dropped and counted rather than
+blocking the request.
+"""
+import os
+import copy
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from contextlib import contextmanager
+
+from modules.utils.services import lazy_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is only coordinated within one process
+    fcntl = None
+
+try:
+    from config.config import Config
+    LOG_QUEUE_SIZE = Config.LOG_QUEUE_SIZE
+except ImportError:
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Most records the listener takes off the queue before writing them out
+LISTENER_BATCH_SIZE = 256
+
+DETAILED_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# app.log also records the call site
+APP_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s'
+MESSAGE_FORMAT = '%(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class InterprocessRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that is safe when several processes append to the same file.
+
+    Writes and rollovers happen under an exclusive lock on <file>.lock, the
+    size check uses the file on disk rather than this process's stream, and a
+    stream left pointing at a file another process rotated away is reopened.
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding='utf-8'):
+        super().__init__(filename, mode='a', maxBytes=maxBytes, backupCount=backupCount,
+                         encoding=encoding, delay=True)
+        self.lock_path = f"{self.baseFilename}.lock"
+        self._lock_file = None
+
+    @contextmanager
+    def _interprocess_lock(self):
+        if fcntl is None:
+            yield
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, 'a')
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            rotated = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.stream.close()
+            self.stream = None
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+    def emit_batch(self, records):
+        """Append records with one lock, one write and one flush; rolls over as needed"""
+        self.acquire()
+        try:
+            with self._interprocess_lock():
+                self._reopen_if_rotated()
+                if self.stream is None:
+                    self.stream = self._open()
+                # The file on disk, which other processes also append to
+                size = os.fstat(self.stream.fileno()).st_size
+                pending = []
+                for record in records:
+                    try:
+                        message = f"{self.format(record)}{self.terminator}"
+                    except Exception:
+                        self.handleError(record)
+                        continue
+                    length = len(message.encode(self.encoding))
+                    if self.maxBytes > 0 and size and size + length >= self.maxBytes:
+                        self.stream.write(''.join(pending))
+                        pending = []
+                        self.doRollover()
+                        self.stream = self._open()
+                        size = 0
+                    pending.append(message)
+                    size += length
+                self.stream.write(''.join(pending))
+                self.stream.flush()
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class DeferredMessage:
+    """Base for log messages that render themselves in str() from an immutable payload.
+
+    The queue handler passes these through unformatted, so the rendering cost
+    is paid on the listener thread instead of the caller's.
+    """
+    __slots__ = ()
+
+
+class _RoutedQueueHandler(logging.handlers.QueueHandler):
+    """Queues a record tagged with the output handlers its logger writes to"""
+
+    def __init__(self, pipeline, targets):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+        self.targets = tuple(targets)
+
+    def prepare(self, record):
+        if isinstance(record.msg, DeferredMessage) and not record.args and not record.exc_info:
+            record = copy.copy(record)
+        else:
+            record = super().prepare(record)
+        record.log_targets = self.targets
+        return record
+
+    def enqueue(self, record):
+        self.pipeline.enqueue(record)
+
+
+class _RoutingListener(logging.handlers.QueueListener):
+    """Drains the queue in batches and hands each record only to the handlers it was tagged with"""
+
+    def _monitor(self):
+        # Replaces QueueListener's one-record-at-a-time loop
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < LISTENER_BATCH_SIZE and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._sentinel
+            if stop:
+                batch.pop()
+            dispatch(batch)
+            for _ in range(len(batch) + stop):
+                q.task_done()
+            if stop:
+                return
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than failing on a full queue
+        self.queue.put(self._sentinel)
+
+
+def dispatch(records):
+    """Write records to their targets, batching per target where the handler supports it"""
+    by_target = {}
+    for record in records:
+        for target in record.log_targets:
+            if record.levelno >= target.level:
+                by_target.setdefault(target, []).append(record)
+    for target, target_records in by_target.items():
+        if hasattr(target, 'emit_batch'):
+            target.emit_batch(target_records)
+        else:
+            for record in target_records:
+                target.handle(record)
+
+
+class LogPipeline:
+    """One queue, one listener thread and one handler per output for the whole process"""
+
+    def __init__(self, queue_size=None):
+        self.queue = queue.Queue(maxsize=queue_size or LOG_QUEUE_SIZE)
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._listener = _RoutingListener(self.queue)
+        self._running = False
+        self._stats = {'enqueued': 0, 'dropped': 0, 'written_inline': 0}
+
+    def start(self):
+        with self._lock:
+            if not self._running:
+                self._listener.start()
+                self._running = True
+
+    def stop(self):
+        """Write everything queued and stop the listener; later records are written inline"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._listener.stop()
+
+    def file_target(self, filename, max_bytes, backup_count, fmt=DETAILED_FORMAT, level=logging.DEBUG,
+                    datefmt=None):
+        """The process's handler for a log file; format and level are set by the first caller"""
+        path = os.path.abspath(filename)
+        with self._lock:
+            handler = self._targets.get(path)
+            if handler is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = InterprocessRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+                handler.setFormatter(logging.Formatter(fmt, datefmt))
+                handler.setLevel(level)
+                self._targets[path] = handler
+            return handler
+
+    def console_target(self, fmt=DETAILED_FORMAT, level=logging.INFO, datefmt=None):
+        with self._lock:
+            handler = self._targets.get('<console>')
+            if handler is None:
+                handler = logging.StreamHandler()
+                handler.setFormatter(logging.Formatter(fmt, datefmt))
+                handler.setLevel(level)
+                self._targets['<console>'] = handler
+            return handler
+
+    def attach(self, logger, targets):
+        """Replace a logger's handlers with one queue handler feeding targets"""
+        self.start()
+        logger.handlers = [_RoutedQueueHandler(self, targets)]
+
+    def enqueue(self, record):
+        if not self._running:
+            # Stopped (e.g. during interpreter exit): write on the caller's thread
+            with self._lock:
+                self._stats['written_inline'] += 1
+            dispatch([record])
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return
+        with self._lock:
+            self._stats['enqueued'] += 1
+
+    def flush(self, timeout=5.0):
+        """Block until the listener has written everything queued so far; False on timeout"""
+        if not self._running:
+            return True
+        done = threading.Event()
+        marker = logging.makeLogRecord({'levelno': logging.CRITICAL})
+        marker.log_targets = (_SetEvent(done),)
+        self.queue.put(marker)
+        return done.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self.queue.qsize()
+        stats['targets'] = len(self._targets)
+        return stats
+
+
+class _SetEvent:
+    """Flush marker: a pseudo-handler that signals when the listener reaches it"""
+    level = logging.NOTSET
+
+    def __init__(self, event):
+        self.event = event
+
+    def handle(self, record):
+        self.event.set()
+
+
+log_pipeline = lazy_service('log_pipeline', LogPipeline)
+
+
+def _stop_pipeline():
+    from modules.utils.services import services
+    if services.is_initialized('log_pipeline'):
+        log_pipeline.stop()
+
+
+atexit.register(_stop_pipeline)
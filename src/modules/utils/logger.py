@@ -1,148 +1,163 @@
 """
 Structured logging system for AI Governance Pro
 Provides centralized audit trail and monitoring
+
+Events go through StructuredLogger.event: a disabled level returns before
+anything is built, events can be sampled per type (LOG_SAMPLE_RATES, e.g.
+"authentication.success=0.01"), and the JSON is encoded on the log writer
+thread, with orjson when it is installed.
 """
 import logging
-import logging.handlers
 import json
+import random
 from datetime import datetime
 import os
-from pathlib import Path
+
+from modules.utils.log_pipeline import (
+    APP_LOG_FORMAT, DATE_FORMAT, DETAILED_FORMAT, MESSAGE_FORMAT, DeferredMessage, log_pipeline,
+)
+from modules.utils.services import lazy_service
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from config.config import Config
+    LOG_SAMPLE_RATES = Config.LOG_SAMPLE_RATES
+except ImportError:
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+logger = logging.getLogger(__name__)
+
+if ORJSON_AVAILABLE:
+    def encode_json(payload) -> str:
+        return orjson.dumps(payload, default=str).decode('utf-8')
+else:
+    _json_encoder = json.JSONEncoder(separators=(',', ':'), default=str)
+    
+    def encode_json(payload) -> str:
+        return _json_encoder.encode(payload)
+
+
+def parse_sample_rates(spec: str) -> dict:
+    """Parse "event_type[.success|.failure]=rate,..." into a dict; bad entries are skipped"""
+    rates = {}
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key, _, value = entry.partition('=')
+        try:
+            rates[key.strip()] = min(1.0, max(0.0, float(value)))
+        except ValueError:
+            logger.warning(f"Ignoring invalid log sample rate: {entry}")
+    return rates
+
+
+class JsonEvent(DeferredMessage):
+    """Event payload encoded to JSON on first str(), then cached for every handler"""
+    __slots__ = ('payload', '_text')
+    
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self._text = None
+    
+    def __str__(self):
+        if self._text is None:
+            self._text = encode_json(self.payload)
+        return self._text
 
 
 class StructuredLogger:
     """Structured logging with JSON audit trails"""
     
-    def __init__(self, name: str, log_dir: str = "logs"):
+    def __init__(self, name: str, log_dir: str = "logs", sample_rates: dict = None, sampler=random.random):
         self.log_dir = log_dir
         self.logger = logging.getLogger(name)
+        self.sample_rates = parse_sample_rates(LOG_SAMPLE_RATES) if sample_rates is None else dict(sample_rates)
+        self._sampler = sampler
         self._setup_logging()
     
     def _setup_logging(self):
-        """Setup logging handlers and formatters"""
-        # Create logs directory if it doesn't exist
-        Path(self.log_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Remove existing handlers
-        self.logger.handlers = []
-        
-        # Set logger level
+        """Route this logger through the shared queue to app.log, audit.json and the console"""
         self.logger.setLevel(logging.DEBUG)
         
-        # File handler - rotating logs
         log_file = os.path.join(self.log_dir, "app.log")
-        file_handler = logging.handlers.RotatingFileHandler(
-            log_file,
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=10
-        )
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Audit handler - JSON structured logs
         audit_file = os.path.join(self.log_dir, "audit.json")
-        audit_handler = logging.handlers.RotatingFileHandler(
-            audit_file,
-            maxBytes=50 * 1024 * 1024,  # 50MB
-            backupCount=20
-        )
-        audit_handler.setLevel(logging.INFO)
-        
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # Formatters
-        detailed_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        
-        json_formatter = logging.Formatter(
-            '%(message)s'
-        )
+        # app.log and the console are shared with config.logging_config, so they use its formats
+        log_pipeline.attach(self.logger, (
+            log_pipeline.file_target(log_file, 10 * 1024 * 1024, 10, APP_LOG_FORMAT, logging.DEBUG,  # 10MB
+                                     DATE_FORMAT),
+            log_pipeline.file_target(audit_file, 50 * 1024 * 1024, 20, MESSAGE_FORMAT, logging.INFO),  # 50MB
+            log_pipeline.console_target(DETAILED_FORMAT, logging.INFO, DATE_FORMAT),
+        ))
+    
+    def sample_rate(self, event_type: str, success: bool = None) -> float:
+        """Fraction of events kept: "<type>.success"/"<type>.failure", then "<type>", then "*" """
+        rates = self.sample_rates
+        if not rates:
+            return 1.0
+        if success is not None:
+            rate = rates.get(f"{event_type}.{'success' if success else 'failure'}")
+            if rate is not None:
+                return rate
+        return rates.get(event_type, rates.get('*', 1.0))
+    
+    def event(self, event_type: str, level: int = logging.INFO, success: bool = None, **fields) -> bool:
+        """Log one structured event; returns False when filtered by level or sampled out
         
-        file_handler.setFormatter(detailed_formatter)
-        audit_handler.setFormatter(json_formatter)
-        console_handler.setFormatter(detailed_formatter)
+        Sampled events carry their sample_rate so counts can be scaled back up.
+        """
+        if not self.logger.isEnabledFor(level):
+            return False
+        rate = self.sample_rate(event_type, success)
+        if rate < 1.0 and self._sampler() >= rate:
+            return False
         
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(audit_handler)
-        self.logger.addHandler(console_handler)
+        payload = {'timestamp': datetime.now().isoformat(), 'event_type': event_type}
+        if success is not None:
+            payload['success'] = success
+        payload.update(fields)
+        if rate < 1.0:
+            payload['sample_rate'] = rate
+        self.logger.log(level, JsonEvent(payload))
+        return True
     
     def log_authentication(self, event_type: str, email: str, success: bool, 
                           ip_address: str = None, details: str = None):
         """Log authentication events to audit trail"""
-        audit_log = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': 'authentication',
-            'event_subtype': event_type,
-            'email': email,
-            'success': success,
-            'ip_address': ip_address,
-            'details': details
-        }
-        self.logger.info(json.dumps(audit_log))
+        self.event('authentication', success=success, event_subtype=event_type, email=email,
+                   ip_address=ip_address, details=details)
     
     def log_assessment_submitted(self, user_id: int, assessment_id: int,
                                  overall_score: float, maturity_level: str,
                                  ip_address: str = None):
         """Log assessment submission to audit trail"""
-        audit_log = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': 'assessment',
-            'event_subtype': 'submitted',
-            'user_id': user_id,
-            'assessment_id': assessment_id,
-            'overall_score': overall_score,
-            'maturity_level': maturity_level,
-            'ip_address': ip_address
-        }
-        self.logger.info(json.dumps(audit_log))
+        self.event('assessment', event_subtype='submitted', user_id=user_id, assessment_id=assessment_id,
+                   overall_score=overall_score, maturity_level=maturity_level, ip_address=ip_address)
     
     def log_export_operation(self, user_id: int, export_format: str,
                             success: bool, filename: str = None,
                             ip_address: str = None, error: str = None):
         """Log data export operations to audit trail"""
-        audit_log = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': 'export',
-            'user_id': user_id,
-            'format': export_format,
-            'success': success,
-            'filename': filename,
-            'ip_address': ip_address,
-            'error': error
-        }
-        self.logger.info(json.dumps(audit_log))
+        self.event('export', success=success, user_id=user_id, format=export_format, filename=filename,
+                   ip_address=ip_address, error=error)
     
     def log_data_access(self, user_id: int, resource_type: str,
                        resource_id: str, action: str, ip_address: str = None):
         """Log data access for compliance"""
-        audit_log = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': 'data_access',
-            'user_id': user_id,
-            'resource_type': resource_type,
-            'resource_id': resource_id,
-            'action': action,
-            'ip_address': ip_address
-        }
-        self.logger.info(json.dumps(audit_log))
+        self.event('data_access', user_id=user_id, resource_type=resource_type, resource_id=resource_id,
+                   action=action, ip_address=ip_address)
     
     def log_security_event(self, event_type: str, severity: str,
                           description: str, ip_address: str = None,
                           user_id: int = None):
         """Log security events"""
-        audit_log = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': 'security',
-            'security_event_type': event_type,
-            'severity': severity,
-            'description': description,
-            'user_id': user_id,
-            'ip_address': ip_address
-        }
-        self.logger.warning(json.dumps(audit_log))
+        self.event('security', logging.WARNING, security_event_type=event_type, severity=severity,
+                   description=description, user_id=user_id, ip_address=ip_address)
     
     def log_error(self, error_type: str, error_message: str,
                  context: str = None, user_id: int = None):
@@ -153,9 +168,9 @@ class StructuredLogger:
         )
 
 
-# Global logger instances
-app_logger = StructuredLogger("ai_governance_app")
-auth_logger = StructuredLogger("ai_governance_auth")
-assessment_logger = StructuredLogger("ai_governance_assessment")
-export_logger = StructuredLogger("ai_governance_export")
-security_logger = StructuredLogger("ai_governance_security")
+# Global logger instances; handlers and log files are created on first use
+app_logger = lazy_service('app_logger', lambda: StructuredLogger("ai_governance_app"))
+auth_logger = lazy_service('auth_logger', lambda: StructuredLogger("ai_governance_auth"))
+assessment_logger = lazy_service('assessment_logger', lambda: StructuredLogger("ai_governance_assessment"))
+export_logger = lazy_service('export_logger', lambda: StructuredLogger("ai_governance_export"))
+security_logger = lazy_service('security_logger', lambda: StructuredLogger("ai_governance_security"))
@@ -0,0 +1,212 @@
+"""
+Storage backends for RateLimiter
+
+MemoryRateLimitBackend keeps a sliding window of failed attempts per
+identifier in process memory, shared by every session in the process and
+split across lock stripes so unrelated identifiers never contend.
+SqliteRateLimitBackend stores the same state in the rate_limits table for
+deployments running several processes, with each call a single statement.
+
+Both implement check / record_failure / reset / cleanup; check and
+record_failure return the seconds remaining on a lockout, or None.
+"""
+import time
+import threading
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from modules.data.connection_pool import connection
+from modules.data.migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+# Power of two so the stripe is picked with a mask
+DEFAULT_STRIPES = 64
+# Identifiers tracked per process before the least recently seen unlocked ones are dropped
+DEFAULT_MAX_IDENTIFIERS = 100_000
+
+
+class RateLimitBackend:
+    """Interface shared by the rate limit backends"""
+
+    def __init__(self, max_attempts, window_seconds, lockout_seconds):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+
+    def check(self, identifier):
+        """Seconds left on an active lockout, or None when allowed"""
+        raise NotImplementedError
+
+    def record_failure(self, identifier):
+        """Count a failed attempt; returns seconds locked if this attempt triggered a lockout"""
+        raise NotImplementedError
+
+    def reset(self, identifier):
+        """Forget all attempts for identifier"""
+        raise NotImplementedError
+
+    def cleanup(self):
+        """Drop expired state; returns the number of identifiers removed"""
+        raise NotImplementedError
+
+
+class _Entry:
+    __slots__ = ('attempts', 'locked_until', 'last_seen')
+
+    def __init__(self, max_attempts):
+        # Only the newest max_attempts timestamps can decide a lockout
+        self.attempts = deque(maxlen=max_attempts)
+        self.locked_until = 0.0
+        self.last_seen = 0.0
+
+
+class _Stripe:
+    __slots__ = ('lock', 'entries', 'next_sweep')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.next_sweep = 0.0
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """In-process sliding-window limiter with lock striping and idle eviction"""
+
+    name = 'memory'
+
+    def __init__(self, max_attempts, window_seconds, lockout_seconds,
+                 stripes=DEFAULT_STRIPES, max_identifiers=DEFAULT_MAX_IDENTIFIERS, clock=time.monotonic):
+        super().__init__(max_attempts, window_seconds, lockout_seconds)
+        self._stripes = tuple(_Stripe() for _ in range(stripes))
+        self._mask = stripes - 1
+        self._max_per_stripe = max(1, max_identifiers // stripes)
+        # Entries idle this long carry no state worth keeping
+        self._idle_seconds = max(window_seconds, lockout_seconds)
+        self._clock = clock
+
+    def _stripe(self, identifier):
+        return self._stripes[hash(identifier) & self._mask]
+
+    def check(self, identifier):
+        # Lock-free read: dict lookups and float reads are atomic under the GIL
+        entry = self._stripes[hash(identifier) & self._mask].entries.get(identifier)
+        if entry is None:
+            return None
+        remaining = entry.locked_until - self._clock()
+        return remaining if remaining > 0 else None
+
+    def record_failure(self, identifier):
+        now = self._clock()
+        stripe = self._stripe(identifier)
+        with stripe.lock:
+            if now >= stripe.next_sweep or len(stripe.entries) >= self._max_per_stripe:
+                self._sweep(stripe, now)
+            entry = stripe.entries.get(identifier)
+            if entry is None:
+                entry = stripe.entries[identifier] = _Entry(self.max_attempts)
+            entry.last_seen = now
+            attempts = entry.attempts
+            attempts.append(now)
+            if len(attempts) == self.max_attempts and now - attempts[0] <= self.window_seconds:
+                entry.locked_until = now + self.lockout_seconds
+                attempts.clear()
+                return self.lockout_seconds
+        return None
+
+    def reset(self, identifier):
+        stripe = self._stripe(identifier)
+        if identifier in stripe.entries:
+            with stripe.lock:
+                stripe.entries.pop(identifier, None)
+
+    def _sweep(self, stripe, now):
+        """Evict idle entries, then the least recently seen unlocked ones if still full"""
+        stripe.next_sweep = now + self.window_seconds
+        cutoff = now - self._idle_seconds
+        idle = [key for key, entry in stripe.entries.items()
+                if entry.last_seen < cutoff and entry.locked_until <= now]
+        for key in idle:
+            del stripe.entries[key]
+        removed = len(idle)
+        overflow = len(stripe.entries) - self._max_per_stripe + 1
+        if overflow > 0:
+            unlocked = sorted((entry.last_seen, key) for key, entry in stripe.entries.items()
+                              if entry.locked_until <= now)
+            for _, key in unlocked[:overflow]:
+                del stripe.entries[key]
+                removed += 1
+        return removed
+
+    def cleanup(self):
+        now = self._clock()
+        removed = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                removed += self._sweep(stripe, now)
+        return removed
+
+    def size(self):
+        """Number of identifiers currently tracked"""
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+
+class SqliteRateLimitBackend(RateLimitBackend):
+    """rate_limits table shared between processes; one statement per call"""
+
+    name = 'sqlite'
+
+    def __init__(self, max_attempts, window_seconds, lockout_seconds, db_path):
+        super().__init__(max_attempts, window_seconds, lockout_seconds)
+        self.db_path = db_path
+        migrate(db_path)
+
+    def check(self, identifier):
+        with connection(self.db_path) as conn:
+            row = conn.execute("SELECT locked_until FROM rate_limits WHERE identifier = ?", (identifier,)).fetchone()
+        if not row or not row[0]:
+            return None
+        try:
+            remaining = (datetime.fromisoformat(row[0]) - datetime.now()).total_seconds()
+        except ValueError:
+            return None
+        return remaining if remaining > 0 else None
+
+    def record_failure(self, identifier):
+        now = datetime.now()
+        window_start = (now - timedelta(seconds=self.window_seconds)).isoformat()
+        lock_until = (now + timedelta(seconds=self.lockout_seconds)).isoformat()
+        # Restart the count when the window has passed; lock in the same statement
+        with connection(self.db_path) as conn:
+            attempt_count, locked_until = conn.execute("""
+                INSERT INTO rate_limits (identifier, attempt_count, first_attempt, last_attempt)
+                VALUES (?, 1, ?, ?)
+                ON CONFLICT(identifier) DO UPDATE SET
+                    attempt_count = CASE WHEN first_attempt IS NULL OR first_attempt < ?
+                                         THEN 1 ELSE attempt_count + 1 END,
+                    first_attempt = CASE WHEN first_attempt IS NULL OR first_attempt < ?
+                                         THEN excluded.first_attempt ELSE first_attempt END,
+                    last_attempt = excluded.last_attempt,
+                    locked_until = CASE WHEN (CASE WHEN first_attempt IS NULL OR first_attempt < ?
+                                                   THEN 1 ELSE attempt_count + 1 END) >= ?
+                                        THEN ? ELSE locked_until END
+                RETURNING attempt_count, locked_until
+            """, (identifier, now.isoformat(), now.isoformat(), window_start, window_start, window_start,
+                  self.max_attempts, lock_until)).fetchone()
+        if attempt_count >= self.max_attempts and locked_until == lock_until:
+            return float(self.lockout_seconds)
+        return None
+
+    def reset(self, identifier):
+        with connection(self.db_path) as conn:
+            conn.execute("DELETE FROM rate_limits WHERE identifier = ?", (identifier,))
+
+    def cleanup(self):
+        now = datetime.now()
+        window_start = (now - timedelta(seconds=self.window_seconds)).isoformat()
+        with connection(self.db_path) as conn:
+            cursor = conn.execute(
+                "DELETE FROM rate_limits WHERE (locked_until IS NULL OR locked_until < ?) AND last_attempt < ?",
+                (now.isoformat(), window_start))
+            return cursor.rowcount
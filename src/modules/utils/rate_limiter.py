@@ -1,12 +1,22 @@
 """
 Rate limiting and brute-force protection utilities
 """
-import sqlite3
-from datetime import datetime, timedelta
+import os
 import logging
 
+from modules.data.migrations import migrate
+from modules.utils.rate_limit_backends import MemoryRateLimitBackend, SqliteRateLimitBackend
+
+try:
+    from config.config import Config
+    RATE_LIMIT_BACKEND = Config.RATE_LIMIT_BACKEND
+except ImportError:
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+
 logger = logging.getLogger(__name__)
 
+_ALLOWED = (True, "OK")
+
 class RateLimiter:
     """Rate limiting for authentication attempts"""
     
@@ -14,32 +24,40 @@ class RateLimiter:
     MAX_ATTEMPTS = 5
     LOCKOUT_DURATION_MINUTES = 30
     ATTEMPT_WINDOW_MINUTES = 15
+    # "memory" (per process, shared across sessions) or "sqlite" (shared across processes)
+    BACKEND = RATE_LIMIT_BACKEND
+    _backend = None
     
     @staticmethod
     def init_db():
-        """Initialize rate limiting table"""
+        """Initialize rate limiting table and rebind the backend to the current DB_PATH"""
         try:
-            conn = sqlite3.connect(RateLimiter.DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS rate_limits (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    identifier TEXT NOT NULL,
-                    attempt_count INTEGER DEFAULT 0,
-                    first_attempt TIMESTAMP,
-                    last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    locked_until TIMESTAMP,
-                    UNIQUE(identifier)
-                )
-            """)
-            
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_identifier ON rate_limits(identifier)")
-            
-            conn.commit()
-            conn.close()
+            migrate(RateLimiter.DB_PATH)
         except Exception as e:
             logger.error(f"Error initializing rate limiter: {str(e)}")
+        RateLimiter._backend = None
+    
+    @staticmethod
+    def get_backend():
+        """Backend selected by BACKEND, created on first use"""
+        backend = RateLimiter._backend
+        if backend is None:
+            settings = (RateLimiter.MAX_ATTEMPTS, RateLimiter.ATTEMPT_WINDOW_MINUTES * 60,
+                        RateLimiter.LOCKOUT_DURATION_MINUTES * 60)
+            kind = (RateLimiter.BACKEND or "memory").lower()
+            if kind == "memory":
+                backend = MemoryRateLimitBackend(*settings)
+            else:
+                if kind != "sqlite":
+                    logger.warning(f"Unknown RATE_LIMIT_BACKEND '{kind}', using sqlite")
+                backend = SqliteRateLimitBackend(*settings, db_path=RateLimiter.DB_PATH)
+            RateLimiter._backend = backend
+        return backend
+    
+    @staticmethod
+    def set_backend(backend):
+        """Install a backend instance; None rebuilds one from the class settings on next use"""
+        RateLimiter._backend = backend
     
     @staticmethod
     def check_rate_limit(identifier: str) -> tuple[bool, str]:
@@ -48,130 +66,44 @@ class RateLimiter:
         Returns: (is_allowed, message)
         """
         try:
-            conn = sqlite3.connect(RateLimiter.DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM rate_limits WHERE identifier = ?", (identifier,))
-            record = cursor.fetchone()
-            
-            if not record:
-                conn.close()
-                return True, "OK"
-            
-            locked_until = record[5]
-            if locked_until:
-                locked_time = datetime.fromisoformat(locked_until)
-                if datetime.now() < locked_time:
-                    remaining = (locked_time - datetime.now()).total_seconds() / 60
-                    conn.close()
-                    return False, f"Account temporarily locked. Try again in {int(remaining)} minutes"
-                else:
-                    # Reset lockout
-                    cursor.execute(
-                        "UPDATE rate_limits SET locked_until = NULL, attempt_count = 0 WHERE identifier = ?",
-                        (identifier,)
-                    )
-                    conn.commit()
-            
-            # Check if attempts window has expired
-            first_attempt = datetime.fromisoformat(record[3])
-            if datetime.now() > first_attempt + timedelta(minutes=RateLimiter.ATTEMPT_WINDOW_MINUTES):
-                cursor.execute(
-                    "UPDATE rate_limits SET attempt_count = 0, first_attempt = CURRENT_TIMESTAMP WHERE identifier = ?",
-                    (identifier,)
-                )
-                conn.commit()
-                conn.close()
-                return True, "OK"
-            
-            conn.close()
-            return True, "OK"
-            
+            remaining = (RateLimiter._backend or RateLimiter.get_backend()).check(identifier)
         except Exception as e:
             logger.error(f"Error checking rate limit: {str(e)}")
-            return True, "OK"
+            return _ALLOWED
+        if remaining is None:
+            return _ALLOWED
+        return False, f"Account temporarily locked. Try again in {int(remaining / 60)} minutes"
     
     @staticmethod
     def record_failed_attempt(identifier: str) -> bool:
         """Record a failed authentication attempt"""
         try:
-            conn = sqlite3.connect(RateLimiter.DB_PATH)
-            cursor = conn.cursor()
-            
-            # Get or create record
-            cursor.execute("SELECT * FROM rate_limits WHERE identifier = ?", (identifier,))
-            record = cursor.fetchone()
-            
-            if not record:
-                cursor.execute("""
-                    INSERT INTO rate_limits (identifier, attempt_count, first_attempt, last_attempt)
-                    VALUES (?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                """, (identifier,))
-            else:
-                attempt_count = record[2] + 1
-                
-                # Check if should lock account
-                if attempt_count >= RateLimiter.MAX_ATTEMPTS:
-                    locked_until = (datetime.now() + timedelta(minutes=RateLimiter.LOCKOUT_DURATION_MINUTES)).isoformat()
-                    cursor.execute(
-                        "UPDATE rate_limits SET attempt_count = ?, last_attempt = CURRENT_TIMESTAMP, locked_until = ? WHERE identifier = ?",
-                        (attempt_count, locked_until, identifier)
-                    )
-                    logger.warning(f"Rate limit exceeded for {identifier}. Account locked until {locked_until}")
-                else:
-                    cursor.execute(
-                        "UPDATE rate_limits SET attempt_count = ?, last_attempt = CURRENT_TIMESTAMP WHERE identifier = ?",
-                        (attempt_count, identifier)
-                    )
-            
-            conn.commit()
-            conn.close()
-            return True
-            
+            locked_for = (RateLimiter._backend or RateLimiter.get_backend()).record_failure(identifier)
         except Exception as e:
             logger.error(f"Error recording failed attempt: {str(e)}")
             return False
+        if locked_for is not None:
+            logger.warning(f"Rate limit exceeded for {identifier}. Locked for {int(locked_for / 60)} minutes")
+        return True
     
     @staticmethod
     def reset_attempts(identifier: str) -> bool:
         """Reset attempts for successful authentication"""
         try:
-            conn = sqlite3.connect(RateLimiter.DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "UPDATE rate_limits SET attempt_count = 0, locked_until = NULL WHERE identifier = ?",
-                (identifier,)
-            )
-            
-            conn.commit()
-            conn.close()
+            (RateLimiter._backend or RateLimiter.get_backend()).reset(identifier)
             return True
-            
         except Exception as e:
             logger.error(f"Error resetting attempts: {str(e)}")
             return False
     
     @staticmethod
     def cleanup_expired_locks():
-        """Clean up expired lockouts"""
+        """Clean up expired lockouts and idle identifiers"""
         try:
-            conn = sqlite3.connect(RateLimiter.DB_PATH)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE rate_limits 
-                SET locked_until = NULL, attempt_count = 0 
-                WHERE locked_until IS NOT NULL AND locked_until < CURRENT_TIMESTAMP
-            """)
-            
-            conn.commit()
-            conn.close()
+            removed = RateLimiter.get_backend().cleanup()
+            if removed:
+                logger.info(f"Rate limiter cleanup removed {removed} identifiers")
             return True
-            
         except Exception as e:
             logger.error(f"Error cleaning up expired locks: {str(e)}")
             return False
-
-# Initialize on import
-RateLimiter.init_db()
@@ -0,0 +1,91 @@
+"""
+Lazy service container
+
+Module-level singletons (db_manager, auth_manager, loggers, ...) are
+registered here with a factory and exposed as LazyService proxies, so
+importing a module no longer opens databases, hashes passwords or creates
+log files. The real object is built on first attribute access, once per
+process, and every later access goes straight to it.
+"""
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Registry of named, lazily constructed singletons"""
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._init_seconds = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """Register (or replace) the factory for a service"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        """Return the service, constructing it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._init_seconds[name] = time.perf_counter() - started
+                self._instances[name] = instance
+                logger.debug(f"Initialized service {name} in {self._init_seconds[name] * 1000:.1f}ms")
+        return instance
+
+    def is_initialized(self, name):
+        return name in self._instances
+
+    def names(self):
+        return list(self._factories)
+
+    def reset(self, name=None):
+        """Drop constructed instances (all, or one) so they are rebuilt on next use"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def init_timings(self):
+        """Seconds spent constructing each service initialized so far"""
+        return dict(self._init_seconds)
+
+
+services = ServiceContainer()
+
+
+class LazyService:
+    """Stand-in for a module-level singleton; forwards everything to the real service"""
+
+    __slots__ = ('_service_name',)
+
+    def __init__(self, name):
+        object.__setattr__(self, '_service_name', name)
+
+    def __getattr__(self, attr):
+        return getattr(services.get(self._service_name), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(services.get(self._service_name), attr, value)
+
+    def __repr__(self):
+        state = "initialized" if services.is_initialized(self._service_name) else "not initialized"
+        return f"<LazyService {self._service_name} ({state})>"
+
+
+def lazy_service(name, factory):
+    """Register factory under name and return a proxy for module-level use"""
+    services.register(name, factory)
+    return LazyService(name)
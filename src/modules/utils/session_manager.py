@@ -6,6 +6,8 @@ import streamlit as st
 from datetime import datetime, timedelta
 import hashlib
 
+from modules.utils.services import lazy_service
+
 class SessionManager:
     def __init__(self):
         self.session_timeout = timedelta(hours=2)
@@ -140,4 +142,4 @@ class SessionManager:
         return st.session_state.demo_questions_answered < st.session_state.max_demo_questions
 
 # Global session manager instance
-session_manager = SessionManager()
+session_manager = lazy_service('session_manager', SessionManager)
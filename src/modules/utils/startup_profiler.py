@@ -0,0 +1,101 @@
+"""
+Startup import profiler
+
+`python run.py --profile-startup` imports the app in a fresh interpreter with
+`-X importtime`, reports the slowest modules and checks the total against
+STARTUP_BUDGET_MS. It also lists any lazy services that were constructed
+during import, which should be none.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+try:
+    from config.config import Config
+    DEFAULT_BUDGET_MS = Config.STARTUP_BUDGET_MS
+except ImportError:
+    DEFAULT_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+ImportTiming = namedtuple('ImportTiming', ['module', 'self_ms', 'cumulative_ms', 'depth'])
+
+# Runs in the child interpreter; prints the services built during import
+_PROBE = (
+    "import json, importlib, sys\n"
+    "importlib.import_module(sys.argv[1])\n"
+    "from modules.utils.services import services\n"
+    "print(json.dumps(services.init_timings()))\n"
+)
+
+
+def parse_importtime(output):
+    """Parse `-X importtime` stderr into ImportTiming rows, in import order"""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # One space follows the "|"; any further indentation is nesting depth
+        name = name[1:]
+        module = name.lstrip(" ")
+        depth = (len(name) - len(module)) // 2
+        timings.append(ImportTiming(module, int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+    return timings
+
+
+def profile_imports(module="app.main", cwd=None):
+    """Import module in a fresh interpreter; return (timings, services initialized during import)"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, module],
+        cwd=cwd or os.path.dirname(SRC_DIR), env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    initialized = json.loads(result.stdout.strip().splitlines()[-1])
+    return parse_importtime(result.stderr), initialized
+
+
+def total_ms(timings):
+    """Wall time of all top-level imports"""
+    return sum(timing.cumulative_ms for timing in timings if timing.depth == 0)
+
+
+def format_report(timings, initialized, budget_ms, top=25, module="app.main"):
+    """Render the report printed by --profile-startup"""
+    project = [t for t in timings if t.module.split(".")[0] in ("app", "modules", "config")]
+    lines = [f"Startup import profile for {module}", ""]
+    lines.append(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for timing in sorted(timings, key=lambda t: t.cumulative_ms, reverse=True)[:top]:
+        lines.append(f"{timing.cumulative_ms:>14.1f} {timing.self_ms:>9.1f}  {timing.module}")
+    lines.append("")
+    lines.append(f"Project modules: {len(project)}, self time {sum(t.self_ms for t in project):.1f}ms")
+    if initialized:
+        lines.append("❌ Services constructed during import: " + ", ".join(
+            f"{name} ({seconds * 1000:.1f}ms)" for name, seconds in initialized.items()))
+    else:
+        lines.append("✅ No services constructed during import")
+    total = total_ms(timings)
+    status = "✅" if total <= budget_ms else "❌"
+    lines.append(f"{status} Total import time {total:.1f}ms (budget {budget_ms}ms)")
+    return "\n".join(lines)
+
+
+def profile_startup(argv=None):
+    """Entry point for `run.py --profile-startup`; returns a process exit code"""
+    parser = argparse.ArgumentParser(prog="run.py --profile-startup",
+                                     description="Report per-module import time of the app")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    timings, initialized = profile_imports(args.module)
+    print(format_report(timings, initialized, args.budget_ms, args.top, args.module))
+    over_budget = total_ms(timings) > args.budget_ms
+    return 1 if over_budget or initialized else 0
@@ -0,0 +1,186 @@
+"""
+Per-route request throttling
+
+Expensive actions (submit, export, evidence upload, password reset,
+registration) draw from token buckets keyed by session, user and
+organization, so one tenant hammering an action cannot starve everyone else.
+The unauthenticated routes have no user or organization and a session id is
+free to drop, so they are also keyed by the email they act on.
+Each bucket is a three-item list; buckets that have refilled are
+indistinguishable from new ones and are evicted on the next sweep, so memory
+stays O(1) per active key. Limits come from RATE_LIMIT_PER_MINUTE and, for the
+unauthenticated routes, AUTH_RATE_LIMIT_PER_MINUTE.
+"""
+import os
+import math
+import time
+import uuid
+import threading
+import logging
+from collections import namedtuple
+
+from modules.utils.services import lazy_service
+
+try:
+    from config.config import Config
+    RATE_LIMIT_ENABLED = Config.RATE_LIMIT_ENABLED
+    RATE_LIMIT_PER_MINUTE = Config.RATE_LIMIT_PER_MINUTE
+    AUTH_RATE_LIMIT_PER_MINUTE = Config.AUTH_RATE_LIMIT_PER_MINUTE
+    THROTTLE_ORG_MULTIPLIER = Config.THROTTLE_ORG_MULTIPLIER
+except ImportError:
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "100"))
+    AUTH_RATE_LIMIT_PER_MINUTE = int(os.getenv("AUTH_RATE_LIMIT_PER_MINUTE", "5"))
+    THROTTLE_ORG_MULTIPLIER = int(os.getenv("THROTTLE_ORG_MULTIPLIER", "10"))
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute for each throttled route
+ROUTE_LIMITS = {
+    'submit': RATE_LIMIT_PER_MINUTE,
+    'export': RATE_LIMIT_PER_MINUTE,
+    'evidence_upload': RATE_LIMIT_PER_MINUTE,
+    'password_reset': AUTH_RATE_LIMIT_PER_MINUTE,
+    'registration': AUTH_RATE_LIMIT_PER_MINUTE,
+}
+
+STRIPES = 64
+
+# Bucket scopes, most to least specific; subject is the email an
+# unauthenticated request acts on
+SCOPES = ('session', 'subject', 'user', 'org')
+
+ThrottleResult = namedtuple('ThrottleResult', ['allowed', 'retry_after', 'scope'])
+
+_ALLOWED = ThrottleResult(True, 0.0, None)
+
+
+class TokenBuckets:
+    """Striped map of key -> [tokens, last_refill, per_minute]; capacity is one minute's budget"""
+
+    def __init__(self, stripes=STRIPES, clock=time.monotonic):
+        self._locks = tuple(threading.Lock() for _ in range(stripes))
+        self._buckets = tuple({} for _ in range(stripes))
+        self._next_sweep = [0.0] * stripes
+        self._mask = stripes - 1
+        self._clock = clock
+
+    def acquire(self, requests, cost=1):
+        """
+        Take cost tokens from every (key, per_minute) bucket, or from none
+        Returns (None, 0) on success, else (key, seconds until it has enough tokens)
+        """
+        now = self._clock()
+        stripes = sorted({hash(key) & self._mask for key, _ in requests})
+        # Always lock in stripe order so multi-key requests cannot deadlock
+        for index in stripes:
+            self._locks[index].acquire()
+        try:
+            for index in stripes:
+                if now >= self._next_sweep[index]:
+                    self._sweep(index, now)
+            buckets = []
+            blocked, retry_after = None, 0.0
+            for key, per_minute in requests:
+                stripe = self._buckets[hash(key) & self._mask]
+                bucket = stripe.get(key)
+                if bucket is None:
+                    bucket = stripe[key] = [float(per_minute), now, per_minute]
+                else:
+                    bucket[0] = min(per_minute, bucket[0] + (now - bucket[1]) * per_minute / 60.0)
+                    bucket[1] = now
+                if bucket[0] < cost:
+                    wait = (cost - bucket[0]) * 60.0 / per_minute
+                    if wait > retry_after:
+                        blocked, retry_after = key, wait
+                buckets.append(bucket)
+            if blocked is not None:
+                return blocked, retry_after
+            for bucket in buckets:
+                bucket[0] -= cost
+            return None, 0.0
+        finally:
+            for index in reversed(stripes):
+                self._locks[index].release()
+
+    def _sweep(self, index, now):
+        """Drop buckets that have refilled; called with the stripe lock held"""
+        stripe = self._buckets[index]
+        full = [key for key, (tokens, updated, per_minute) in stripe.items()
+                if tokens + (now - updated) * per_minute / 60.0 >= per_minute]
+        for key in full:
+            del stripe[key]
+        self._next_sweep[index] = now + 60.0
+        return len(full)
+
+    def size(self):
+        """Number of buckets currently held"""
+        return sum(len(stripe) for stripe in self._buckets)
+
+
+class RequestThrottle:
+    """Token-bucket limits per route, applied to session, subject, user and organization together"""
+
+    def __init__(self, limits=None, org_multiplier=None, enabled=None, clock=time.monotonic):
+        self.limits = dict(ROUTE_LIMITS if limits is None else limits)
+        self.org_multiplier = org_multiplier or THROTTLE_ORG_MULTIPLIER
+        self.enabled = RATE_LIMIT_ENABLED if enabled is None else enabled
+        self.buckets = TokenBuckets(clock=clock)
+
+    def check(self, route, session_id=None, user_id=None, org_id=None, cost=1, subject=None):
+        """Consume from the route's buckets; ThrottleResult says whether the action may run"""
+        per_minute = self.limits.get(route)
+        if not self.enabled or not per_minute:
+            return _ALLOWED
+        if subject is not None:
+            subject = subject.strip().lower() or None
+        # An organization shares one, larger, bucket across its users
+        scopes = ((session_id, per_minute), (subject, per_minute), (user_id, per_minute),
+                  (org_id, per_minute * self.org_multiplier))
+        requests = [((route, scope, key), limit)
+                    for scope, (key, limit) in zip(SCOPES, scopes) if key is not None]
+        if not requests:
+            return _ALLOWED
+        blocked, retry_after = self.buckets.acquire(requests, cost)
+        if blocked is None:
+            return _ALLOWED
+        logger.warning(f"Throttled {route} for {blocked[1]} {blocked[2]}; retry in {retry_after:.1f}s")
+        return ThrottleResult(False, retry_after, blocked[1])
+
+
+request_throttle = lazy_service('request_throttle', RequestThrottle)
+
+
+def current_request_keys():
+    """session_id / user_id / org_id for the running Streamlit session"""
+    import streamlit as st
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        session_id = ctx.session_id if ctx else None
+    except ImportError:
+        session_id = None
+    if session_id is None:
+        session_id = st.session_state.setdefault('throttle_session_id', uuid.uuid4().hex)
+    user = st.session_state.get('user') or {}
+    return {
+        'session_id': session_id,
+        'user_id': user.get('user_id'),
+        'org_id': user.get('org_id', st.session_state.get('org_id')),
+    }
+
+
+def retry_message(result):
+    return f"Too many requests. Please try again in {math.ceil(result.retry_after)} seconds."
+
+
+def throttle_allows(route, cost=1, subject=None):
+    """
+    Streamlit guard for an expensive action; shows a retry hint and returns False when throttled
+    subject is the email an unauthenticated action targets
+    """
+    import streamlit as st
+    result = request_throttle.check(route, cost=cost, subject=subject, **current_request_keys())
+    if not result.allowed:
+        st.warning(f"⏳ {retry_message(result)}")
+    return result.allowed
@@ -1,10 +1,19 @@
 """
 Input validation and sanitization utilities for enterprise security
 """
+import os
 import re
 import html
 from typing import Tuple
 
+try:
+    from config.config import Config
+    MAX_UPLOAD_SIZE_MB = Config.MAX_UPLOAD_SIZE_MB
+    MAX_USER_STORAGE_MB = Config.MAX_USER_STORAGE_MB
+except ImportError:
+    MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
+    MAX_USER_STORAGE_MB = int(os.getenv("MAX_USER_STORAGE_MB", "100"))
+
 class ValidationError(Exception):
     """Custom exception for validation failures"""
     pass
@@ -124,7 +133,8 @@ class Validators:
         return True, ""
     
     @staticmethod
-    def validate_file_upload(filename: str, file_size: int, allowed_types: list = None) -> Tuple[bool, str]:
+    def validate_file_upload(filename: str, file_size: int, allowed_types: list = None,
+                             storage_used: int = 0, storage_quota: int = None) -> Tuple[bool, str]:
         """
         Validate file upload (server-side validation)
         
@@ -132,6 +142,8 @@ class Validators:
             filename: Original filename
             file_size: File size in bytes
             allowed_types: List of allowed MIME types
+            storage_used: Bytes the user has already uploaded
+            storage_quota: Per-user limit in bytes (default MAX_USER_STORAGE_MB)
             
         Returns:
             Tuple of (is_valid, error_message)
@@ -142,12 +154,17 @@ class Validators:
                            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
                            'text/plain', 'image/png', 'image/jpeg', 'image/jpg']
         
-        max_file_size = 10 * 1024 * 1024  # 10MB
-        max_user_storage = 100 * 1024 * 1024  # 100MB
+        max_file_size = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+        max_user_storage = storage_quota if storage_quota is not None else MAX_USER_STORAGE_MB * 1024 * 1024
         
         # Check file size
         if file_size > max_file_size:
-            return False, f"File size exceeds 10MB limit ({file_size / 1024 / 1024:.1f}MB)"
+            return False, f"File size exceeds {MAX_UPLOAD_SIZE_MB}MB limit ({file_size / 1024 / 1024:.1f}MB)"
+        
+        # Check the user's storage quota
+        if storage_used + file_size > max_user_storage:
+            return False, (f"Upload would exceed your {max_user_storage // (1024 * 1024)}MB evidence storage "
+                           f"quota ({storage_used / 1024 / 1024:.1f}MB used)")
         
         # Sanitize filename
         if not filename or len(filename) == 0:
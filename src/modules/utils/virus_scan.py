@@ -0,0 +1,149 @@
+"""
+Streaming virus scanning against a clamd-compatible daemon
+
+A ScanSession speaks clamd's INSTREAM protocol: the command, then the file as
+length-prefixed chunks, then a zero-length chunk, after which clamd replies
+with one verdict line. Chunks handed to feed() go through a small bounded
+queue to a sender thread, so the upload is scanned while the caller is still
+hashing and writing it; only the final verdict is waited for.
+"""
+import os
+import queue
+import socket
+import struct
+import threading
+from collections import namedtuple
+
+try:
+    from config.config import Config
+    VIRUS_SCAN_ENABLED = Config.VIRUS_SCAN_ENABLED
+    CLAMAV_HOST = Config.CLAMAV_HOST
+    CLAMAV_PORT = Config.CLAMAV_PORT
+    CLAMAV_TIMEOUT_SECONDS = Config.CLAMAV_TIMEOUT_SECONDS
+except ImportError:
+    VIRUS_SCAN_ENABLED = os.getenv("VIRUS_SCAN_ENABLED", "false").lower() == "true"
+    CLAMAV_HOST = os.getenv("CLAMAV_HOST", "localhost")
+    CLAMAV_PORT = int(os.getenv("CLAMAV_PORT", "3310"))
+    CLAMAV_TIMEOUT_SECONDS = float(os.getenv("CLAMAV_TIMEOUT_SECONDS", "30"))
+
+VERDICT_CLEAN = 'clean'
+VERDICT_INFECTED = 'infected'
+
+# Chunks buffered between the caller and the sender thread
+SEND_QUEUE_CHUNKS = 8
+
+_END = object()
+
+# signature is the malware name for infected files, otherwise None
+ScanVerdict = namedtuple('ScanVerdict', ['status', 'signature'])
+
+
+class ScanError(Exception):
+    """The scan could not be completed (daemon unreachable, timeout or a daemon-side error)"""
+
+
+def parse_reply(reply):
+    """ScanVerdict for a clamd INSTREAM reply line; raises ScanError for error replies"""
+    text = reply.rstrip(b'\0\n').decode('utf-8', errors='replace')
+    _, _, result = text.partition(': ')
+    if result == 'OK':
+        return ScanVerdict(VERDICT_CLEAN, None)
+    if result.endswith(' FOUND'):
+        return ScanVerdict(VERDICT_INFECTED, result[:-len(' FOUND')])
+    raise ScanError(f"clamd: {text}")
+
+
+class ScanSession:
+    """One INSTREAM scan, fed chunk by chunk"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._queue = queue.Queue(maxsize=SEND_QUEUE_CHUNKS)
+        self._error = None
+        self._sender = threading.Thread(target=self._send, name='clamd-sender', daemon=True)
+        self._sender.start()
+
+    def _send(self):
+        try:
+            self.sock.sendall(b'zINSTREAM\0')
+            while True:
+                chunk = self._queue.get()
+                if chunk is _END:
+                    self.sock.sendall(struct.pack('!L', 0))
+                    return
+                self.sock.sendall(struct.pack('!L', len(chunk)) + chunk)
+        except OSError as e:
+            # clamd hangs up early on e.g. its size limit; its reply says why.
+            # Keep draining so feed() never blocks on a full queue.
+            self._error = e
+            while self._queue.get() is not _END:
+                pass
+
+    def feed(self, chunk):
+        if self._error is None:
+            self._queue.put(chunk)
+
+    def finish(self):
+        """Send the end marker and wait for the verdict"""
+        self._queue.put(_END)
+        self._sender.join()
+        try:
+            reply = b''
+            while not reply.endswith(b'\0'):
+                data = self.sock.recv(4096)
+                if not data:
+                    break
+                reply += data
+        except OSError as e:
+            raise ScanError(f"No verdict from clamd: {e}")
+        finally:
+            self.sock.close()
+        if not reply:
+            raise ScanError(f"clamd closed the connection without a verdict ({self._error})")
+        return parse_reply(reply)
+
+    def abort(self):
+        """Give up on the scan (the upload failed) and drop the connection"""
+        try:
+            # Wakes a sender blocked in sendall
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._queue.put(_END)
+        self._sender.join()
+        self.sock.close()
+
+
+class ClamdScanner:
+    """Opens INSTREAM sessions on a clamd TCP socket"""
+
+    def __init__(self, host=None, port=None, timeout=None):
+        self.host = host or CLAMAV_HOST
+        self.port = port or CLAMAV_PORT
+        self.timeout = timeout or CLAMAV_TIMEOUT_SECONDS
+
+    def session(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError as e:
+            raise ScanError(f"Cannot reach clamd at {self.host}:{self.port}: {e}")
+        return ScanSession(sock)
+
+    def scan(self, stream, chunk_size=64 * 1024):
+        """Scan a whole binary stream; returns its ScanVerdict"""
+        session = self.session()
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                session.feed(chunk)
+        except BaseException:
+            session.abort()
+            raise
+        return session.finish()
+
+
+def default_scanner():
+    """The configured scanner, or None when scanning is disabled"""
+    return ClamdScanner() if VIRUS_SCAN_ENABLED else None
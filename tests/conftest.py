@@ -0,0 +1,97 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.auth.auth_manager import AuthManager
+from modules.data.connection_pool import close_all_pools, get_pool
+from modules.data.database_manager import DatabaseManager
+from modules.data.evidence_manager import EvidenceManager
+from modules.data.evidence_search import EvidenceIndex
+from modules.data.evidence_store import EvidenceStore
+
+
+class Upload(io.BytesIO):
+    """The parts of Streamlit's UploadedFile the evidence manager uses"""
+
+    def __init__(self, name, data, type='text/plain'):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+        self.size = len(data)
+
+
+class FakeClock:
+    """Monotonic clock the test moves by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """Path of a fully migrated, empty database in the test's tmp_path"""
+    auth = AuthManager.__new__(AuthManager)
+    auth.db_path = str(tmp_path / 'governance.db')
+    auth._init_db()
+    yield auth.db_path
+    close_all_pools()
+
+
+@pytest.fixture
+def db(migrated_db):
+    """DatabaseManager over migrated_db with user 1 registered"""
+    with get_pool(migrated_db).connection() as conn:
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (1, 'a@example.com', 'x')")
+    return DatabaseManager(migrated_db)
+
+
+@pytest.fixture
+def evidence_dir(tmp_path, migrated_db):
+    """Temporary directory holding the evidence files; their database is migrated_db"""
+    return str(tmp_path)
+
+
+# The evidence fixtures below are configured through these three; a test
+# module overrides them, or a test parametrizes them by name
+
+@pytest.fixture
+def store_options():
+    """Keyword arguments for the EvidenceStore"""
+    return {'chunk_size': 1024}
+
+
+@pytest.fixture
+def manager_options():
+    """Keyword arguments for the EvidenceManager"""
+    return {}
+
+
+@pytest.fixture
+def index_workers():
+    """Worker count for a background EvidenceIndex, or None for a manager without one"""
+    return None
+
+
+@pytest.fixture
+def store(evidence_dir, migrated_db, store_options):
+    return EvidenceStore(os.path.join(evidence_dir, 'evidence'), migrated_db, **store_options)
+
+
+@pytest.fixture
+def manager(store, manager_options, index_workers):
+    index = EvidenceIndex(store, workers=index_workers) if index_workers else None
+    yield EvidenceManager(store, index=index, **manager_options)
+    if index is not None:
+        index.stop()
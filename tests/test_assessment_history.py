@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import calculate_maturity_score
+from modules.data.connection_pool import get_pool
+
+
+@pytest.fixture
+def db(db):
+    """The shared db with user 2, org 7 and 23 saved assessments"""
+    with get_pool(db.db_path).connection() as conn:
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (2, 'b@example.com', 'x')")
+        conn.execute("INSERT INTO organizations (id, name) VALUES (7, 'Acme')")
+
+    framework = get_assessment_framework()
+    submissions = []
+    for i in range(23):
+        responses = {'GOV_01': i % 6}
+        submissions.append({
+            'user_id': 1 + i % 2,
+            'org_id': 7 if i < 20 else 8,
+            'scores': calculate_maturity_score(responses, framework),
+            'responses': responses,
+            'assessment_name': f'A{i}',
+        })
+    db.save_full_assessments(submissions, framework)
+    with get_pool(db.db_path).connection() as conn:
+        conn.execute("UPDATE assessments SET created_at = '2024-01-0' || (1 + id % 3) || ' 10:00:00'")
+        conn.execute("UPDATE assessments SET status = 'draft' WHERE id % 5 = 0")
+    return db
+
+
+def test_keyset_pages_cover_everything_once(db):
+    seen = []
+    cursor = None
+    while True:
+        page = db.get_assessment_page(org_id=7, cursor=cursor, limit=6)
+        seen.extend(item.id for item in page.items)
+        assert page.summary.count == 20
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert sorted(seen) == list(range(1, 21))
+    assert len(seen) == len(set(seen))
+
+    keys = [(item.created_at, item.id) for item in db.get_assessment_page(org_id=7, limit=20).items]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_filters_and_summary(db):
+    page = db.get_assessment_page(org_id=7, status='draft', date_from=date(2024, 1, 2))
+    assert {item.status for item in page.items} == {'draft'}
+    assert all(item.created_at >= '2024-01-02' for item in page.items)
+    assert page.summary.count == len(page.items)
+
+    framework_id = get_assessment_framework().framework_id
+    assert db.get_assessment_page(org_id=7, framework=framework_id).summary.count == 20
+    assert db.get_assessment_page(org_id=7, framework='other').summary.count == 0
+
+    summary = db.get_assessment_page(organization_name='Acme', user_id=2).summary
+    assert summary.count == 10
+    assert summary.latest_at == '2024-01-03 10:00:00'
+
+
+def test_history_requires_scope(db):
+    assert db.get_assessment_history() == []
+    assert len(db.get_assessment_history(user_id=1)) == 12
+    assert len(db.get_assessment_history(organization_name='Acme')) == 20
+    with pytest.raises(ValueError):
+        db.get_assessment_page()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import calculate_maturity_score
+from modules.data import database_manager as database_module
+from modules.data.connection_pool import get_pool
+from modules.data.records import AssessmentRecord
+
+
+def _save(db, responses, org_id=None):
+    framework = get_assessment_framework()
+    scores = calculate_maturity_score(responses, framework)
+    return db.save_full_assessment(1, scores, responses, framework, 'Test', org_id=org_id)
+
+
+def test_load_assessment_returns_typed_record(db):
+    responses = {'GOV_01': 3, 'RISK_02': 5}
+    assessment_id = _save(db, responses, org_id=7)
+
+    record = db.load_assessment(assessment_id)
+    assert isinstance(record, AssessmentRecord)
+    assert record.org_id == 7 and record.status == 'submitted'
+    assert record.responses_by_question() == responses
+    assert [d.domain_id for d in record.domain_scores] == list(get_assessment_framework())
+    assert not hasattr(record, '__dict__')
+
+
+def test_org_isolation(db):
+    assessment_id = _save(db, {'GOV_01': 1}, org_id=7)
+    assert db.get_assessment_by_id_isolated(assessment_id, 7).id == assessment_id
+    assert db.get_assessment_by_id_isolated(assessment_id, 8) is None
+    assert db.get_assessment_by_id_isolated(assessment_id, None) is None
+
+
+def test_user_scoped_load(db):
+    with get_pool(db.db_path).connection() as conn:
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (7, 'b@example.com', 'x')")
+    assessment_id = _save(db, {'GOV_01': 2}, org_id=7)
+    assert db.load_assessment(assessment_id, user_id=1).id == assessment_id
+    # User 7 shares its id with the assessment's org, but does not own it
+    assert db.load_assessment(assessment_id, user_id=7) is None
+    with pytest.raises(TypeError):
+        db.load_assessment(assessment_id, 7)
+
+
+def test_batch_load_spans_chunks(db, monkeypatch):
+    monkeypatch.setattr(database_module, 'LOAD_CHUNK_SIZE', 2)
+    ids = [_save(db, {'GOV_01': i % 6}) for i in range(5)]
+    records = db.load_assessments(ids + [999])
+    assert sorted(records) == sorted(ids)
+    assert all(records[i].responses[0].response_score == n % 6 for n, i in enumerate(ids))
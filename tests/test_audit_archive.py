@@ -0,0 +1,163 @@
+import os
+import sys
+import gzip
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.connection_pool import close_all_pools
+from modules.data.migrations import migrate
+from modules.utils.audit_archive import ArchiveCorruptedError, AuditArchive
+from modules.utils.audit_writer import close_all_writers
+
+NOW = datetime(2026, 6, 15, 12, 0, 0)
+
+
+@pytest.fixture
+def tmp_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    close_all_writers()
+    close_all_pools()
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def archive(tmp_dir):
+    db_path = os.path.join(tmp_dir, 'audit.db')
+    migrate(db_path)
+    return AuditArchive(db_path, os.path.join(tmp_dir, 'archive'), hot_days=90, retention_days=365, batch_size=7)
+
+
+def insert(archive, timestamps, action='login'):
+    conn = sqlite3.connect(archive.db_path)
+    conn.executemany("INSERT INTO audit_logs (action, timestamp, ip_address) VALUES (?, ?, ?)",
+                     [(action, ts, f'10.0.0.{i % 2}') for i, ts in enumerate(timestamps)])
+    conn.commit()
+    conn.close()
+
+
+def hot_timestamps(archive):
+    conn = sqlite3.connect(archive.db_path)
+    rows = [row[0] for row in conn.execute("SELECT timestamp FROM audit_logs ORDER BY id")]
+    conn.close()
+    return rows
+
+
+def test_closed_months_move_to_checksummed_partitions(archive):
+    old = [f'2026-01-{day:02d} 10:00:00' for day in range(1, 21)]
+    old += [f'2026-02-{day:02d} 10:00:00' for day in range(1, 11)]
+    recent = ['2026-03-20 10:00:00', '2026-06-01 10:00:00']
+    insert(archive, old + recent)
+
+    # 90 days before 15 June is 17 March, so March is still hot
+    assert archive.cutoff(NOW) == datetime(2026, 3, 1)
+    assert archive.archive(NOW)[0] == 30
+    assert hot_timestamps(archive) == recent
+    assert archive.partitions() == ['2026-01', '2026-02']
+
+    segments = archive.segments()
+    assert sum(segment.rows for segment in segments) == 30
+    with gzip.open(os.path.join(archive.archive_dir, segments[0].file), 'rt') as f:
+        first = json.loads(f.readline())
+    assert first['timestamp'] == '2026-01-01 10:00:00' and first['action'] == 'login'
+    assert archive.verify() == []
+
+    # Nothing left to do on a second run
+    assert archive.archive(NOW) == (0, 0)
+
+
+def test_late_rows_append_a_segment(archive):
+    insert(archive, ['2026-01-05 10:00:00'])
+    archive.archive(NOW)
+    first_segment = archive.segments()[0]
+
+    insert(archive, ['2026-01-06 10:00:00'])
+    archive.archive(NOW)
+    segments = archive.segments()
+    assert len(segments) == 2 and segments[0] == first_segment
+
+
+def test_query_across_archives(archive):
+    insert(archive, [f'2026-01-{day:02d} 10:00:00' for day in range(1, 29)], action='login')
+    insert(archive, [f'2026-02-{day:02d} 10:00:00' for day in range(1, 29)], action='data_export')
+    archive.archive(NOW)
+
+    exports = list(archive.iter_events(action='data_export', ip_address='10.0.0.1'))
+    assert len(exports) == 14 and all(event.action == 'data_export' for event in exports)
+
+    window = list(archive.iter_events(since='2026-01-27 00:00:00', until=datetime(2026, 2, 2)))
+    assert [event.timestamp[:10] for event in window] == ['2026-01-27', '2026-01-28', '2026-02-01']
+
+    with pytest.raises(TypeError):
+        list(archive.iter_events(colour='red'))
+
+
+def test_tampered_segment_is_detected(archive):
+    insert(archive, ['2026-01-05 10:00:00'])
+    archive.archive(NOW)
+    path = os.path.join(archive.archive_dir, archive.segments()[0].file)
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)[0]
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last ^ 0xFF]))
+
+    assert archive.verify() == [archive.segments()[0].file]
+    with pytest.raises(ArchiveCorruptedError):
+        list(archive.iter_events())
+
+
+def test_retention_drops_whole_partitions(archive):
+    insert(archive, ['2025-05-31 23:59:59', '2025-06-01 00:00:00', '2026-01-05 10:00:00'])
+    result = archive.run(NOW)
+
+    # June 2025 ends after 15 June 2025, so it is kept until next month
+    assert result.archived_rows == 3 and result.dropped_partitions == ['2025-05']
+    assert archive.partitions() == ['2025-06', '2026-01']
+    assert not os.path.exists(os.path.join(archive.archive_dir, '2025-05'))
+    assert archive.enforce_retention(datetime(2026, 7, 1)) == ['2025-06']
+
+
+def test_interrupted_delete_is_finished_next_run(archive, monkeypatch):
+    insert(archive, ['2026-01-05 10:00:00', '2026-01-06 10:00:00'])
+
+    def crash(manifest):
+        if manifest.get('pending_delete'):
+            raise RuntimeError('power cut')
+
+    monkeypatch.setattr(archive, '_finish_pending_delete', crash)
+    with pytest.raises(RuntimeError):
+        archive.archive(NOW)
+    assert len(hot_timestamps(archive)) == 2
+    monkeypatch.undo()
+
+    assert archive.archive(NOW) == (0, 0)
+    assert hot_timestamps(archive) == []
+    assert sum(segment.rows for segment in archive.segments()) == 2
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='flock is POSIX only')
+def test_runs_wait_for_the_manifest_lock_held_by_another_process(archive):
+    import fcntl
+
+    insert(archive, ['2026-01-05 10:00:00', '2026-01-06 10:00:00'])
+    os.makedirs(archive.archive_dir)
+    # A separate open file description conflicts just like another process would
+    with open(archive.lock_path, 'a') as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX)
+        runner = threading.Thread(target=archive.archive, args=(NOW,))
+        runner.start()
+        runner.join(timeout=0.3)
+        assert runner.is_alive() and len(hot_timestamps(archive)) == 2
+        fcntl.flock(other.fileno(), fcntl.LOCK_UN)
+    runner.join(timeout=5)
+    assert not runner.is_alive() and hot_timestamps(archive) == []
+    assert sum(segment.rows for segment in archive.segments()) == 2
@@ -0,0 +1,119 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.connection_pool import close_all_pools
+from modules.data.migrations import migrate
+from modules.utils.audit_logger import AuditLogger, _audit_filters, AUDIT_SELECT
+from modules.utils.audit_writer import close_all_writers
+
+
+@pytest.fixture
+def db_path(monkeypatch):
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'audit.db')
+    migrate(path)
+    monkeypatch.setattr(AuditLogger, 'DB_PATH', path)
+    yield path
+    close_all_writers()
+    close_all_pools()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def seed(db_path, count=250):
+    """Events one second apart, several sharing each timestamp"""
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO audit_logs (action, resource_type, resource_id, timestamp, ip_address, org_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(f'action_{i % 3}', 'assessment', str(i % 10), f'2026-01-01 00:{i // 3 // 60:02d}:{i // 3 % 60:02d}',
+          f'10.0.0.{i % 4}', i % 2) for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_keyset_pages_cover_every_row_once(db_path):
+    seed(db_path)
+    seen, cursor = [], None
+    while True:
+        page = AuditLogger.query_audit_trail(cursor=cursor, limit=40)
+        seen.extend(page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    assert len(seen) == 250 and len({item.id for item in seen}) == 250
+    keys = [(item.timestamp, item.id) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_filters_are_parameterised_and_combined(db_path):
+    seed(db_path)
+    page = AuditLogger.query_audit_trail(action='action_1', org_id=1, limit=1000)
+    assert page.items and all(item.action == 'action_1' and item.org_id == 1 for item in page.items)
+
+    page = AuditLogger.query_audit_trail(resource_type='assessment', resource_id='7', ip_address='10.0.0.3')
+    assert page.items and all(item.resource_id == '7' and item.ip_address == '10.0.0.3' for item in page.items)
+
+    page = AuditLogger.query_audit_trail(since='2026-01-01 00:00:10', until=datetime(2026, 1, 1, 0, 0, 20))
+    assert len(page.items) == 30
+    assert all('2026-01-01 00:00:10' <= item.timestamp < '2026-01-01 00:00:20' for item in page.items)
+
+    # A filter value is data, never SQL
+    assert AuditLogger.query_audit_trail(action="x' OR '1'='1").items == ()
+
+
+def test_aware_datetimes_are_compared_in_utc(db_path):
+    seed(db_path)
+    plus_two = timezone(timedelta(hours=2))
+    page = AuditLogger.query_audit_trail(since=datetime(2026, 1, 1, 2, 0, 10, tzinfo=plus_two),
+                                         until=datetime(2026, 1, 1, 2, 0, 11, tzinfo=plus_two))
+    assert {item.timestamp for item in page.items} == {'2026-01-01 00:00:10'}
+
+
+def test_iterator_streams_in_pages(db_path, monkeypatch):
+    seed(db_path)
+    reads = []
+    original = AuditLogger._read_page
+    monkeypatch.setattr(AuditLogger, '_read_page', staticmethod(
+        lambda *args: reads.append(1) or original(*args)))
+
+    stream = AuditLogger.iter_audit_trail(batch_size=50, action='action_0')
+    first = next(stream)
+    assert first.action == 'action_0' and len(reads) == 1
+    assert 1 + sum(1 for _ in stream) == 84
+    assert len(reads) == 2
+
+
+def test_writer_fills_org_from_user_and_trail_uses_days(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO organizations (id, name) VALUES (5, 'Acme')")
+    conn.execute("INSERT INTO users (id, email, password_hash, org_id) VALUES (9, 'a@b.c', 'x', 5)")
+    conn.execute("INSERT INTO audit_logs (user_id, action, timestamp) VALUES (9, 'ancient', '2000-01-01 00:00:00')")
+    conn.commit()
+    conn.close()
+
+    AuditLogger.log_data_export(9, 'json', 1, True)
+    trail = AuditLogger.get_audit_trail(user_id=9, days=30)
+    assert [(entry.action, entry.org_id) for entry in trail] == [('data_export', 5)]
+    assert AuditLogger.query_audit_trail(org_id=5).items[0].action == 'data_export'
+
+
+def test_every_filter_has_an_index(db_path):
+    conn = sqlite3.connect(db_path)
+    for filters in ({}, {'user_id': 1}, {'org_id': 1}, {'action': 'a'}, {'ip_address': 'ip'},
+                    {'resource_type': 'assessment', 'resource_id': '1'}):
+        conditions, params = _audit_filters(**filters)
+        conditions.append("(timestamp, id) < (?, ?)")
+        query = f"{AUDIT_SELECT} WHERE {' AND '.join(conditions)} ORDER BY timestamp DESC, id DESC LIMIT 10"
+        plan = ' '.join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params + ['x', 1]))
+        assert 'USING INDEX' in plan and 'TEMP B-TREE' not in plan, plan
+    conn.close()
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.connection_pool import close_all_pools
+from modules.data.migrations import migrate
+from modules.utils.audit_logger import AuditLogger
+from modules.utils.audit_writer import AuditWriter, audit_timestamp, close_all_writers
+
+
+@pytest.fixture
+def db_path():
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'audit.db')
+    migrate(path)
+    yield path
+    close_all_writers()
+    close_all_pools()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def row(action, user_id=None):
+    return (user_id, action, 'test', None, audit_timestamp(), None, None, None, None)
+
+
+def count_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    count = conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_events_written_in_batches(db_path):
+    writer = AuditWriter(db_path, batch_size=100, flush_interval_ms=1000)
+    for i in range(250):
+        writer.submit(row(f'event_{i}'))
+    assert writer.flush()
+
+    assert count_rows(db_path) == 250
+    stats = writer.stats()
+    assert stats['written'] == stats['enqueued'] == 250
+    assert 3 <= stats['batches'] < 250 and stats['largest_batch'] == 100
+    assert stats['dropped'] == 0 and stats['queue_depth'] == 0
+    writer.close()
+
+
+def test_interval_flush_without_explicit_flush(db_path):
+    writer = AuditWriter(db_path, batch_size=100, flush_interval_ms=20)
+    writer.submit(row('login'))
+    deadline = time.monotonic() + 2
+    while count_rows(db_path) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert count_rows(db_path) == 1
+    writer.close()
+
+
+def test_full_queue_applies_back_pressure_then_writes_inline(db_path):
+    writer = AuditWriter(db_path, max_queue=2, enqueue_timeout_ms=10)
+    # A writer thread that never runs, so nothing drains the queue
+    writer._thread = threading.Thread()
+    for i in range(3):
+        writer.submit(row(f'event_{i}'))
+
+    stats = writer.stats()
+    assert stats['delayed'] == 1 and stats['written_inline'] == 1
+    assert stats['queue_depth'] == 2
+    assert count_rows(db_path) == 1
+
+
+def test_flush_and_close_respect_their_timeout_on_a_full_queue(db_path):
+    writer = AuditWriter(db_path, max_queue=2, enqueue_timeout_ms=10)
+    # A live writer thread that is stuck and never drains the queue
+    stuck = threading.Event()
+    writer._thread = threading.Thread(target=stuck.wait, daemon=True)
+    writer._thread.start()
+    try:
+        writer.submit(row('event_0'))
+        writer.submit(row('event_1'))
+
+        started = time.monotonic()
+        assert writer.flush(timeout=0.2) is False
+        writer.close(timeout=0.2)
+        assert time.monotonic() - started < 2
+        # close() wrote the queued events itself instead of waiting on the thread
+        assert count_rows(db_path) == 2
+        assert writer.stats()['written_inline'] == 2
+    finally:
+        stuck.set()
+
+
+def test_bad_row_does_not_sink_batch(db_path):
+    writer = AuditWriter(db_path, batch_size=10, flush_interval_ms=1000)
+    writer.submit(row('ok_1'))
+    writer.submit(row('bad', user_id=999))  # violates the users foreign key
+    writer.submit(row('ok_2'))
+    writer.flush()
+
+    assert count_rows(db_path) == 2
+    assert writer.stats()['dropped'] == 1
+    writer.close()
+
+
+def test_close_flushes_pending_and_later_events_are_inline(db_path):
+    writer = AuditWriter(db_path, batch_size=1000, flush_interval_ms=60000)
+    for i in range(5):
+        writer.submit(row(f'event_{i}'))
+    writer.close()
+    assert count_rows(db_path) == 5
+
+    writer.submit(row('after_close'))
+    assert count_rows(db_path) == 6
+    assert writer.stats()['written_inline'] == 1
+
+
+def test_audit_trail_reads_its_own_writes(db_path, monkeypatch):
+    monkeypatch.setattr(AuditLogger, 'DB_PATH', db_path)
+    AuditLogger.log_security_event('unit_test', 'info', {'k': 'v'})
+    trail = AuditLogger.get_audit_trail()
+    assert [entry[2] for entry in trail] == ['security_unit_test']
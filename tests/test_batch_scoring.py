@@ -0,0 +1,78 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import (
+    calculate_maturity_score,
+    calculate_maturity_scores_batch,
+    score_batch,
+    MATURITY_LEVELS,
+)
+
+
+def _random_responses(framework, rng, count):
+    question_ids = list(framework.question_ids)
+    responses_list = []
+    for _ in range(count):
+        answered = rng.sample(question_ids, rng.randint(0, len(question_ids)))
+        responses = {q_id: rng.randint(0, 5) for q_id in answered}
+        if rng.random() < 0.2:
+            responses[rng.choice(question_ids)] = None
+        if rng.random() < 0.1:
+            responses['UNKNOWN_Q'] = 3
+        responses_list.append(responses)
+    return responses_list
+
+
+def test_batch_matches_per_assessment_scoring():
+    framework = get_assessment_framework()
+    responses_list = _random_responses(framework, random.Random(42), 500)
+    expected = [calculate_maturity_score(responses, framework) for responses in responses_list]
+    assert calculate_maturity_scores_batch(responses_list, framework) == expected
+
+
+def test_batch_matches_with_float_scores():
+    framework = get_assessment_framework()
+    responses_list = [
+        {'GOV_01': 2.5, 'GOV_02': 0.1, 'RISK_01': 4},
+        {'GOV_01': 3, 'LIFE_02': 1},
+        {},
+    ]
+    expected = [calculate_maturity_score(responses, framework) for responses in responses_list]
+    assert calculate_maturity_scores_batch(responses_list, framework) == expected
+
+
+def test_batch_matches_with_many_fractional_scores():
+    # Long runs of fractional scores are where the summation order shows
+    framework = get_assessment_framework()
+    rng = random.Random(7)
+    responses_list = [{q_id: rng.random() * 5 for q_id in framework.question_ids} for _ in range(3)]
+    for batch in (responses_list, responses_list[:1]):
+        expected = [calculate_maturity_score(responses, framework) for responses in batch]
+        assert calculate_maturity_scores_batch(batch, framework) == expected
+
+
+def test_batch_handles_domains_without_questions():
+    framework = {
+        'EMPTY_A': {'name': 'Empty A', 'questions': []},
+        'GOV': {'name': 'Governance', 'questions': [{'id': 'GOV_01'}, {'id': 'GOV_02'}]},
+        'EMPTY_B': {'name': 'Empty B', 'questions': []},
+    }
+    responses_list = [{'GOV_01': 3}, {'GOV_01': 1, 'GOV_02': 4}, {}]
+    expected = [calculate_maturity_score(responses, framework) for responses in responses_list]
+    assert calculate_maturity_scores_batch(responses_list, framework) == expected
+
+
+def test_batch_arrays_shape_and_levels():
+    framework = get_assessment_framework()
+    batch = score_batch([{'GOV_01': 5}, {q_id: 5 for q_id in framework.question_ids}], framework)
+    assert batch.domain_raw.shape == (2, len(framework))
+    assert MATURITY_LEVELS[batch.overall_levels[1]] == 'Optimized'
+    assert batch.overall_percentage[1] == 100.0
+
+
+def test_empty_batch():
+    assert calculate_maturity_scores_batch([], get_assessment_framework()) == []
@@ -0,0 +1,103 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.connection_pool import ConnectionPool, PoolExhaustedError, get_pool
+import modules.data.connection_pool as connection_pool
+
+
+@pytest.fixture
+def db_path():
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'pool.db')
+    yield path
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
+    os.rmdir(tmp_dir)
+
+
+def test_connections_configured_once_and_reused(db_path):
+    pool = ConnectionPool(db_path, max_connections=2)
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        first = conn
+    with pool.connection() as conn:
+        assert conn is first
+    assert pool.stats()['open'] == 1
+    pool.close()
+
+
+def test_nested_blocks_share_one_transaction(db_path):
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as outer:
+            outer.execute("INSERT INTO items VALUES ('a')")
+            with pool.connection() as inner:
+                assert inner is outer
+                inner.execute("INSERT INTO items VALUES ('b')")
+            raise RuntimeError("abort")
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    pool.close()
+
+
+def test_concurrent_writers_share_bounded_pool(db_path):
+    pool = ConnectionPool(db_path, max_connections=3)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE hits (thread INTEGER)")
+
+    def worker(n):
+        for _ in range(50):
+            with pool.connection() as conn:
+                conn.execute("INSERT INTO hits VALUES (?)", (n,))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM hits").fetchone()[0] == 400
+    assert pool.stats()['open'] <= 3
+    pool.close()
+
+
+def test_exhausted_pool_raises(db_path, monkeypatch):
+    monkeypatch.setattr(connection_pool, 'CHECKOUT_TIMEOUT_SECONDS', 0.05)
+    pool = ConnectionPool(db_path, max_connections=1)
+    held = threading.Event()
+    done = threading.Event()
+
+    def holder():
+        with pool.connection():
+            held.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait(5)
+    with pytest.raises(PoolExhaustedError):
+        with pool.connection():
+            pass
+    done.set()
+    thread.join()
+    pool.close()
+
+
+def test_get_pool_is_shared_per_path(db_path):
+    assert get_pool(db_path) is get_pool(os.path.join(os.path.dirname(db_path), '.', 'pool.db'))
+    get_pool(db_path).close()
@@ -0,0 +1,157 @@
+import io
+import os
+import sys
+import time
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.evidence_gc import EvidenceSweeper
+from modules.data.evidence_manager import EvidenceScope
+from modules.data.text_extraction import extract_text
+
+HOURS_LATER = datetime.utcnow() + timedelta(hours=2)
+
+
+def sweeper(manager, **kwargs):
+    return EvidenceSweeper(manager.store, cold_after_days=90, draft_retention_days=30, batch_size=2, **kwargs)
+
+
+def attach(manager, data, question_id='GOV_01', key='attempt-1'):
+    blob = manager.store.put(io.BytesIO(data))
+    return manager.add_evidence(EvidenceScope(1, 7, None, key), question_id, 'file.txt', 'text/plain', blob)
+
+
+def blob_row(manager, sha256):
+    with sqlite3.connect(manager.db_path) as conn:
+        return conn.execute("SELECT refcount, tier, stored_size FROM evidence_blobs WHERE sha256 = ?",
+                            (sha256,)).fetchone()
+
+
+def age(path, hours=3):
+    old = time.time() - hours * 3600
+    os.utime(path, (old, old))
+
+
+def test_unreferenced_blobs_are_deleted_in_batches(manager):
+    kept = attach(manager, b'referenced')
+    orphans = [manager.store.put(io.BytesIO(f'orphan {i}'.encode())) for i in range(5)]
+
+    # Too recent: may belong to an upload still in flight
+    assert sweeper(manager).sweep_orphan_blobs() == (0, 0)
+
+    assert sweeper(manager).sweep_orphan_blobs(HOURS_LATER) == (5, sum(blob.size for blob in orphans))
+    assert all(blob_row(manager, blob.sha256) is None for blob in orphans)
+    assert not any(os.path.exists(blob.path) for blob in orphans)
+    assert blob_row(manager, kept.sha256)[0] == 1
+    assert manager.store.open(kept.sha256).read() == b'referenced'
+
+
+def test_stray_files_and_abandoned_uploads(manager):
+    store = manager.store
+    kept = attach(manager, b'kept')
+    stray = store.path_for('ab' * 32)
+    os.makedirs(os.path.dirname(stray))
+    with open(stray, 'wb') as f:
+        f.write(b'x' * 100)
+    part = os.path.join(store.tmp_dir, 'dead.part')
+    with open(part, 'wb') as f:
+        f.write(b'y' * 10)
+    # A hot copy left next to the cold file the row points at
+    cold = attach(manager, b'c' * 5000)
+    store.compress(cold.sha256)
+    with open(store.path_for(cold.sha256), 'wb') as f:
+        f.write(b'c' * 5000)
+    fresh = store.path_for('cd' * 32)
+    os.makedirs(os.path.dirname(fresh))
+    open(fresh, 'wb').close()
+    for path in (stray, part, store.path_for(cold.sha256), store.path_for(kept.sha256)):
+        age(path)
+
+    assert sweeper(manager).sweep_stray_files() == (3, 5110)
+    assert not os.path.exists(stray) and not os.path.exists(part)
+    assert os.path.exists(fresh)
+    assert store.locate(cold.sha256) == store.cold_path_for(cold.sha256)
+    assert store.open(cold.sha256).read() == b'c' * 5000
+    assert store.open(kept.sha256).read() == b'kept'
+
+
+def test_uploads_finishing_mid_sweep_are_skipped(manager, monkeypatch):
+    store = manager.store
+    part = os.path.join(store.tmp_dir, 'old.part')
+    with open(part, 'wb') as f:
+        f.write(b'y' * 10)
+    age(part)
+    listdir = os.listdir
+
+    def listing_with_a_finished_upload(path):
+        # 'gone.part' was renamed into place by put() after being listed
+        names = listdir(path)
+        return ['gone.part'] + names if path == store.tmp_dir else names
+
+    monkeypatch.setattr(os, 'listdir', listing_with_a_finished_upload)
+    assert sweeper(manager).sweep_stray_files() == (1, 10)
+    assert not os.path.exists(part)
+
+
+def test_abandoned_drafts_expire_and_refund_quota(manager):
+    draft = attach(manager, b'd' * 2048)
+    shared = attach(manager, b's' * 1024, question_id='GOV_02')
+    submitted = attach(manager, b's' * 1024, key='attempt-2')
+    with sqlite3.connect(manager.db_path) as conn:
+        conn.execute("UPDATE evidence SET assessment_id = 42 WHERE id = ?", (submitted.id,))
+    assert manager.storage_used(1) == 4096
+
+    assert sweeper(manager).expire_drafts() == (0, 0)
+    later = datetime.utcnow() + timedelta(days=31)
+    # The draft's own blob is freed; the shared one lives on in the submitted assessment
+    assert sweeper(manager).expire_drafts(later) == (2, 2048)
+    assert manager.storage_used(1) == 1024
+    assert blob_row(manager, draft.sha256) is None and not os.path.exists(manager.store.path_for(draft.sha256))
+    assert blob_row(manager, shared.sha256)[0] == 1
+    assert [e.id for e in manager.get_question_evidence('GOV_01', scope=EvidenceScope(None, 7, 42, None))] == [submitted.id]
+
+
+def test_cold_tier_is_transparent_to_readers(manager):
+    store = manager.store
+    text = b'Model risk policy, section 4. ' * 400
+    cold = attach(manager, text)
+    noise = attach(manager, os.urandom(8000))
+    recent = attach(manager, b'recently read ' * 400)
+    with sqlite3.connect(manager.db_path) as conn:
+        conn.execute("UPDATE evidence_blobs SET last_accessed_at = datetime('now', '+10 days') WHERE sha256 = ?",
+                     (recent.sha256,))
+
+    assert sweeper(manager).compress_cold() == (0, 0)
+    later = datetime.utcnow() + timedelta(days=91)
+    compressed, saved = sweeper(manager).compress_cold(later)
+    stored_size = blob_row(manager, cold.sha256)[2]
+    assert (compressed, saved) == (1, len(text) - stored_size)
+    assert blob_row(manager, cold.sha256)[1:] == ('cold', stored_size)
+    assert blob_row(manager, noise.sha256)[1] == 'incompressible' and os.path.exists(store.path_for(noise.sha256))
+    assert blob_row(manager, recent.sha256)[1] == 'hot'
+    assert not os.path.exists(store.path_for(cold.sha256))
+
+    # Decompressed on read, in chunks, for extraction too
+    assert store.open(cold.sha256).read() == text
+    assert b''.join(store.iter_chunks(cold.sha256)) == text
+    assert extract_text(store.locate(cold.sha256), 'text/plain', 30).content == 'Model risk policy, section 4. '
+
+    # Re-uploading cold content stays deduplicated; the last release removes the cold file
+    again = store.put(io.BytesIO(text))
+    assert again.deduplicated and not os.path.exists(store.path_for(cold.sha256))
+    store.release(again.sha256)
+    assert manager.delete_evidence('GOV_01', cold.id, scope=EvidenceScope(1, 7, None, 'attempt-1'))
+    assert not os.path.exists(store.cold_path_for(cold.sha256))
+
+
+def test_run_reports_bytes_reclaimed(manager):
+    attach(manager, b'a' * 3000)
+    orphan = manager.store.put(io.BytesIO(b'o' * 500))
+    result = sweeper(manager).run(datetime.utcnow() + timedelta(days=91))
+    assert (result.expired_drafts, result.orphan_blobs, result.stray_files) == (1, 1, 0)
+    # The expired draft's blob is freed, the orphan deleted, nothing left to compress
+    assert result.compressed_blobs == 0 and result.bytes_reclaimed == 3000 + orphan.size
@@ -0,0 +1,140 @@
+import io
+import os
+import sys
+import sqlite3
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import calculate_maturity_score
+from modules.data.database_manager import DatabaseManager
+from modules.data.evidence_manager import EvidenceScope, StorageQuotaExceededError
+
+from conftest import Upload
+
+KB = 1024
+
+
+@pytest.fixture
+def store_options():
+    return {'chunk_size': KB, 'max_bytes': 64 * KB}
+
+
+@pytest.fixture
+def manager_options():
+    return {'storage_quota': 100 * KB}
+
+
+def draft(user_id=1, org_id=7, key='attempt-1'):
+    return EvidenceScope(user_id, org_id, None, key)
+
+
+def used(manager, user_id=1):
+    return manager.storage_used(user_id)
+
+
+def test_listing_and_summary_come_from_the_index(manager):
+    scope = draft()
+    manager.upload_evidence('GOV_01', Upload('policy.txt', b'p' * 3 * KB), 'Policy', scope=scope)
+    manager.upload_evidence('GOV_01', Upload('chart.png', b'c' * 2 * KB, 'image/png'), scope=scope)
+    manager.upload_evidence('RISK_01', Upload('register.txt', b'r' * KB), scope=scope)
+    manager.upload_evidence('GOV_01', Upload('other.txt', b'o' * KB), scope=draft(key='attempt-2'))
+
+    listed = manager.get_question_evidence('GOV_01', scope=scope)
+    assert [(e.file_name, e.file_size, e.org_id) for e in listed] == [('policy.txt', 3 * KB, 7), ('chart.png', 2 * KB, 7)]
+    assert listed[0].description == 'Policy'
+    assert sorted(manager.get_all_evidence(scope=scope)) == ['GOV_01', 'RISK_01']
+    assert manager.get_evidence_summary(scope=scope) == {
+        'total_files': 3,
+        'total_size': 6 * KB,
+        'by_question': {'GOV_01': 2, 'RISK_01': 1},
+        'file_types': {'text/plain': 2, 'image/png': 1},
+    }
+    # Another attempt by the same user is kept apart, but shares the quota
+    assert used(manager) == 7 * KB
+
+
+def test_saved_assessment_takes_over_its_draft_evidence(manager):
+    with sqlite3.connect(manager.db_path) as conn:
+        conn.execute("INSERT INTO users (id, email, password_hash, org_id) VALUES (1, 'a@example.com', 'x', 7)")
+    scope = draft()
+    manager.upload_evidence('GOV_01', Upload('policy.txt', b'policy'), scope=scope)
+
+    framework = get_assessment_framework()
+    responses = {'GOV_01': 3}
+    scores = calculate_maturity_score(responses, framework)
+    assessment_id = DatabaseManager(manager.db_path).save_full_assessment(
+        1, scores, responses, framework, 'Q1', submission_key='attempt-1', org_id=7)
+
+    by_assessment = EvidenceScope(None, 7, assessment_id, None)
+    assert [e.file_name for e in manager.get_question_evidence('GOV_01', scope=by_assessment)] == ['policy.txt']
+
+    # Added between a submit and its repeat: attached by the repeat, not left as a draft to expire
+    manager.upload_evidence('GOV_01', Upload('late.txt', b'late'), scope=scope)
+    assert DatabaseManager(manager.db_path).save_full_assessment(
+        1, scores, responses, framework, 'Q1', submission_key='attempt-1', org_id=7) == assessment_id
+    assert [e.file_name for e in manager.get_question_evidence('GOV_01', scope=by_assessment)] == [
+        'policy.txt', 'late.txt']
+    # The attempt's own scope still finds it after submission
+    assert manager.get_evidence_summary(scope=scope)['total_files'] == 2
+    assert manager.get_question_evidence('GOV_01', scope=EvidenceScope(None, 8, assessment_id, None)) == []
+
+
+def test_quota_is_enforced_and_refunded(manager):
+    scope = draft()
+    first = manager.upload_evidence('GOV_01', Upload('a.txt', b'a' * 60 * KB), scope=scope)
+    assert first is not None and used(manager) == 60 * KB
+
+    # Rejected before anything is stored
+    assert manager.upload_evidence('GOV_01', Upload('b.txt', b'b' * 50 * KB), scope=scope) is None
+    assert used(manager) == 60 * KB
+    assert manager.store.refcount(first.sha256) == 1
+    # Identical content is still charged to the uploader
+    assert manager.upload_evidence('GOV_02', Upload('a2.txt', b'a' * 60 * KB), scope=scope) is None
+
+    assert manager.delete_evidence('GOV_01', first.id, scope=scope)
+    assert used(manager) == 0
+    assert not os.path.exists(manager.store.path_for(first.sha256))
+    assert manager.get_evidence_summary(scope=scope)['total_files'] == 0
+    assert not manager.delete_evidence('GOV_01', first.id, scope=scope)
+
+    assert manager.upload_evidence('GOV_01', Upload('b.txt', b'b' * 50 * KB), scope=scope) is not None
+
+
+def test_concurrent_uploads_cannot_overshoot_the_quota(manager):
+    scope = draft()
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker(i):
+        blob = manager.store.put(io.BytesIO(bytes([i]) * 30 * KB))
+        barrier.wait()
+        try:
+            results.append(manager.add_evidence(scope, 'GOV_01', f'{i}.txt', 'text/plain', blob))
+        except StorageQuotaExceededError:
+            results.append(None)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = [record for record in results if record is not None]
+    assert len(results) == 8 and len(stored) == 3
+    assert used(manager) == 90 * KB == manager.get_evidence_summary(scope=scope)['total_size']
+    # Rejected uploads gave their blob reference back
+    with sqlite3.connect(manager.db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM evidence_blobs").fetchone()[0] == 3
+
+
+def test_scope_queries_use_the_index(manager):
+    conn = sqlite3.connect(manager.db_path)
+    plan = ' '.join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT question_id, file_type, COUNT(*), SUM(file_size) FROM evidence "
+        "WHERE org_id IS ? AND assessment_id = ? GROUP BY question_id, file_type", (7, 1)))
+    conn.close()
+    assert 'idx_evidence_scope' in plan
@@ -0,0 +1,152 @@
+import io
+import os
+import sys
+import time
+import sqlite3
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.data.evidence_manager import EvidenceScope
+from modules.data.evidence_search import fts_query
+from modules.data.text_extraction import (
+    DOCX_TYPE, PYPDF_AVAILABLE, STATUS_DONE, STATUS_UNSUPPORTED, extract_text,
+)
+
+from conftest import Upload
+
+WORD = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def docx_bytes(*paragraphs):
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    # Fixed timestamps, so the same paragraphs always give the same bytes
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(zipfile.ZipInfo('[Content_Types].xml'), '<Types/>')
+        archive.writestr(zipfile.ZipInfo('word/document.xml'),
+                         f'<w:document xmlns:w="{WORD}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+
+PNG = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR'
+
+
+@pytest.fixture
+def index_workers():
+    return 2
+
+
+def attach(manager, question_id, file_name, data, file_type='text/plain', description='', org_id=7, key='a1',
+           user_id=1):
+    blob = manager.store.put(io.BytesIO(data))
+    return manager.add_evidence(EvidenceScope(user_id, org_id, None, key), question_id, file_name, file_type,
+                                blob, description)
+
+
+def names(hits):
+    return [hit.evidence.file_name for hit in hits]
+
+
+def test_extractors(tmp_path):
+    text = tmp_path / 'notes.txt'
+    text.write_bytes('Model cards reviewed quarterly — ✓'.encode('utf-8'))
+    assert extract_text(str(text), 'text/plain', 1000) == (STATUS_DONE, 'Model cards reviewed quarterly — ✓', None)
+    assert extract_text(str(text), 'text/plain', 11).content == 'Model cards'
+
+    docx = tmp_path / 'policy.docx'
+    docx.write_bytes(docx_bytes('AI Use Policy', 'Approved by the board'))
+    assert extract_text(str(docx), DOCX_TYPE, 1000).content == 'AI Use Policy\nApproved by the board\n'
+
+    image = tmp_path / 'chart.png'
+    image.write_bytes(PNG)
+    assert extract_text(str(image), 'image/png', 1000).status == STATUS_UNSUPPORTED
+    assert extract_text(str(image), 'text/plain', 1000).status == STATUS_UNSUPPORTED
+    assert extract_text(str(image), DOCX_TYPE, 1000).status == 'failed'
+    if not PYPDF_AVAILABLE:
+        assert extract_text(str(image), 'application/pdf', 1000).status == STATUS_UNSUPPORTED
+
+
+def test_fts_query_never_passes_syntax_through():
+    assert fts_query('bias "audit" OR') == '"bias" "audit" "OR"*'
+    assert fts_query(' -*() ') is None
+
+
+def test_content_is_searchable_once_extracted(manager):
+    policy = attach(manager, 'GOV_01', 'policy.docx', docx_bytes('Fairness testing of every model'), DOCX_TYPE)
+    copy = attach(manager, 'GOV_02', 'policy-copy.docx', docx_bytes('Fairness testing of every model'), DOCX_TYPE)
+    attach(manager, 'RISK_01', 'fairness.txt', b'Risk register', description='quarterly fairness review')
+
+    # Name and description are indexed with the upload, the body only after extraction
+    assert names(manager.index.search('fairness', 7)) == ['fairness.txt']
+    assert manager.index.pending_count() == 2
+    assert manager.index.index_pending() == 2
+    assert manager.index.pending_count() == 0
+
+    with sqlite3.connect(manager.db_path) as conn:
+        # Identical files share one extraction
+        assert conn.execute("SELECT COUNT(*) FROM evidence_text WHERE sha256 = ?", (policy.sha256,)).fetchone()[0] == 1
+    # A match in the file name outranks one in the body
+    hits = manager.index.search('fairness', 7)
+    assert names(hits)[0] == 'fairness.txt' and hits[0].rank < hits[1].rank
+    assert sorted(names(hits)[1:]) == ['policy-copy.docx', 'policy.docx']
+    # Every word must match, the last as a prefix
+    hits = manager.index.search('fairness test', 7)
+    assert sorted(names(hits)) == ['policy-copy.docx', 'policy.docx']
+    assert '**Fairness**' in hits[0].snippet and '**testing**' in hits[0].snippet
+
+    assert names(manager.index.search('fairness', 7, question_id='GOV_02')) == ['policy-copy.docx']
+    framework = get_assessment_framework()
+    governance = manager.index.search('fairness', 7, domain_id='governance_strategy', framework=framework)
+    assert sorted(names(governance)) == ['policy-copy.docx', 'policy.docx']
+    assert manager.index.search('fairness', 8) == []
+
+    # A later upload of already-extracted content is searchable at once
+    attach(manager, 'LIFE_01', 'again.docx', docx_bytes('Fairness testing of every model'), DOCX_TYPE)
+    assert manager.index.pending_count() == 0
+    assert 'again.docx' in names(manager.index.search('testing', 7))
+
+    scope = EvidenceScope(1, 7, None, 'a1')
+    assert manager.delete_evidence('GOV_02', copy.id, scope=scope)
+    assert 'policy-copy.docx' not in names(manager.index.search('testing', 7))
+
+
+def test_users_without_an_org_only_find_their_own_evidence(manager):
+    alice = attach(manager, 'GOV_01', 'alice_policy.txt', b'Alice model inventory', org_id=None, key='a1')
+    attach(manager, 'GOV_01', 'bob_policy.txt', b'Bob model inventory', org_id=None, key='b1', user_id=2)
+    manager.index.index_pending()
+
+    alice_scope = EvidenceScope(1, None, None, 'a1')
+    bob_scope = EvidenceScope(2, None, None, 'b1')
+    assert names(manager.search_evidence('alice', scope=bob_scope)) == []
+    assert names(manager.search_evidence('inventory', scope=bob_scope)) == ['bob_policy.txt']
+    assert names(manager.search_evidence('inventory', scope=alice_scope)) == ['alice_policy.txt']
+    assert manager.index.search('inventory', None) == []
+
+    # Once attached to a submitted assessment, rows are still only the owner's
+    with sqlite3.connect(manager.db_path) as conn:
+        conn.execute("UPDATE evidence SET assessment_id = 41 WHERE id = ?", (alice.id,))
+    assert [e.id for e in manager.get_question_evidence('GOV_01', scope=EvidenceScope(1, None, 41, None))] == [alice.id]
+    assert manager.get_question_evidence('GOV_01', scope=EvidenceScope(2, None, 41, None)) == []
+    assert names(manager.search_evidence('alice', scope=EvidenceScope(2, None, 41, None))) == []
+
+
+def test_upload_returns_before_background_extraction(manager):
+    scope = EvidenceScope(1, 7, None, 'a1')
+    record = manager.upload_evidence('GOV_01', Upload('minutes.txt', b'Ethics board minutes'), scope=scope)
+    assert record is not None
+
+    deadline = time.monotonic() + 60
+    while manager.index.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert names(manager.index.search('ethics', 7)) == ['minutes.txt']
+
+    attach(manager, 'GOV_01', 'chart.png', PNG, 'image/png')
+    manager.index.index_pending()
+    documents = manager.get_evidence_documents(scope=scope)
+    assert [(d.file_name, d.content) for d in documents] == [('minutes.txt', 'Ethics board minutes'), ('chart.png', '')]
+    assert documents[0].analysis == '3 words extracted'
+    assert documents[1].analysis.startswith('No text extracted')
@@ -0,0 +1,125 @@
+import io
+import os
+import sys
+import sqlite3
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.connection_pool import connection
+from modules.data.evidence_store import EvidenceTooLargeError
+
+
+class RecordingStream(io.BytesIO):
+    """BytesIO that remembers the size of every read"""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+@pytest.fixture
+def store_options():
+    return {'chunk_size': 1024, 'max_bytes': 64 * 1024}
+
+
+def blob_files(store):
+    return [os.path.join(dirpath, name) for dirpath, _, names in os.walk(store.root)
+            for name in names if os.path.basename(dirpath) != 'tmp']
+
+
+@pytest.mark.parametrize('store_options', [{'chunk_size': 1024}, {'chunk_size': 4096}])
+def test_streams_in_chunks_into_sharded_path(store, store_options):
+    data = os.urandom(10 * 1024 + 17)
+    stream = RecordingStream(data)
+    blob = store.put(stream)
+
+    assert set(stream.reads) == {store_options['chunk_size']}
+    assert blob.size == len(data) and not blob.deduplicated and blob.refcount == 1
+    relative = os.path.relpath(blob.path, store.root).split(os.sep)
+    assert relative == [blob.sha256[:2], blob.sha256[2:4], blob.sha256]
+    assert b''.join(store.iter_chunks(blob.sha256)) == data
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_identical_content_is_stored_once(store):
+    first = store.put(io.BytesIO(b'policy v1' * 1000))
+    second = store.put(io.BytesIO(b'policy v1' * 1000))
+    other = store.put(io.BytesIO(b'policy v2' * 1000))
+
+    assert second.deduplicated and second.path == first.path and second.refcount == 2
+    assert other.sha256 != first.sha256
+    assert len(blob_files(store)) == 2
+    assert os.listdir(store.tmp_dir) == []
+
+
+def test_last_release_deletes_blob(store):
+    blob = store.put(io.BytesIO(b'evidence'))
+    store.put(io.BytesIO(b'evidence'))
+
+    assert store.release(blob.sha256) == 1 and os.path.exists(blob.path)
+    assert store.release(blob.sha256) == 0 and not os.path.exists(blob.path)
+    assert store.refcount(blob.sha256) == 0
+    # Releasing an unknown blob is a no-op
+    assert store.release(blob.sha256) == 0
+
+    # Content comes back as a fresh blob
+    again = store.put(io.BytesIO(b'evidence'))
+    assert not again.deduplicated and again.refcount == 1 and os.path.exists(again.path)
+
+
+def test_release_rolled_back_keeps_the_file(store):
+    blob = store.put(io.BytesIO(b'kept'))
+    with pytest.raises(RuntimeError), connection(store.db_path):
+        assert store.release(blob.sha256) == 0
+        # Deleting the file waits for the commit
+        assert os.path.exists(blob.path)
+        raise RuntimeError('caller failed after releasing')
+    assert store.refcount(blob.sha256) == 1
+    assert store.open(blob.sha256).read() == b'kept'
+
+    with connection(store.db_path):
+        store.release(blob.sha256)
+        assert os.path.exists(blob.path)
+    assert not os.path.exists(blob.path)
+
+
+def test_oversized_upload_leaves_nothing_behind(store):
+    with pytest.raises(EvidenceTooLargeError):
+        store.put(io.BytesIO(b'x' * (64 * 1024 + 1)))
+    assert blob_files(store) == [] and os.listdir(store.tmp_dir) == []
+    count = sqlite3.connect(store.db_path).execute("SELECT COUNT(*) FROM evidence_blobs").fetchone()[0]
+    assert count == 0
+
+
+def test_concurrent_uploads_and_releases_keep_counts_exact(store):
+    data = b'shared policy' * 500
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def worker():
+        try:
+            barrier.wait()
+            for _ in range(10):
+                blob = store.put(io.BytesIO(data))
+                store.release(blob.sha256)
+            store.put(io.BytesIO(data))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    blob = store.put(io.BytesIO(data))
+    assert blob.refcount == 9 and blob.deduplicated
+    assert len(blob_files(store)) == 1 and os.listdir(store.tmp_dir) == []
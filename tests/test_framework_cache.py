@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import load_framework, get_assessment_framework, clear_framework_cache, DEFAULT_FRAMEWORK_PATH
+from modules.assessment.scoring_engine import calculate_maturity_score
+
+
+def _copy_framework():
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'framework.json')
+    shutil.copy(DEFAULT_FRAMEWORK_PATH, path)
+    return tmp_dir, path
+
+
+def test_framework_compiled_once_per_process():
+    first = get_assessment_framework()
+    second = get_assessment_framework()
+    assert first is second
+    assert first.total_questions == 25
+
+
+def test_framework_reloaded_when_file_changes():
+    tmp_dir, path = _copy_framework()
+    try:
+        first = load_framework(path)
+        assert load_framework(path) is first
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['governance_strategy']['name'] = 'Changed'
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.utime(path, ns=(first.mtime + 10**9, first.mtime + 10**9))
+
+        reloaded = load_framework(path)
+        assert reloaded is not first
+        assert reloaded['governance_strategy']['name'] == 'Changed'
+    finally:
+        clear_framework_cache()
+        shutil.rmtree(tmp_dir)
+
+
+def test_framework_is_read_only():
+    framework = get_assessment_framework()
+    with pytest.raises(TypeError):
+        framework['governance_strategy']['name'] = 'Mutated'
+    with pytest.raises(TypeError):
+        framework.questions['GOV_01'] = None
+
+
+def test_question_lookups():
+    framework = get_assessment_framework()
+    info = framework.question('GOV_01')
+    assert info.domain_id == 'governance_strategy'
+    assert info.max_score == 5
+    assert framework.option_score('GOV_01', 'No formal framework exists') == 0
+    assert framework.option_score('GOV_01', 'not an option') is None
+    assert framework.question('UNKNOWN') is None
+
+
+def test_scoring_matches_raw_dict():
+    with open(DEFAULT_FRAMEWORK_PATH, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    responses = {'GOV_01': 3, 'GOV_02': 5, 'RISK_01': 1}
+    assert calculate_maturity_score(responses, raw) == calculate_maturity_score(responses, get_assessment_framework())
+
+
+def test_question_pages_by_domain_and_size():
+    framework = get_assessment_framework()
+    by_domain = framework.question_pages()
+    assert len(by_domain) == len(framework)
+    assert framework.question_pages() is by_domain
+
+    by_size = framework.question_pages(7)
+    assert [len(page) for page in by_size] == [7, 7, 7, 4]
+    flat = [question['id'] for page in by_size for _, question in page]
+    assert flat == list(framework.question_ids)
+
+
+def test_option_labels_keyed_by_score():
+    info = get_assessment_framework().question('GOV_01')
+    for position, (score, text) in enumerate(info.option_labels.items()):
+        assert info.option_scores[text] == score
+        assert info.score_index[score] == position
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment import registry as registry_module
+from modules.assessment.framework import FALLBACK_FRAMEWORK, FRAMEWORK_DIR, get_assessment_framework
+from modules.assessment.registry import FrameworkRegistry
+from modules.assessment.scoring_engine import calculate_maturity_score
+
+
+@pytest.fixture
+def registry_dirs():
+    tmp_dir = tempfile.mkdtemp()
+    framework_dir = os.path.join(tmp_dir, 'frameworks')
+    shutil.copytree(FRAMEWORK_DIR, framework_dir)
+    yield framework_dir, os.path.join(tmp_dir, 'archive')
+    shutil.rmtree(tmp_dir)
+
+
+def test_discovers_all_frameworks_without_compiling(registry_dirs):
+    framework_dir, archive_dir = registry_dirs
+    registry = FrameworkRegistry(framework_dir, archive_dir, max_loaded=2)
+    ids = {info.framework_id for info in registry.discover()}
+    assert {'nist_rmf_enhanced', 'iso_42001', 'eu_ai_act'} <= ids
+    assert registry.cache_info()['loaded'] == 0
+
+
+def test_lru_cache_is_bounded(registry_dirs):
+    framework_dir, archive_dir = registry_dirs
+    registry = FrameworkRegistry(framework_dir, archive_dir, max_loaded=2)
+    iso = registry.get('iso_42001')
+    assert registry.get('iso_42001') is iso
+    registry.get('eu_ai_act')
+    registry.get('nist_rmf_enhanced')
+    assert registry.cache_info()['loaded'] == 2
+    assert registry.get('iso_42001') is not iso
+
+
+def test_historical_version_rescored_exactly(registry_dirs):
+    framework_dir, archive_dir = registry_dirs
+    registry = FrameworkRegistry(framework_dir, archive_dir)
+    old = registry.get('iso_42001')
+    old_version = old.version_id
+    assert old_version == registry.version_id('iso_42001')
+
+    responses = {'ISO_01': 3, 'ISO_04': 5}
+    old_scores = calculate_maturity_score(responses, old)
+
+    # Drop a question so the current version scores differently
+    path = os.path.join(framework_dir, 'iso_42001.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['context_leadership']['questions'].pop()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.utime(path, ns=(old.mtime + 10**9, old.mtime + 10**9))
+
+    assert registry.version_id('iso_42001') != old_version
+    registry.clear_cache()
+
+    historical = registry.get(old_version)
+    assert historical.version_id == old_version
+    assert calculate_maturity_score(responses, historical) == old_scores
+    assert calculate_maturity_score(responses, registry.get('iso_42001')) != old_scores
+
+
+def test_unknown_version_raises(registry_dirs):
+    framework_dir, archive_dir = registry_dirs
+    registry = FrameworkRegistry(framework_dir, archive_dir)
+    with pytest.raises(KeyError):
+        registry.get('iso_42001@000000000000')
+    with pytest.raises(KeyError):
+        registry.get('no_such_framework')
+
+
+def test_only_the_default_framework_falls_back(registry_dirs, monkeypatch):
+    framework_dir, archive_dir = registry_dirs
+    os.remove(os.path.join(framework_dir, 'nist_rmf_enhanced.json'))
+    registry = FrameworkRegistry(framework_dir, archive_dir)
+    monkeypatch.setattr(registry_module, 'framework_registry', registry)
+
+    assert list(get_assessment_framework().keys()) == list(FALLBACK_FRAMEWORK)
+    # An explicit id or version must not be silently re-scored against the fallback
+    version_id = registry.get('iso_42001').version_id
+    assert get_assessment_framework(version_id).version_id == version_id
+    with pytest.raises(KeyError):
+        get_assessment_framework('iso_42001@000000000000')
+    with pytest.raises(KeyError):
+        get_assessment_framework('nist_rmf_enhanced@000000000000')
@@ -0,0 +1,117 @@
+import os
+import sys
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import calculate_maturity_score
+from modules.data.connection_pool import get_pool
+
+
+def _counts(db):
+    conn = sqlite3.connect(db.db_path)
+    counts = tuple(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ('assessments', 'domain_scores', 'assessment_responses'))
+    conn.close()
+    return counts
+
+
+def test_full_save_writes_everything_once(db):
+    framework = get_assessment_framework()
+    responses = {'GOV_01': 3, 'GOV_02': 5, 'RISK_01': 1, 'UNKNOWN': 4}
+    scores = calculate_maturity_score(responses, framework)
+
+    first = db.save_full_assessment(1, scores, responses, framework, 'Q1', submission_key='key-1')
+    assert first is not None
+    assert _counts(db) == (1, len(framework), 3)
+
+    again = db.save_full_assessment(1, scores, responses, framework, 'Q1', submission_key='key-1')
+    assert again == first
+    assert _counts(db) == (1, len(framework), 3)
+
+
+def test_submission_key_is_scoped_to_its_user(db):
+    framework = get_assessment_framework()
+    responses = {'GOV_01': 3}
+    scores = calculate_maturity_score(responses, framework)
+    with get_pool(db.db_path).connection() as conn:
+        conn.execute("INSERT INTO users (id, email, password_hash) VALUES (2, 'b@example.com', 'x')")
+
+    assert db.save_full_assessment(1, scores, responses, framework, 'Q1', submission_key='key-1') is not None
+    # Another user's key is an error, not a way to read back their assessment id
+    assert db.save_full_assessment(2, scores, responses, framework, 'Q1', submission_key='key-1') is None
+    assert _counts(db) == (1, len(framework), 1)
+
+
+def test_bulk_save_is_atomic(db):
+    framework = get_assessment_framework()
+    responses = {'GOV_01': 2}
+    scores = calculate_maturity_score(responses, framework)
+    submissions = [
+        {'user_id': 1, 'scores': scores, 'responses': responses, 'assessment_name': f'Import {i}'}
+        for i in range(5)
+    ]
+    ids = db.save_full_assessments(submissions, framework)
+    assert len(set(ids)) == 5
+    assert _counts(db) == (5, 5 * len(framework), 5)
+
+    # An unknown user violates the foreign key, so the whole batch rolls back
+    bad = submissions + [{'user_id': 999, 'scores': scores, 'responses': responses, 'assessment_name': 'Bad'}]
+    assert db.save_full_assessments(bad, framework) is None
+    assert _counts(db) == (5, 5 * len(framework), 5)
+
+
+def test_recompiled_framework_keeps_the_attempt():
+    import streamlit as st
+    from modules.assessment import engine
+    from modules.assessment.framework import CompiledFramework
+
+    framework = get_assessment_framework()
+    recompiled = CompiledFramework(dict(framework), framework_id=framework.framework_id,
+                                   content_hash=framework.content_hash)
+    try:
+        scorer = engine.get_live_scorer(framework)
+        scorer.set_response('GOV_01', 3)
+        key = st.session_state.submission_key
+
+        # Same version, new object (cache eviction): same scorer, same key
+        assert engine.get_live_scorer(recompiled) is scorer
+        assert st.session_state.submission_key == key
+
+        changed = CompiledFramework(dict(framework), framework_id=framework.framework_id, content_hash='0' * 12)
+        assert engine.get_live_scorer(changed) is not scorer
+        assert st.session_state.submission_key != key
+    finally:
+        for name in ('responses', 'live_scorer', 'submission_key'):
+            st.session_state.pop(name, None)
+
+
+def test_resubmitting_edited_answers_saves_a_new_assessment(db, monkeypatch):
+    import streamlit as st
+    from modules.assessment import engine
+
+    monkeypatch.setattr(engine, 'db_manager', db)
+    monkeypatch.setattr(engine, 'throttle_allows', lambda route: True)
+    framework = get_assessment_framework()
+    scorer = engine.IncrementalScorer(framework, {'GOV_01': 3})
+    st.session_state.user = {'user_id': 1}
+    engine.start_attempt()
+    try:
+        assert engine.save_submission(framework, scorer, scorer.to_scores())
+        first = st.session_state.assessment_id
+
+        scorer.set_response('GOV_01', 5)
+        assert engine.save_submission(framework, scorer, scorer.to_scores())
+        second = st.session_state.assessment_id
+    finally:
+        for key in ('user', 'submission_key', 'assessment_id'):
+            st.session_state.pop(key, None)
+
+    assert second != first
+    conn = sqlite3.connect(db.db_path)
+    scores = [row[0] for row in conn.execute(
+        "SELECT response_score FROM assessment_responses WHERE question_id = 'GOV_01' ORDER BY assessment_id"
+    )]
+    conn.close()
+    assert scores == [3, 5]
@@ -0,0 +1,42 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.assessment.framework import get_assessment_framework
+from modules.assessment.scoring_engine import IncrementalScorer, calculate_maturity_score
+
+
+def test_running_totals_match_full_scoring():
+    framework = get_assessment_framework()
+    scorer = IncrementalScorer(framework)
+    rng = random.Random(3)
+    question_ids = list(framework.question_ids)
+
+    for _ in range(300):
+        q_id = rng.choice(question_ids)
+        score = None if rng.random() < 0.15 else rng.randint(0, 5)
+        scorer.set_response(q_id, score)
+        assert scorer.to_scores() == calculate_maturity_score(scorer.responses, framework)
+
+
+def test_progress_and_domain_percentage():
+    framework = get_assessment_framework()
+    scorer = IncrementalScorer(framework, {'GOV_01': 5, 'GOV_02': 5})
+    assert scorer.answered == 2
+    assert scorer.progress() == 2 / framework.total_questions
+    assert scorer.domain_percentage('governance_strategy') == 10 / 25 * 100
+
+    scorer.set_response('GOV_01', 0)
+    assert scorer.answered == 2
+    assert scorer.domain_percentage('governance_strategy') == 5 / 25 * 100
+
+    scorer.set_response('GOV_01', None)
+    assert scorer.answered == 1
+
+
+def test_unknown_question_ignored():
+    scorer = IncrementalScorer(get_assessment_framework())
+    assert scorer.set_response('NOT_A_QUESTION', 3) is False
+    assert scorer.answered == 0
@@ -0,0 +1,143 @@
+import os
+import sys
+import glob
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+
+import pytest
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, SRC)
+
+from modules.utils.log_pipeline import LogPipeline, log_pipeline
+from modules.utils.logger import StructuredLogger
+from modules.utils.services import services
+
+
+@pytest.fixture
+def log_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = LogPipeline(queue_size=100)
+    yield pipeline
+    pipeline.stop()
+
+
+def read_lines(pattern):
+    lines = []
+    for path in glob.glob(pattern):
+        with open(path, encoding='utf-8') as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+        self.entered = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.entered.set()
+        self.gate.wait()
+        self.records.append(record.getMessage())
+
+
+def test_structured_loggers_share_one_handler_per_file(log_dir):
+    services.reset('log_pipeline')
+    try:
+        loggers = [StructuredLogger(name, log_dir=log_dir) for name in ('t_app', 't_auth', 't_export')]
+        targets = {logger.logger.handlers[0].targets for logger in loggers}
+        assert len(targets) == 1 and log_pipeline.stats()['targets'] == 3
+
+        for logger in loggers:
+            logger.log_data_access(1, 'assessment', '7', 'view')
+        assert log_pipeline.flush()
+        assert len(read_lines(os.path.join(log_dir, 'audit.json'))) == 3
+        app_lines = read_lines(os.path.join(log_dir, 'app.log'))
+        # Call sites are kept in app.log, as before the pipeline
+        assert len(app_lines) == 3 and all('[logger.py:' in line for line in app_lines)
+    finally:
+        log_pipeline.stop()
+        services.reset('log_pipeline')
+
+
+def test_slow_writer_does_not_block_callers(pipeline):
+    gate = threading.Event()
+    slow = SlowHandler(gate)
+    logger = logging.getLogger('test_pipeline_slow')
+    logger.setLevel(logging.INFO)
+    pipeline.attach(logger, (slow,))
+
+    try:
+        # Park the listener inside the handler, then log a burst
+        logger.info('first')
+        assert slow.entered.wait(5)
+        start = time.perf_counter()
+        for i in range(150):
+            logger.info(f'event {i}')
+        assert time.perf_counter() - start < 1.0
+
+        stats = pipeline.stats()
+        assert stats['enqueued'] == 101 and stats['dropped'] == 50
+    finally:
+        gate.set()
+    assert pipeline.flush()
+    assert slow.records[:3] == ['first', 'event 0', 'event 1'] and len(slow.records) == 101
+
+
+def test_targets_filter_by_level_and_stopped_pipeline_writes_inline(pipeline, log_dir):
+    path = os.path.join(log_dir, 'levels.log')
+    target = pipeline.file_target(path, 0, 0, '%(levelname)s %(message)s', logging.WARNING)
+    assert pipeline.file_target(path, 0, 0) is target
+
+    logger = logging.getLogger('test_pipeline_levels')
+    logger.setLevel(logging.DEBUG)
+    pipeline.attach(logger, (target,))
+    logger.info('quiet')
+    logger.warning('loud')
+    pipeline.stop()
+    logger.error('after stop')
+
+    assert read_lines(path) == ['WARNING loud', 'ERROR after stop']
+    assert pipeline.stats()['written_inline'] == 1
+
+
+WRITER = """
+import sys, logging
+sys.path.insert(0, {src!r})
+from modules.utils.log_pipeline import InterprocessRotatingFileHandler
+handler = InterprocessRotatingFileHandler({path!r}, maxBytes=4000, backupCount=50)
+handler.setFormatter(logging.Formatter('%(message)s'))
+for i in range({count}):
+    handler.handle(logging.makeLogRecord({{'msg': 'worker {worker} line %05d ' % i + 'x' * 40}}))
+handler.close()
+"""
+
+
+def test_rotation_is_safe_across_processes(log_dir):
+    path = os.path.join(log_dir, 'shared.log')
+    workers, count = 3, 300
+    processes = [
+        subprocess.Popen([sys.executable, '-c', WRITER.format(src=SRC, path=path, count=count, worker=w)])
+        for w in range(workers)
+    ]
+    for process in processes:
+        assert process.wait(timeout=60) == 0
+
+    lines = read_lines(path + '*')
+    assert len(lines) == workers * count
+    assert len(set(lines)) == workers * count
+    assert all(line.startswith('worker ') and line.endswith('x' * 40) for line in lines)
+    rotated = glob.glob(path + '.*[0-9]')
+    assert rotated and all(os.path.getsize(p) < 4000 for p in rotated)
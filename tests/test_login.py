@@ -0,0 +1,108 @@
+import os
+import sys
+import sqlite3
+
+import bcrypt
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.auth import auth_manager as auth_module
+from modules.auth.auth_manager import (
+    AuthManager, LOGIN_OK, LOGIN_NOT_FOUND, LOGIN_INACTIVE, LOGIN_LOCKED, LOGIN_INVALID_PASSWORD,
+)
+from modules.auth.password_hasher import PasswordHasher
+from modules.data.connection_pool import get_pool
+
+EMAIL = 'login@example.com'
+PASSWORD = 'CorrectHorse1!'
+
+
+@pytest.fixture
+def am(migrated_db):
+    manager = AuthManager.__new__(AuthManager)
+    manager.db_path = migrated_db
+    manager.hasher = PasswordHasher(rounds=4, max_workers=1)
+    conn = sqlite3.connect(manager.db_path)
+    conn.execute("INSERT INTO users (email, password_hash, full_name, organization, role) VALUES (?, ?, ?, ?, ?)",
+                 (EMAIL, sqlite3.Binary(bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4))), 'Login User', 'Org', 'user'))
+    conn.commit()
+    conn.close()
+    yield manager
+    manager.hasher.shutdown()
+
+
+def user_row(am):
+    conn = sqlite3.connect(am.db_path)
+    row = conn.execute("SELECT failed_login_attempts, locked_until, last_login FROM users WHERE email=?",
+                       (EMAIL,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_successful_login_returns_user_and_resets_attempts(am):
+    assert am.login(EMAIL, 'wrong').status == LOGIN_INVALID_PASSWORD
+
+    result = am.login(EMAIL, PASSWORD)
+    assert result.ok and result.status == LOGIN_OK
+    assert result.user['email'] == EMAIL and result.user['role'] == 'user'
+    attempts, locked_until, last_login = user_row(am)
+    assert attempts == 0 and locked_until is None and last_login is not None
+
+
+def test_unknown_and_inactive_accounts(am):
+    assert am.login('nobody@example.com', PASSWORD).status == LOGIN_NOT_FOUND
+
+    conn = sqlite3.connect(am.db_path)
+    conn.execute("UPDATE users SET is_active=0 WHERE email=?", (EMAIL,))
+    conn.commit()
+    conn.close()
+    assert am.login(EMAIL, PASSWORD).status == LOGIN_INACTIVE
+
+
+def test_failures_count_up_and_lock_atomically(am, monkeypatch):
+    monkeypatch.setattr(auth_module, 'LOGIN_MAX_ATTEMPTS', 3)
+
+    assert am.login(EMAIL, 'wrong').failed_attempts == 1
+    assert am.login(EMAIL, 'wrong').failed_attempts == 2
+    result = am.login(EMAIL, 'wrong')
+    assert result.status == LOGIN_LOCKED and result.failed_attempts == 3
+    assert result.locked_until == user_row(am)[1]
+    assert am.is_account_locked(EMAIL)
+
+    # Correct password is refused while locked, without counting another failure
+    locked = am.login(EMAIL, PASSWORD)
+    assert locked.status == LOGIN_LOCKED and locked.failed_attempts == 0
+    assert user_row(am)[0] == 3
+
+
+def test_lock_set_during_bcrypt_refuses_a_correct_password(am, monkeypatch):
+    verify = am.hasher.verify_and_update
+    locked_until = (auth_module.datetime.now() + auth_module.timedelta(minutes=5)).isoformat()
+
+    def verify_while_a_sibling_locks(password, stored_hash):
+        # A parallel failed guess locks the account while this one hashes
+        conn = sqlite3.connect(am.db_path)
+        conn.execute("UPDATE users SET failed_login_attempts=5, locked_until=? WHERE email=?", (locked_until, EMAIL))
+        conn.commit()
+        conn.close()
+        return verify(password, stored_hash)
+
+    monkeypatch.setattr(am.hasher, 'verify_and_update', verify_while_a_sibling_locks)
+    assert am.login(EMAIL, PASSWORD).status == LOGIN_LOCKED
+    # The lock and the failure count survive
+    attempts, stored_lock, last_login = user_row(am)
+    assert attempts == 5 and stored_lock == locked_until and last_login is None
+
+
+def test_login_runs_one_select_and_one_update(am):
+    pool = get_pool(am.db_path)
+    with pool.connection() as conn:
+        statements = []
+        conn.set_trace_callback(statements.append)
+
+    am.login(EMAIL, PASSWORD)
+    am.login(EMAIL, 'wrong')
+    queries = [sql.split()[0].upper() for sql in statements if sql.split()[0].upper() in ('SELECT', 'UPDATE')]
+    assert queries == ['SELECT', 'UPDATE', 'SELECT', 'UPDATE']
+    assert pool.stats()['open'] == 1
@@ -0,0 +1,155 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data import migrations
+from modules.data.connection_pool import connection, get_pool
+from modules.data.migrations import (
+    MigrationError,
+    MigrationLockTimeout,
+    applied_migrations,
+    copy_table_online,
+    latest_version,
+    migrate,
+    reset_migration_cache,
+)
+
+
+@pytest.fixture
+def db_path():
+    tmp_dir = tempfile.mkdtemp()
+    path = os.path.join(tmp_dir, 'migrations.db')
+    yield path
+    get_pool(path).close()
+    shutil.rmtree(tmp_dir)
+
+
+def test_fresh_database_migrated_once(db_path):
+    assert migrate(db_path) == latest_version()
+    assert [row[0] for row in applied_migrations(db_path)] == list(range(1, latest_version() + 1))
+
+    # A new process (empty memo) finds the schema current and runs no DDL
+    reset_migration_cache()
+    statements = []
+    with get_pool(db_path).connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        assert migrate(db_path) == latest_version()
+    finally:
+        with get_pool(db_path).connection() as conn:
+            conn.set_trace_callback(None)
+    assert statements == ['SELECT MAX(version) FROM schema_version']
+
+    # Within the process, later calls do not touch the database at all
+    statements.clear()
+    assert migrate(db_path) == latest_version()
+    assert statements == []
+
+
+def test_legacy_assessments_rebuilt_without_losing_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE NOT NULL,
+                            password_hash TEXT NOT NULL);
+        CREATE TABLE assessments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            organization_id INTEGER NOT NULL,
+            assessment_name TEXT,
+            overall_score DECIMAL(5,2),
+            maturity_level TEXT,
+            assessment_data TEXT,
+            framework_version TEXT DEFAULT '1.0',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP NULL,
+            status TEXT DEFAULT 'in_progress'
+        );
+        CREATE TABLE domain_scores (id INTEGER PRIMARY KEY AUTOINCREMENT, assessment_id INTEGER NOT NULL,
+                                    domain_id TEXT NOT NULL,
+                                    FOREIGN KEY(assessment_id) REFERENCES assessments(id) ON DELETE CASCADE);
+        INSERT INTO users (id, email, password_hash) VALUES (1, 'a@example.com', 'x');
+        INSERT INTO assessments (user_id, organization_id, overall_score, maturity_level, assessment_data, completed_at)
+        VALUES (1, 3, 42.5, 'Developing', '{"GOV_01": 2}', '2024-01-01 00:00:00');
+        INSERT INTO domain_scores (assessment_id, domain_id) VALUES (1, 'governance_strategy');
+    """)
+    conn.commit()
+    conn.close()
+
+    migrate(db_path)
+
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT org_id, overall_score, overall_maturity, submitted_at FROM assessments").fetchone()
+    assert row == (3, 42.5, 'Developing', '2024-01-01 00:00:00')
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(assessments)")]
+    assert 'organization_id' not in columns
+    assert conn.execute("SELECT assessment_data FROM assessment_legacy_data").fetchone()[0] == '{"GOV_01": 2}'
+    assert conn.execute("SELECT COUNT(*) FROM domain_scores").fetchone()[0] == 1
+    conn.close()
+
+
+def test_online_copy_mirrors_writes_made_between_batches(db_path):
+    pool = get_pool(db_path)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO items VALUES (?, ?)", [(i, f'item{i}') for i in range(1, 11)])
+
+    writer = sqlite3.connect(db_path, isolation_level=None)
+    batches = []
+
+    def concurrent_writes(copied):
+        batches.append(copied)
+        if len(batches) == 1:
+            writer.execute("UPDATE items SET name = 'changed' WHERE id = 2")
+            writer.execute("UPDATE items SET name = 'late change' WHERE id = 9")
+            writer.execute("DELETE FROM items WHERE id = 3")
+            writer.execute("INSERT INTO items VALUES (11, 'new')")
+
+    with pool.connection() as conn:
+        conn.commit()
+        copy_table_online(
+            conn, 'items',
+            "CREATE TABLE {table} (id INTEGER PRIMARY KEY, name TEXT, name_length INTEGER)",
+            {'id': '{row}.id', 'name': '{row}.name', 'name_length': 'length({row}.name)'},
+            indexes=("CREATE INDEX IF NOT EXISTS idx_items_name ON items(name)",),
+            batch_size=4, progress=concurrent_writes,
+        )
+    writer.close()
+
+    assert len(batches) > 1
+    with pool.connection() as conn:
+        rows = dict(conn.execute("SELECT id, name FROM items").fetchall())
+        assert conn.execute("SELECT name_length FROM items WHERE id = 2").fetchone()[0] == len('changed')
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_items_name'").fetchone()
+    assert 3 not in rows
+    assert rows[2] == 'changed' and rows[9] == 'late change' and rows[11] == 'new'
+    assert len(rows) == 10
+
+
+def test_refuses_to_commit_a_callers_open_transaction(db_path):
+    with pytest.raises(MigrationError), connection(db_path) as conn:
+        conn.execute("CREATE TABLE notes (body TEXT)")
+        conn.execute("INSERT INTO notes VALUES ('half done')")
+        migrate(db_path)
+    # The caller's work was rolled back with its block, not committed by migrate()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'schema_version'").fetchone() is None
+    conn.close()
+    assert migrate(db_path) == latest_version()
+
+
+def test_live_lock_holder_gives_a_prompt_error(db_path, monkeypatch):
+    monkeypatch.setattr(migrations, 'LOCK_WAIT_SECONDS', 0.3)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE schema_lock (id INTEGER PRIMARY KEY CHECK (id = 1), owner TEXT, acquired_at REAL)")
+    conn.execute("INSERT INTO schema_lock VALUES (1, 'other-host:1234:1', strftime('%s', 'now'))")
+    conn.commit()
+    conn.close()
+    with pytest.raises(MigrationLockTimeout, match='other-host:1234:1'):
+        migrate(db_path)
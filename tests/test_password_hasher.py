@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+import bcrypt
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.auth.auth_manager import AuthManager
+from modules.auth.password_hasher import PasswordHasher, PasswordHasherBusy, hash_cost
+from modules.data.connection_pool import close_all_pools
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(rounds=4, max_workers=2, max_queue=8)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify_on_pool(hasher):
+    hashed = hasher.hash('CorrectHorse1!')
+    assert hash_cost(hashed) == 4
+    assert hasher.verify('CorrectHorse1!', hashed)
+    assert hasher.verify('CorrectHorse1!', memoryview(hashed))
+    assert not hasher.verify('wrong', hashed.decode())
+
+    stats = hasher.stats()
+    assert stats['submitted'] == stats['completed'] == 4
+    assert stats['queue_depth'] == 0 and stats['in_flight'] == 0
+
+
+def test_verify_and_update_rehashes_when_cost_changes(hasher):
+    old = bcrypt.hashpw(b'CorrectHorse1!', bcrypt.gensalt(5))
+    assert hasher.needs_rehash(old)
+
+    valid, new_hash = hasher.verify_and_update('CorrectHorse1!', old)
+    assert valid and hash_cost(new_hash) == 4
+    assert bcrypt.checkpw(b'CorrectHorse1!', new_hash)
+
+    assert hasher.verify_and_update('CorrectHorse1!', new_hash) == (True, None)
+    assert hasher.verify_and_update('wrong', old) == (False, None)
+    assert hasher.stats()['rehashed'] == 1
+
+
+def test_full_queue_is_rejected():
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_queue=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    # Occupy the only worker, then fill the single queue slot
+    running = threading.Thread(target=hasher._run, args=(block,))
+    running.start()
+    started.wait(5)
+    queued = threading.Thread(target=hasher._run, args=(lambda: None,))
+    queued.start()
+    while hasher.stats()['queue_depth'] < 1:
+        time.sleep(0.001)
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('x')
+    release.set()
+    running.join()
+    queued.join()
+
+    stats = hasher.stats()
+    assert stats['rejected'] == 1
+    assert stats['peak_queue_depth'] == 1
+    hasher.shutdown()
+
+
+def test_login_upgrades_stored_hash_cost(hasher):
+    tmp_dir = tempfile.mkdtemp()
+    am = AuthManager.__new__(AuthManager)
+    am.db_path = os.path.join(tmp_dir, 'auth.db')
+    am.hasher = hasher
+    am._init_db()
+
+    old_hash = bcrypt.hashpw(b'CorrectHorse1!', bcrypt.gensalt(5))
+    conn = sqlite3.connect(am.db_path)
+    conn.execute("INSERT INTO users (email, password_hash, full_name, organization, role) VALUES (?, ?, ?, ?, ?)",
+                 ('rehash@example.com', sqlite3.Binary(old_hash), 'Rehash User', 'Org', 'user'))
+    conn.commit()
+
+    assert am.authenticate('rehash@example.com', 'CorrectHorse1!')['email'] == 'rehash@example.com'
+    stored = conn.execute("SELECT password_hash FROM users WHERE email=?", ('rehash@example.com',)).fetchone()[0]
+    assert hash_cost(stored) == 4
+    assert am.authenticate('rehash@example.com', 'CorrectHorse1!') is not None
+    conn.close()
+    close_all_pools()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
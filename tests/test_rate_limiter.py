@@ -0,0 +1,148 @@
+import os
+import sys
+import sqlite3
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.connection_pool import close_all_pools
+from modules.utils.rate_limit_backends import MemoryRateLimitBackend, SqliteRateLimitBackend
+from modules.utils.rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def memory(clock):
+    return MemoryRateLimitBackend(3, window_seconds=60, lockout_seconds=300, stripes=4, clock=clock)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    yield str(tmp_path / 'limits.db')
+    close_all_pools()
+
+
+def test_memory_locks_within_sliding_window(memory, clock):
+    assert memory.record_failure('a') is None
+    assert memory.record_failure('a') is None
+    assert memory.record_failure('a') == 300
+    assert memory.check('a') == 300
+    assert memory.check('b') is None
+
+    clock.now += 301
+    assert memory.check('a') is None
+
+
+def test_memory_window_slides(memory, clock):
+    memory.record_failure('a')
+    clock.now += 50
+    memory.record_failure('a')
+    clock.now += 20
+    # The first attempt has left the 60s window, so only two count
+    assert memory.record_failure('a') is None
+    clock.now += 10
+    assert memory.record_failure('a') == 300
+
+
+def test_memory_reset_and_idle_eviction(memory, clock):
+    memory.record_failure('a')
+    memory.reset('a')
+    assert memory.size() == 0
+
+    for identifier in ('a', 'b', 'c'):
+        memory.record_failure(identifier)
+    for _ in range(2):
+        memory.record_failure('c')
+    assert memory.check('c')
+
+    clock.now += 299
+    assert memory.cleanup() == 0
+    clock.now += 2
+    assert memory.cleanup() == 3
+    assert memory.size() == 0
+
+
+def test_memory_caps_tracked_identifiers(clock):
+    backend = MemoryRateLimitBackend(3, 60, 300, stripes=1, max_identifiers=10, clock=clock)
+    for i in range(50):
+        clock.now += 1
+        backend.record_failure(f'user{i}')
+    assert backend.size() <= 10
+    assert backend.check('user49') is None
+
+
+def test_memory_concurrent_failures_counted_once_each(clock):
+    backend = MemoryRateLimitBackend(1000, 60, 300, clock=clock)
+    locks = []
+
+    def worker():
+        for _ in range(250):
+            if backend.record_failure('shared') is not None:
+                locks.append(1)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(locks) == 2
+    assert backend.check('shared')
+
+
+def test_sqlite_upsert_locks_and_resets(db_path):
+    backend = SqliteRateLimitBackend(3, window_seconds=60, lockout_seconds=300, db_path=db_path)
+    assert backend.record_failure('a') is None
+    assert backend.record_failure('a') is None
+    assert backend.record_failure('a') == 300
+    assert 290 < backend.check('a') <= 300
+
+    backend.reset('a')
+    assert backend.check('a') is None
+    assert sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0] == 0
+
+
+def test_sqlite_restarts_count_after_window(db_path):
+    backend = SqliteRateLimitBackend(3, window_seconds=60, lockout_seconds=300, db_path=db_path)
+    backend.record_failure('a')
+    backend.record_failure('a')
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE rate_limits SET first_attempt = '2000-01-01T00:00:00'")
+    conn.commit()
+
+    assert backend.record_failure('a') is None
+    assert conn.execute("SELECT attempt_count FROM rate_limits").fetchone()[0] == 1
+    conn.close()
+
+
+def test_sqlite_concurrent_failures_are_not_lost(db_path):
+    backend = SqliteRateLimitBackend(1000, 60, 300, db_path=db_path)
+
+    def worker():
+        for _ in range(25):
+            backend.record_failure('shared')
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    count = sqlite3.connect(db_path).execute("SELECT attempt_count FROM rate_limits").fetchone()[0]
+    assert count == 200
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+def test_rate_limiter_facade(kind, db_path, monkeypatch):
+    monkeypatch.setattr(RateLimiter, 'BACKEND', kind)
+    monkeypatch.setattr(RateLimiter, 'DB_PATH', db_path)
+    monkeypatch.setattr(RateLimiter, '_backend', None)
+
+    assert RateLimiter.get_backend().name == kind
+    for _ in range(RateLimiter.MAX_ATTEMPTS):
+        assert RateLimiter.check_rate_limit('user@example.com') == (True, "OK")
+        RateLimiter.record_failed_attempt('user@example.com')
+    allowed, message = RateLimiter.check_rate_limit('user@example.com')
+    assert not allowed and "Try again in 29 minutes" in message
+
+    assert RateLimiter.reset_attempts('user@example.com')
+    assert RateLimiter.check_rate_limit('user@example.com') == (True, "OK")
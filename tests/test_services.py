@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.utils.services import ServiceContainer, LazyService, lazy_service, services
+from modules.utils.startup_profiler import parse_importtime, total_ms
+
+
+class Counter:
+    instances = 0
+
+    def __init__(self):
+        Counter.instances += 1
+        self.value = 1
+
+    def bump(self):
+        self.value += 1
+        return self.value
+
+
+def test_service_built_on_first_attribute_access():
+    Counter.instances = 0
+    proxy = lazy_service('test_counter', Counter)
+    assert Counter.instances == 0
+    assert not services.is_initialized('test_counter')
+
+    assert proxy.bump() == 2
+    assert proxy.bump() == 3
+    assert Counter.instances == 1
+    assert 'test_counter' in services.init_timings()
+
+
+def test_setattr_and_reset_go_through_container():
+    Counter.instances = 0
+    proxy = lazy_service('test_counter_reset', Counter)
+    proxy.value = 10
+    assert services.get('test_counter_reset').value == 10
+
+    services.reset('test_counter_reset')
+    assert proxy.value == 1
+    assert Counter.instances == 2
+
+
+def test_concurrent_first_use_constructs_once():
+    container = ServiceContainer()
+    built = []
+    gate = threading.Barrier(8)
+
+    def factory():
+        built.append(1)
+        return object()
+
+    container.register('shared', factory)
+    results = []
+
+    def worker():
+        gate.wait()
+        results.append(container.get('shared'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert len({id(result) for result in results}) == 1
+
+
+def test_module_singletons_are_lazy_proxies():
+    from modules.data.database_manager import db_manager
+    from modules.auth.auth_manager import auth_manager
+    from modules.utils.logger import app_logger
+
+    for proxy in (db_manager, auth_manager, app_logger):
+        assert isinstance(proxy, LazyService)
+
+
+def test_parse_importtime_nesting_and_total():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     json.decoder\n"
+        "import time:       200 |        300 |   json\n"
+        "import time:       500 |        800 | app.main\n"
+        "import time:        50 |         50 | os\n"
+    )
+    timings = parse_importtime(stderr)
+    assert [t.module for t in timings] == ['json.decoder', 'json', 'app.main', 'os']
+    assert [t.depth for t in timings] == [2, 1, 0, 0]
+    assert timings[1].cumulative_ms == 0.3
+    assert total_ms(timings) == pytest.approx(0.85)
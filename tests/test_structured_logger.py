@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import shutil
+import logging
+import tempfile
+import itertools
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.utils import logger as structured
+from modules.utils.log_pipeline import log_pipeline
+from modules.utils.logger import JsonEvent, StructuredLogger, encode_json, parse_sample_rates
+from modules.utils.services import services
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def make_logger():
+    log_dir = tempfile.mkdtemp()
+    services.reset('log_pipeline')
+    names = itertools.count()
+
+    def make(**kwargs):
+        instance = StructuredLogger(f"test_structured_{next(names)}", log_dir=log_dir, **kwargs)
+        capture = Capture()
+        instance.logger.handlers = [capture]
+        # Keep pytest's log capture from formatting records
+        instance.logger.propagate = False
+        return instance, capture
+
+    yield make
+    log_pipeline.stop()
+    services.reset('log_pipeline')
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def encode_calls(monkeypatch):
+    calls = []
+    original = structured.encode_json
+    monkeypatch.setattr(structured, 'encode_json', lambda payload: calls.append(payload) or original(payload))
+    return calls
+
+
+def test_disabled_level_builds_nothing(make_logger, encode_calls, monkeypatch):
+    instance, capture = make_logger(sample_rates={})
+    instance.logger.setLevel(logging.WARNING)
+    monkeypatch.setattr(structured, 'datetime', None)  # any payload construction would fail
+
+    assert instance.event('data_access', user_id=1) is False
+    instance.log_data_access(1, 'assessment', '7', 'view')
+    assert capture.records == [] and encode_calls == []
+
+
+def test_encoding_is_deferred_and_done_once(make_logger, encode_calls):
+    instance, capture = make_logger(sample_rates={})
+    instance.log_export_operation(3, 'json', True, filename='a.json')
+
+    assert encode_calls == []
+    message = capture.records[0].msg
+    assert isinstance(message, JsonEvent)
+    first, second = logging.Formatter('%(message)s').format(capture.records[0]), str(message)
+    assert first == second and len(encode_calls) == 1
+    payload = json.loads(first)
+    assert payload['event_type'] == 'export' and payload['success'] is True and payload['format'] == 'json'
+
+
+def test_sampling_per_event_type_and_outcome(make_logger):
+    ticks = itertools.cycle(i / 100 for i in range(100))
+    instance, capture = make_logger(
+        sample_rates={'authentication.success': 0.01, 'security': 1.0, '*': 0.5},
+        sampler=lambda: next(ticks))
+
+    for _ in range(200):
+        instance.log_authentication('login', 'a@b.c', True)
+        instance.log_security_event('lockout', 'warning', 'too many attempts')
+    for _ in range(100):
+        instance.log_authentication('login', 'a@b.c', False)
+    kept = [record.msg.payload for record in capture.records]
+
+    successes = [p for p in kept if p['event_type'] == 'authentication' and p['success']]
+    failures = [p for p in kept if p['event_type'] == 'authentication' and not p['success']]
+    security = [p for p in kept if p['event_type'] == 'security']
+    assert len(successes) == 2 and successes[0]['sample_rate'] == 0.01
+    # Failures fall through to "*"
+    assert len(failures) == 50 and failures[0]['sample_rate'] == 0.5
+    assert len(security) == 200 and 'sample_rate' not in security[0]
+
+
+def test_parse_sample_rates_and_encoder():
+    rates = parse_sample_rates(" authentication.success=0.01, security=1,bad, export=2 ,,")
+    assert rates == {'authentication.success': 0.01, 'security': 1.0, 'export': 1.0}
+
+    encoded = encode_json({'when': datetime(2026, 1, 2, 3, 4, 5), 'n': 1, 'text': 'é'})
+    assert json.loads(encoded) == {'when': '2026-01-02T03:04:05' if structured.ORJSON_AVAILABLE
+                                   else '2026-01-02 03:04:05', 'n': 1, 'text': 'é'}
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.utils.services import services
+from modules.utils.throttle import RequestThrottle, TokenBuckets
+
+
+@pytest.fixture
+def throttle(clock):
+    return RequestThrottle(limits={'export': 6, 'registration': 2}, org_multiplier=2, enabled=True, clock=clock)
+
+
+def test_bucket_allows_burst_then_gives_retry_hint(throttle, clock):
+    for _ in range(6):
+        assert throttle.check('export', user_id=1).allowed
+    result = throttle.check('export', user_id=1)
+    assert not result.allowed and result.scope == 'user'
+    # 6 per minute refills one token every 10 seconds
+    assert result.retry_after == pytest.approx(10.0)
+
+    clock.now += 10
+    assert throttle.check('export', user_id=1).allowed
+    assert not throttle.check('export', user_id=1).allowed
+
+
+def test_keys_and_routes_are_isolated(throttle):
+    for _ in range(2):
+        assert throttle.check('registration', session_id='s1').allowed
+    assert not throttle.check('registration', session_id='s1').allowed
+    assert throttle.check('registration', session_id='s2').allowed
+    assert throttle.check('export', session_id='s1').allowed
+    # Unknown routes are not throttled
+    assert throttle.check('dashboard', session_id='s1').allowed
+
+
+def test_unauthenticated_routes_survive_a_dropped_session(throttle):
+    # A fresh session id per request still spends the email's bucket
+    for n in range(2):
+        assert throttle.check('registration', session_id=f's{n}', subject='Ann@Example.com').allowed
+    blocked = throttle.check('registration', session_id='s2', subject=' ann@example.com')
+    assert not blocked.allowed and blocked.scope == 'subject'
+
+    # There is no bucket shared by everyone: other emails are unaffected
+    for n in range(20):
+        assert throttle.check('registration', session_id=f'x{n}', subject=f'user{n}@example.com').allowed
+    assert throttle.check('registration', session_id='s3', subject='bob@example.com').allowed
+
+
+def test_org_bucket_is_shared_and_all_or_nothing(throttle):
+    # Org budget is 12/min shared; each user gets 6/min
+    for user_id in (1, 2):
+        for _ in range(6):
+            assert throttle.check('export', user_id=user_id, org_id=7).allowed
+    blocked = throttle.check('export', user_id=3, org_id=7)
+    assert not blocked.allowed and blocked.scope == 'org'
+
+    # The refused request must not have spent user 3's tokens
+    for _ in range(6):
+        assert throttle.check('export', user_id=3, org_id=8).allowed
+    # Another tenant is unaffected
+    assert throttle.check('export', user_id=4, org_id=9).allowed
+
+
+def test_refilled_buckets_are_evicted(clock):
+    buckets = TokenBuckets(stripes=1, clock=clock)
+    for key in range(100):
+        buckets.acquire([(('export', 'user', key), 6)])
+    assert buckets.size() == 100
+
+    clock.now += 61
+    buckets.acquire([(('export', 'user', 'new'), 6)])
+    assert buckets.size() == 1
+
+
+def test_disabled_throttle_always_allows(clock):
+    throttle = RequestThrottle(limits={'export': 1}, enabled=False, clock=clock)
+    assert all(throttle.check('export', user_id=1).allowed for _ in range(5))
+
+
+def test_export_manager_reports_retry_after():
+    from modules.utils.export_manager import ProductionExportManager
+
+    services.register('request_throttle', lambda: RequestThrottle(limits={'export': 1}, enabled=True))
+    try:
+        manager = ProductionExportManager()
+        user_info = {'user_id': 42, 'org_id': 1}
+        assert manager.export_assessment_data({}, user_info, 'unknown')['error'].startswith('Unsupported')
+        result = manager.export_assessment_data({}, user_info, 'json')
+        assert result['success'] is False
+        assert result['retry_after'] > 0 and 'try again' in result['error']
+    finally:
+        services.register('request_throttle', RequestThrottle)
@@ -0,0 +1,190 @@
+import io
+import os
+import sys
+import socket
+import struct
+import sqlite3
+import threading
+import socketserver
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from modules.data.evidence_gc import EvidenceSweeper
+from modules.data.evidence_manager import EvidenceScope
+from modules.data.evidence_store import EvidenceInfectedError
+from modules.utils.audit_logger import AuditLogger
+from modules.utils.virus_scan import (
+    VERDICT_CLEAN, VERDICT_INFECTED, ClamdScanner, ScanError, ScanVerdict, parse_reply,
+)
+
+from conftest import Upload
+
+EICAR = b'X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*'
+
+
+class FakeClamd(socketserver.ThreadingTCPServer):
+    """Just enough of clamd's INSTREAM protocol: flags EICAR, reports every chunk it receives"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeClamdHandler)
+        self.scans = 0
+        self.reply = None
+        self.first_chunk = threading.Event()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeClamdHandler(socketserver.StreamRequestHandler):
+    def read_exactly(self, n):
+        data = self.rfile.read(n)
+        if len(data) != n:
+            raise EOFError
+        return data
+
+    def handle(self):
+        command = b''
+        while not command.endswith(b'\0'):
+            command += self.read_exactly(1)
+        assert command == b'zINSTREAM\0'
+        data = b''
+        try:
+            while True:
+                (length,) = struct.unpack('!L', self.read_exactly(4))
+                if not length:
+                    break
+                data += self.read_exactly(length)
+                self.server.first_chunk.set()
+        except EOFError:
+            return
+        self.server.scans += 1
+        if self.server.reply is not None:
+            reply = self.server.reply
+        elif EICAR in data:
+            reply = b'stream: Eicar-Test-Signature FOUND'
+        else:
+            reply = b'stream: OK'
+        self.wfile.write(reply + b'\0')
+
+
+@pytest.fixture
+def clamd():
+    server = FakeClamd()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def store_options(clamd):
+    return {'chunk_size': 1024, 'scanner': ClamdScanner('127.0.0.1', clamd.port, timeout=5)}
+
+
+def scope():
+    return EvidenceScope(1, 7, None, 'attempt-1')
+
+
+def blob_count(manager):
+    with sqlite3.connect(manager.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM evidence_blobs").fetchone()[0]
+
+
+def test_parse_reply():
+    assert parse_reply(b'stream: OK\0') == ScanVerdict(VERDICT_CLEAN, None)
+    assert parse_reply(b'stream: Win.Test.EICAR_HDB-1 FOUND\0') == ScanVerdict(VERDICT_INFECTED,
+                                                                              'Win.Test.EICAR_HDB-1')
+    with pytest.raises(ScanError):
+        parse_reply(b'INSTREAM size limit exceeded. ERROR\0')
+
+
+def test_clean_uploads_are_stored_and_scanned_once(manager, clamd):
+    record = manager.upload_evidence('GOV_01', Upload('policy.txt', b'AI policy ' * 500), scope=scope())
+    assert record is not None and clamd.scans == 1
+    assert manager.store.verdict(record.sha256) == ScanVerdict(VERDICT_CLEAN, None)
+
+    # Duplicates are matched on their hash before being written or sent to clamd
+    again = manager.store.put(io.BytesIO(b'AI policy ' * 500))
+    assert again.deduplicated and again.refcount == 2 and clamd.scans == 1
+    manager.store.release(again.sha256)
+
+    # Known-clean content whose blob has since been deleted is stored without a rescan
+    manager.delete_evidence('GOV_01', record.id, scope=scope())
+    assert blob_count(manager) == 0
+    restored = manager.store.put(io.BytesIO(b'AI policy ' * 500))
+    assert not restored.deduplicated and clamd.scans == 1
+    assert manager.store.open(restored.sha256).read() == b'AI policy ' * 500
+
+
+def test_infected_uploads_are_quarantined(manager, clamd, monkeypatch):
+    events = []
+    # Recorded here rather than written to the default audit database
+    monkeypatch.setattr(AuditLogger, 'log_security_event',
+                        staticmethod(lambda event_type, severity, details, user_id=None:
+                                     events.append((event_type, details['signature'], user_id))))
+    store = manager.store
+    data = b'padding ' * 300 + EICAR
+    assert manager.upload_evidence('GOV_01', Upload('invoice.txt', data), scope=scope()) is None
+    assert events == [('evidence_infected', 'Eicar-Test-Signature', 1)]
+    assert blob_count(manager) == 0 and manager.storage_used(1) == 0
+    assert os.listdir(store.tmp_dir) == []
+
+    with pytest.raises(EvidenceInfectedError) as excinfo:
+        store.put(io.BytesIO(data))
+    assert excinfo.value.signature == 'Eicar-Test-Signature'
+    # Refused from the cache the second time
+    assert clamd.scans == 1
+    assert store.verdict(excinfo.value.sha256).status == VERDICT_INFECTED
+    with open(store.quarantine_path_for(excinfo.value.sha256), 'rb') as f:
+        assert f.read() == data
+
+    # The sweeper leaves quarantined files alone
+    assert EvidenceSweeper(store).sweep_stray_files() == (0, 0)
+    assert os.path.exists(store.quarantine_path_for(excinfo.value.sha256))
+
+
+def test_scanning_fails_closed(manager, clamd):
+    store = manager.store
+    clamd.reply = b'INSTREAM size limit exceeded. ERROR'
+    assert manager.upload_evidence('GOV_01', Upload('big.txt', b'b' * 4096), scope=scope()) is None
+    with pytest.raises(ScanError):
+        store.put(io.BytesIO(b'b' * 4096))
+    # Errors are not cached as verdicts
+    assert clamd.scans == 2 and store.verdict(store._hash(io.BytesIO(b'b' * 4096), store.max_bytes)[0]) is None
+
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+    store.scanner = ClamdScanner('127.0.0.1', port, timeout=5)
+    with pytest.raises(ScanError):
+        store.put(io.BytesIO(b'c' * 4096))
+    assert blob_count(manager) == 0 and os.listdir(store.tmp_dir) == []
+
+
+def test_scan_is_pipelined_with_the_write(manager, clamd):
+    class SlowUpload:
+        """Unseekable; holds back its second chunk until clamd has the first"""
+
+        def __init__(self):
+            self.chunks = [b'a' * 1024, b'b' * 1024, b'c' * 10]
+            self.overlapped = None
+
+        def read(self, size=-1):
+            if len(self.chunks) == 2:
+                self.overlapped = clamd.first_chunk.wait(timeout=5)
+            return self.chunks.pop(0) if self.chunks else b''
+
+    upload = SlowUpload()
+    blob = manager.store.put(upload)
+    assert upload.overlapped and clamd.scans == 1
+    assert blob.size == 2058 and manager.store.verdict(blob.sha256).status == VERDICT_CLEAN